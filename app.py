@@ -7,8 +7,7 @@ import threading
 import time
 import logging
 from flask import request
-from concurrent.futures import as_completed, TimeoutError
-from src.utils.concurrency import get_shared_executor as get_executor
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 # Layouts
 from src.layouts.main_layout import create_main_layout
 from src.layouts.internet_detail_layout import create_internet_detail_layout
@@ -19,7 +18,7 @@ from src.callbacks.admin_callbacks import register_admin_callbacks
 from src.callbacks.reports_callbacks import register_reports_callbacks
 
 # Lógica de Monitoreo (Workers)
-from src.models.internet_logic import monitorear_velocidad_internet, all_users, process_sitios_web_history
+from src.models.internet_logic import monitorear_internet_por_niveles, obtener_ultima_medicion_completa, all_users, process_sitios_web_history
 from src.layouts.telefonos_layout import create_telefonos_layout 
 from src.layouts.servidores_layout import create_servidores_layout
 from src.layouts.pcs_layout import create_pcs_layout
@@ -29,9 +28,11 @@ from src.layouts.checadores_layout import create_checadores_layout
 from src.layouts.sitios_web_layout import create_sitios_web_layout
 from src.layouts.conmutador_layout import create_conmutador_layout
 from src.layouts.termometros_layout import create_termometros_layout
+from src.layouts.warm_start import restaurar_estado_inicial
+from src.utils.concurrency import executor_stats
 
 # Acceso a Datos 
-from src.data.sql_connector import db_connection_manager, update_device_in_db, get_estados_map, obtener_conteo_fallas, obtener_historial_internet, registrar_historial_internet
+from src.data.sql_connector import db_connection_manager, update_device_in_db, get_estados_map, obtener_conteo_fallas, obtener_historial_internet, registrar_historial_internet, asegurar_esquema, ejecutar_rollups_internet, cargar_fallas_abiertas
 from src.components.card_header import crear_header_modulo
 from src.components.internet_module import crear_layout_internet_speed
 from src.plotting.chart_factory import create_faults_pie_chart, create_internet_history_figure, create_storyline_figure
@@ -59,6 +60,13 @@ _LAST_CACHE_CLEAN_TS = None
 
 # Intervalo del worker dedicado de termómetros (segundos)
 TERMOMETROS_INTERVAL_SECONDS = 20
+# Cadencias independientes de velocidad de internet y de conteo de usuarios (segundos)
+INTERNET_INTERVAL_SECONDS = 60
+USERS_INTERVAL_SECONDS = 30
+# Cadencia del job de rollups y retención de HISTORIAL_INTERNET (segundos)
+ROLLUP_INTERVAL_SECONDS = 5 * 60
+# Cada cuánto se registran en el log las métricas de los pools (hilos activos, cola, espera)
+POOL_STATS_LOG_SECONDS = 5 * 60
 
 # Cache y Locks Globales
 monitor_cache = {
@@ -82,9 +90,12 @@ monitor_cache = {
     'internet_storyline_chart': go.Figure(),
     'live_internet_metrics': {},
     'vpn_users_details': [],
+    'tareas_atrasadas': {},
+    'estadisticas_pools': {},
 }
 cache_lock = threading.Lock()
 db_lock = threading.Lock()
+internet_metrics_lock = threading.Lock()
 
 # Configuración de Módulos
 MODULES_CONFIG = {
@@ -159,58 +170,154 @@ def welcome_message_worker():
             monitor_cache['welcome_gif'] = welcome_gif
         time.sleep(60)
 
-def run_monitoring_tasks(tasks, sleep_interval):
+def _desmarcar_tarea_atrasada(task_name):
+    # Llamar con cache_lock tomado. El dict se reemplaza (no se muta) porque el store de Dash
+    # recibe una copia superficial de monitor_cache y puede estar serializándolo.
+    if task_name in monitor_cache['tareas_atrasadas']:
+        monitor_cache['tareas_atrasadas'] = {
+            nombre: desde for nombre, desde in monitor_cache['tareas_atrasadas'].items() if nombre != task_name
+        }
+
+def _publicar_resultado_tarea(task_name, future):
+    """
+    Publica en el cache el resultado de una subtarea y retorna sus updates para la BD.
+    Cualquier resultado publicado (a tiempo o tardío) quita la marca de tarea atrasada.
+    """
+    global monitor_cache
+    try:
+        result = future.result()
+        if "error" in result:
+            with cache_lock:
+                monitor_cache[f'{task_name}_data'] = result
+                _desmarcar_tarea_atrasada(task_name)
+            return []
+        layout_data = result.get('layout', result)
+        with cache_lock:
+            monitor_cache[f'{task_name}_data'] = layout_data
+            _desmarcar_tarea_atrasada(task_name)
+        return result.get("updates") or []
+    except Exception as e:
+        logging.error(f"La subtarea de monitoreo '{task_name}' generó una excepción: {e}", exc_info=True)
+        config = MODULES_CONFIG.get(task_name, {'title': task_name.upper(), 'icon': '/assets/icons/fallas.png'})
+        error_layout = {'header': crear_header_modulo(config['title'], config.get('icon', ''), "Error"), 'body': html.Div(f"Fallo en sub-tarea: {e}", className="text-danger p-2")}
+        with cache_lock:
+            monitor_cache[f'{task_name}_data'] = error_layout
+            _desmarcar_tarea_atrasada(task_name)
+        return []
+
+def _escribir_updates(updates_to_db):
+    # Escritura en la BD
+    if not updates_to_db:
+        return
+    with db_lock:
+        with db_connection_manager() as conn:
+            if conn:
+                cursor = conn.cursor()
+                estados_map = get_estados_map()
+                for update in updates_to_db:
+                    update_device_in_db(cursor, update, estados_map)
+            else:
+                logging.error("No se pudo obtener conexión a la BD para las actualizaciones masivas.")
+
+def _marcar_tarea_atrasada(task_name):
     global monitor_cache
+    logging.error(f"La subtarea de monitoreo '{task_name}' no terminó a tiempo (timeout).")
+    config = MODULES_CONFIG.get(task_name, {'title': task_name.upper(), 'icon': '/assets/icons/fallas.png'})
+    error_layout = {'header': crear_header_modulo(config['title'], config.get('icon', ''), "Timeout"),
+                    'body': html.Div("La tarea no terminó a tiempo.", className="text-danger p-2")}
+    with cache_lock:
+        monitor_cache[f'{task_name}_data'] = error_layout
+        if task_name not in monitor_cache['tareas_atrasadas']:
+            monitor_cache['tareas_atrasadas'] = {
+                **monitor_cache['tareas_atrasadas'], task_name: datetime.datetime.now(datetime.timezone.utc).isoformat()
+            }
+
+def _completar_tarea_atrasada(task_name, future):
+    # Resultado tardío: se publica igual porque los monitores ya actualizaron su estado en memoria,
+    # y sus updates deben llegar a la BD para no desincronizar el historial de fallas.
+    logging.warning(f"La subtarea '{task_name}' terminó fuera de plazo; se publica su resultado tardío.")
+    _escribir_updates(_publicar_resultado_tarea(task_name, future))
+
+_ultimo_log_pools = {'ts': None}
+
+def _publicar_estadisticas_pools():
+    # Métricas de los pools junto a tareas_atrasadas en el cache; al log cada POOL_STATS_LOG_SECONDS
+    global monitor_cache
+    stats = executor_stats()
+    with cache_lock:
+        monitor_cache['estadisticas_pools'] = stats
+        ultimo = _ultimo_log_pools['ts']
+        toca_log = ultimo is None or time.monotonic() - ultimo >= POOL_STATS_LOG_SECONDS
+        if toca_log:
+            _ultimo_log_pools['ts'] = time.monotonic()
+    if toca_log:
+        for nombre, pool in stats.items():
+            logging.info(
+                f"Pool '{nombre}': {pool['activas']}/{pool['max_workers']} hilos activos, {pool['en_cola']} en cola, "
+                f"espera promedio {pool['espera_promedio_ms']} ms (máx {pool['espera_max_ms']} ms), "
+                f"{pool['completadas']} completadas, {pool['rechazadas']} rechazadas."
+            )
+
+def run_monitoring_tasks(tasks, sleep_interval, timeouts=None):
+    """
+    Ejecuta `tasks` ({nombre: función}) a ritmo fijo cada `sleep_interval` segundos sobre un pool
+    que vive lo mismo que el worker. Cada subtarea tiene su propio plazo (`timeouts`, por defecto
+    el intervalo); una subtarea vencida se marca como atrasada y no se vuelve a lanzar mientras
+    siga corriendo.
+    """
+    timeouts = timeouts or {}
+    executor = ThreadPoolExecutor(max_workers=max(len(tasks), 2), thread_name_prefix='ciclo')
+    en_curso = {}
+    next_run = time.monotonic()
     while True:
+        inicio_ciclo = time.monotonic()
         logging.debug(f"Iniciando ciclo de monitoreo para: {', '.join(tasks.keys())}")
-        from concurrent.futures import ThreadPoolExecutor
-        with ThreadPoolExecutor(max_workers=max(len(tasks), 4)) as executor:
-            futures = {executor.submit(func): name for name, func in tasks.items()}
+        futures = {}
+        plazos = {}
+        for task_name, func in tasks.items():
+            previo = en_curso.get(task_name)
+            if previo is not None and not previo.done():
+                logging.warning(f"La subtarea '{task_name}' sigue corriendo desde un ciclo anterior; se omite en este ciclo.")
+                continue
+            future = executor.submit(func)
+            futures[future] = task_name
+            plazos[future] = inicio_ciclo + timeouts.get(task_name, sleep_interval)
+            en_curso[task_name] = future
+
         updates_to_db = []
-        completed_task_names = set()
-        try:
-            for future in as_completed(futures, timeout=sleep_interval):
+        pendientes = set(futures)
+        while pendientes:
+            ahora = time.monotonic()
+            vencidas = {f for f in pendientes if plazos[f] <= ahora and not f.done()}
+            for future in vencidas:
                 task_name = futures[future]
-                completed_task_names.add(task_name)
-                try:
-                    result = future.result()
-                    if "error" in result:
-                        with cache_lock:
-                            monitor_cache[f'{task_name}_data'] = result
-                    else:
-                        layout_data = result.get('layout', result)
-                        with cache_lock:
-                            monitor_cache[f'{task_name}_data'] = layout_data
-                        if "updates" in result and result.get("updates"):
-                            updates_to_db.extend(result["updates"])
-                except Exception as e:
-                    logging.error(f"La subtarea de monitoreo '{task_name}' generó una excepción: {e}", exc_info=True)
-                    config = MODULES_CONFIG.get(task_name, {'title': task_name.upper(), 'icon': '/assets/icons/fallas.png'})
-                    error_layout = {'header': crear_header_modulo(config['title'], config.get('icon', ''), "Error"), 'body': html.Div(f"Fallo en sub-tarea: {e}", className="text-danger p-2")}
-                    with cache_lock: monitor_cache[f'{task_name}_data'] = error_layout
-        except TimeoutError:
-            unfinished = set(tasks.keys()) - completed_task_names
-            for task_name in unfinished:
-                logging.error(f"La subtarea de monitoreo '{task_name}' no terminó a tiempo (timeout).")
-                config = MODULES_CONFIG.get(task_name, {'title': task_name.upper(), 'icon': '/assets/icons/fallas.png'})
-                error_layout = {'header': crear_header_modulo(config['title'], config.get('icon', ''), "Timeout"),
-                                'body': html.Div("La tarea no terminó a tiempo.", className="text-danger p-2")}
-                with cache_lock:
-                    monitor_cache[f'{task_name}_data'] = error_layout
-
-        # Escritura en la BD 
-        if updates_to_db:
-            with db_lock:
-                with db_connection_manager() as conn:
-                    if conn:
-                        cursor = conn.cursor()
-                        estados_map = get_estados_map() 
-                        for update in updates_to_db:
-                            update_device_in_db(cursor, update, estados_map)
-                    else:
-                        logging.error("No se pudo obtener conexión a la BD para las actualizaciones masivas.")
-
-        time.sleep(sleep_interval)
+                # Se marca antes de registrar el callback: si la tarea termina entre medio, el callback
+                # corre en el acto y su resultado no debe quedar pisado por el layout de timeout
+                _marcar_tarea_atrasada(task_name)
+                if not future.cancel():
+                    # Ya está corriendo: se abandona y su resultado se procesará cuando llegue
+                    future.add_done_callback(lambda f, n=task_name: _completar_tarea_atrasada(n, f))
+            pendientes -= vencidas
+            if not pendientes:
+                break
+            # Lo que ya terminó (aunque sea justo al vencer) se procesa normalmente
+            tope = max(0.0, min(plazos[f] for f in pendientes) - ahora)
+            listas, pendientes = wait(pendientes, timeout=tope, return_when=FIRST_COMPLETED)
+            for future in listas:
+                updates_to_db.extend(_publicar_resultado_tarea(futures[future], future))
+
+        _escribir_updates(updates_to_db)
+        _publicar_estadisticas_pools()
+
+        # Ritmo fijo: el próximo ciclo se agenda desde el inicio del anterior, no desde que terminó
+        next_run += sleep_interval
+        ahora = time.monotonic()
+        if ahora - next_run >= sleep_interval:
+            # Atraso de uno o más intervalos completos: se saltan esas ejecuciones en vez de encadenarlas
+            saltados = int((ahora - next_run) // sleep_interval)
+            logging.warning(f"Ciclo de {', '.join(tasks.keys())} excedió su intervalo; se omiten {saltados} ejecución(es).")
+            next_run += saltados * sleep_interval
+        time.sleep(max(0.0, next_run - ahora))
 
 def monitoring_fast_worker():
     #Monitoreo rápido para teléfonos y servidores
@@ -239,13 +346,53 @@ def monitoring_very_slow_worker():
     run_monitoring_tasks(tasks, sleep_interval=60)
 
 
-def monitoring_api_worker():
-    #Monitorea velocidad de internet y usuarios, actualiza cache y BD
+def _publicar_metricas_internet(**cambios):
+    """
+    Fusiona `cambios` en las métricas de internet vigentes y publica el layout de velocidad.
+    El layout se construye fuera de cache_lock; internet_metrics_lock sólo serializa a los
+    workers de velocidad y de usuarios para que no se pisen los cambios.
+    """
+    global monitor_cache
+    with internet_metrics_lock:
+        with cache_lock:
+            metricas = dict(monitor_cache['live_internet_metrics'])
+        metricas.update(cambios)
+
+        internet_speed_layout = None
+        # Hasta la primera medición de velocidad se conserva el "Cargando..." inicial
+        if 'velocidad_descarga' in metricas:
+            try:
+                internet_speed_layout = crear_layout_internet_speed(
+                    velocidad_descarga=metricas.get('velocidad_descarga', 0),
+                    velocidad_carga=metricas.get('velocidad_carga', 0),
+                    ping=metricas.get('ping'),
+                    remotos=metricas.get('remotos', 0),
+                    empresariales=metricas.get('empresariales', 0),
+                )
+            except Exception as e:
+                logging.warning(f"No se pudo generar layout de internet: {e}")
+                internet_speed_layout = {'header': crear_header_modulo("VELOCIDAD DE INTERNET", '/assets/icons/velocidad.png', "Error"), 'body': html.Div("No disponible", className="text-danger")}
+
+        with cache_lock:
+            monitor_cache['live_internet_metrics'] = metricas
+            if internet_speed_layout is not None:
+                monitor_cache['internet_speed_data'] = internet_speed_layout
+            monitor_cache['last_update'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    return metricas
+
+def monitoring_internet_worker():
+    #Mide velocidad de internet (por niveles), registra en BD y publica en cache
     global monitor_cache
     while True:
         try:
-            speed_data = monitorear_velocidad_internet()
-            user_counts = all_users()
+            speed_data = monitorear_internet_por_niveles()
+            with cache_lock:
+                metricas_actuales = monitor_cache['live_internet_metrics']
+                user_counts = {
+                    'remotos': metricas_actuales.get('remotos', 0),
+                    'empresariales': metricas_actuales.get('empresariales', 0),
+                }
+
             # Si hubo error al medir velocidad, componer un payload con ceros/valores neutros
             if "error" in speed_data:
                 logging.error(f"Error al obtener métricas de Internet: {speed_data.get('error')}")
@@ -253,72 +400,50 @@ def monitoring_api_worker():
                     'velocidad_descarga': 0,
                     'velocidad_carga': 0,
                     'ping': None,
-                    'remotos': user_counts.get('remotos', 0) if isinstance(user_counts, dict) else 0,
-                    'empresariales': user_counts.get('empresariales', 0) if isinstance(user_counts, dict) else 0,
-                    'vpn_details': []
+                    **user_counts,
+                    'tipo_muestra': speed_data.get('tipo_muestra', 'completa')
                 }
-                # Registrar igualmente en historial (para dejar constancia de la caída)
-                try:
-                    with db_lock:
-                        registrar_historial_internet(live_internet_data)
-                except Exception as e:
-                    logging.warning(f"No se pudo registrar historial de internet al detectar error: {e}")
-
-                # Generar layout con valores neutros y cachearlo
-                try:
-                    internet_speed_layout = crear_layout_internet_speed(
-                        velocidad_descarga=live_internet_data['velocidad_descarga'],
-                        velocidad_carga=live_internet_data['velocidad_carga'],
-                        ping=live_internet_data['ping'],
-                        remotos=live_internet_data['remotos'],
-                        empresariales=live_internet_data['empresariales'],
-                    )
-                except Exception as e:
-                    logging.warning(f"No se pudo generar layout de internet con valores 0: {e}")
-                    internet_speed_layout = {'header': crear_header_modulo("VELOCIDAD DE INTERNET", '/assets/icons/velocidad.png', "Error"), 'body': html.Div("No disponible", className="text-danger")}
-
-                with cache_lock:
-                    monitor_cache['internet_speed_data'] = internet_speed_layout
-                    monitor_cache['live_internet_metrics'] = live_internet_data
-                    monitor_cache['vpn_users_details'] = live_internet_data.get('vpn_details', [])
-                    monitor_cache['last_update'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
             else:
-                # Caso normal: éxito al medir velocidad
                 live_internet_data = {**speed_data, **user_counts}
-                
-                # 2. Inserta en la BD
+
+            # Registrar en historial (también las caídas; las muestras de latencia van con throughput NULL)
+            try:
                 with db_lock:
-                    try:
-                        registrar_historial_internet(live_internet_data) 
-                    except Exception as e:
-                        logging.warning(f"No se pudo registrar historial de internet: {e}")
+                    registrar_historial_internet(live_internet_data)
+            except Exception as e:
+                logging.warning(f"No se pudo registrar historial de internet: {e}")
 
-                # 3. Crea y Cachea el layout de velocidad
-                internet_speed_layout = crear_layout_internet_speed(
-                    velocidad_descarga=live_internet_data.get('velocidad_descarga', 0),
-                    velocidad_carga=live_internet_data.get('velocidad_carga', 0),
-                    ping=live_internet_data.get('ping', 0),
-                    remotos=live_internet_data.get('remotos', 0),
-                    empresariales=live_internet_data.get('empresariales', 0),
-                )
-                with cache_lock:
-                    monitor_cache['internet_speed_data'] = internet_speed_layout
-                    monitor_cache['live_internet_metrics'] = live_internet_data
-                    monitor_cache['vpn_users_details'] = live_internet_data.get('vpn_details', [])                    
-                    monitor_cache['last_update'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
-
-                    try:
-                        term_layout_resp = create_termometros_layout()
-                        monitor_cache['termometros_data'] = term_layout_resp.get('layout', term_layout_resp)
-                    except Exception as e:
-                        logging.warning(f"No se pudo generar termometros simulados: {e}")
+            # Entre pruebas completas se muestra el último throughput medido junto a la latencia actual
+            if live_internet_data.get('tipo_muestra') == 'latencia' and "error" not in speed_data:
+                ultima_completa = obtener_ultima_medicion_completa()
+                live_internet_data['velocidad_descarga'] = ultima_completa.get('velocidad_descarga', 0)
+                live_internet_data['velocidad_carga'] = ultima_completa.get('velocidad_carga', 0)
+
+            _publicar_metricas_internet(**{k: v for k, v in live_internet_data.items() if k not in user_counts})
         except Exception as e:
-            logging.error(f"ERROR CRÍTICO en monitoring_api_worker: {e}")
+            logging.error(f"ERROR CRÍTICO en monitoring_internet_worker: {e}")
         finally:
-            time.sleep(60)
+            time.sleep(INTERNET_INTERVAL_SECONDS)
+
+def monitoring_users_worker():
+    #Cuenta usuarios VPN y locales con su propia cadencia, independiente del speedtest
+    global monitor_cache
+    while True:
+        try:
+            user_counts = all_users()
+            remotos = user_counts.get('remotos', 0)
+            empresariales = user_counts.get('empresariales', 0)
+            _publicar_metricas_internet(remotos=remotos, empresariales=empresariales)
+            with cache_lock:
+                monitor_cache['vpn_users_details'] = user_counts.get('vpn_details', [])
+                monitor_cache['usuarios_conectados'] = int(remotos) + int(empresariales)
+        except Exception as e:
+            logging.error(f"ERROR CRÍTICO en monitoring_users_worker: {e}")
+        finally:
+            time.sleep(USERS_INTERVAL_SECONDS)
 
 def monitoring_db_query_worker():
-    # Actualiza gráficas y usuarios conectados en el cache global.
+    # Actualiza las gráficas en el cache global.
     global monitor_cache
     while True:
         try:
@@ -334,9 +459,6 @@ def monitoring_db_query_worker():
                 monitor_cache['fallas_pie_chart'] = fallas_pie_chart
                 monitor_cache['internet_history_line_chart'] = internet_history_fig
                 monitor_cache['internet_storyline_chart'] = storyline_fig
-                remotos = monitor_cache['live_internet_metrics'].get('remotos', 0)
-                empresariales = monitor_cache['live_internet_metrics'].get('empresariales', 0)
-                monitor_cache['usuarios_conectados'] = int(remotos) + int(empresariales)
                 # actualizar marca de tiempo para ayudar al limpiador y al store
                 monitor_cache['last_update'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
                 
@@ -351,6 +473,20 @@ def monitoring_db_query_worker():
             logging.debug("monitoring_db_query_worker durmió 60s antes del próximo ciclo.")
             time.sleep(60)
 
+def rollup_worker():
+    """Compacta HISTORIAL_INTERNET en las tablas de 5 min/hora/día y aplica la retención."""
+    while True:
+        try:
+            resumen = ejecutar_rollups_internet()
+            if "error" in resumen:
+                logging.warning(f"Rollups de internet no aplicados: {resumen['error']}")
+            else:
+                logging.debug(f"Rollups de internet: {resumen}")
+        except Exception as e:
+            logging.error(f"ERROR CRÍTICO en rollup_worker: {e}")
+        finally:
+            time.sleep(ROLLUP_INTERVAL_SECONDS)
+
 def monitoring_termometros_worker():
     """Worker dedicado que actualiza termometros_data con layouts simulados."""
     global monitor_cache
@@ -518,9 +654,11 @@ THREAD_CONFIG = [
     {'name': 'FastWorker', 'target': monitoring_fast_worker, 'thread': None},
     {'name': 'SlowWorker', 'target': monitoring_slow_worker, 'thread': None},
     {'name': 'VerySlowWorker', 'target': monitoring_very_slow_worker, 'thread': None},
-    {'name': 'ApiWorker', 'target': monitoring_api_worker, 'thread': None},
+    {'name': 'InternetWorker', 'target': monitoring_internet_worker, 'thread': None},
+    {'name': 'UsersWorker', 'target': monitoring_users_worker, 'thread': None},
     {'name': 'TermometrosWorker', 'target': monitoring_termometros_worker, 'thread': None},
     {'name': 'DbQueryWorker', 'target': monitoring_db_query_worker, 'thread': None},
+    {'name': 'RollupWorker', 'target': rollup_worker, 'thread': None},
     {'name': 'ClockWorker', 'target': clock_worker, 'thread': None},
     {'name': 'WelcomeWorker', 'target': welcome_message_worker, 'thread': None},
     {'name': 'CacheCleaner', 'target': cache_cleaner_worker, 'thread': None},
@@ -528,6 +666,12 @@ THREAD_CONFIG = [
 
 def start_monitoring_threads():
     """Inicia todos los hilos de monitoreo configurados."""
+    asegurar_esquema()
+    cargar_fallas_abiertas()
+    # Último estado conocido desde la BD: la UI lo muestra mientras corre el primer ciclo de cada módulo
+    estado_inicial = restaurar_estado_inicial()
+    with cache_lock:
+        monitor_cache.update(estado_inicial)
     for config in THREAD_CONFIG:
         thread = threading.Thread(target=config['target'], daemon=True, name=config['name'])
         thread.start()
@@ -0,0 +1,165 @@
+# scripts/benchmark_indices.py
+#
+# Mide las consultas calientes del monitoreo antes y después de los índices de la migración 4
+# (src/data/migrations.py) sobre una base de prueba sembrada con datos sintéticos (sqlite3),
+# y guarda planes de ejecución y tiempos en un JSON.
+#
+#   python scripts/benchmark_indices.py --dispositivos 2000 --fallas 200000 --muestras 100000 --salida bench.json
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.migrations import INDICES, sql_crear_indice  # noqa: E402
+
+ESQUEMA = """
+CREATE TABLE TIPOS_DISPOSITIVO (id_tipo INTEGER PRIMARY KEY, nombre_tipo VARCHAR(50));
+CREATE TABLE EDIFICIOS (id_edificio INTEGER PRIMARY KEY, nombre VARCHAR(100));
+CREATE TABLE DISPOSITIVOS (
+    id_dispositivo INTEGER PRIMARY KEY, nombre VARCHAR(100), direccion VARCHAR(255),
+    ESTADOS_id_estado INTEGER, EDIFICIOS_id_edificio INTEGER, TIPOS_DISPOSITIVO_id_tipo INTEGER
+);
+CREATE TABLE HISTORIAL_FALLAS (
+    id_historialfallas INTEGER PRIMARY KEY, fecha_hora_inicio DATETIME, fecha_hora_fin DATETIME,
+    detalle_falla VARCHAR(255), DISPOSITIVOS_id_dispositivo INTEGER,
+    DISPOSITIVOS_ESPECIALES_id_especial INTEGER, SERVICIOS_CONTPAQI_id_servicio INTEGER
+);
+CREATE TABLE HISTORIAL_INTERNET (
+    id_historialinternet INTEGER PRIMARY KEY, fecha_hora DATETIME, velocidad_descarga FLOAT,
+    velocidad_carga FLOAT, ping FLOAT, dispositivos_remotos INTEGER, dispositivos_empresariales INTEGER,
+    tipo_muestra VARCHAR(10)
+);
+CREATE TABLE HISTORIAL_SITIOS_WEB (
+    id_historialsitios INTEGER PRIMARY KEY, fecha_hora DATETIME, estado VARCHAR(50), DISPOSITIVOS_id_dispositivo INTEGER
+);
+"""
+
+TIPOS = ['Telefono IP', 'Sitio Web', 'Servidor', 'Camara DVR', 'PC', 'Checador', 'Conmutador', 'Firewall']
+
+# (nombre, sql, parámetros) con las mismas formas que las consultas de src/data/sql_connector.py
+def consultas(ahora, id_pc, id_sitio, id_falla):
+    return [
+        ('cierre_falla_abierta',
+         "SELECT id_historialfallas FROM HISTORIAL_FALLAS WHERE DISPOSITIVOS_id_dispositivo = ? AND fecha_hora_fin IS NULL",
+         (id_falla,)),
+        ('fallas_30_dias',
+         "SELECT DISPOSITIVOS_id_dispositivo, DISPOSITIVOS_ESPECIALES_id_especial, SERVICIOS_CONTPAQI_id_servicio, fecha_hora_fin "
+         "FROM HISTORIAL_FALLAS WHERE fecha_hora_inicio >= ?",
+         (ahora - timedelta(days=30),)),
+        ('historial_internet_ultima_hora',
+         "SELECT fecha_hora, velocidad_descarga, velocidad_carga, ping, dispositivos_remotos, dispositivos_empresariales, tipo_muestra "
+         "FROM HISTORIAL_INTERNET WHERE fecha_hora > ? ORDER BY fecha_hora",
+         (ahora - timedelta(hours=1),)),
+        ('dispositivos_por_tipo',
+         "SELECT id_dispositivo, nombre, direccion, ESTADOS_id_estado FROM DISPOSITIVOS "
+         "WHERE TIPOS_DISPOSITIVO_id_tipo = ? ORDER BY direccion",
+         (id_pc,)),
+        ('ultimo_estado_sitio',
+         "SELECT fecha_hora, estado FROM HISTORIAL_SITIOS_WEB WHERE DISPOSITIVOS_id_dispositivo = ? "
+         "ORDER BY fecha_hora DESC LIMIT 1",
+         (id_sitio,)),
+    ]
+
+
+def sembrar(conn, n_dispositivos, n_fallas, n_muestras, ahora, semilla=42):
+    rnd = random.Random(semilla)
+    cursor = conn.cursor()
+    cursor.executescript(ESQUEMA)
+    cursor.executemany("INSERT INTO TIPOS_DISPOSITIVO VALUES (?, ?)", list(enumerate(TIPOS, 1)))
+    cursor.executemany("INSERT INTO EDIFICIOS VALUES (?, ?)", [(i, f'Edificio {i}') for i in range(1, 11)])
+    cursor.executemany(
+        "INSERT INTO DISPOSITIVOS VALUES (?, ?, ?, ?, ?, ?)",
+        [(i, f'DISP-{i}', f'10.{i // 65536}.{i // 256 % 256}.{i % 256}', rnd.choice([1, 2]),
+          rnd.randint(1, 10), rnd.randint(1, len(TIPOS))) for i in range(1, n_dispositivos + 1)]
+    )
+    fallas = []
+    for i in range(1, n_fallas + 1):
+        inicio = ahora - timedelta(seconds=rnd.randint(0, 365 * 24 * 3600))
+        # ~1% de las fallas siguen abiertas
+        fin = None if rnd.random() < 0.01 else inicio + timedelta(seconds=rnd.randint(30, 7200))
+        fallas.append((i, inicio, fin, 'Sin respuesta', rnd.randint(1, n_dispositivos), None, None))
+    cursor.executemany("INSERT INTO HISTORIAL_FALLAS VALUES (?, ?, ?, ?, ?, ?, ?)", fallas)
+    cursor.executemany(
+        "INSERT INTO HISTORIAL_INTERNET VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(i, ahora - timedelta(seconds=60 * (n_muestras - i)), rnd.uniform(50, 500), rnd.uniform(10, 100),
+          rnd.uniform(5, 80), rnd.randint(0, 40), rnd.randint(50, 400), 'completa') for i in range(1, n_muestras + 1)]
+    )
+    sitios = [r[0] for r in cursor.execute(
+        "SELECT id_dispositivo FROM DISPOSITIVOS WHERE TIPOS_DISPOSITIVO_id_tipo = 2").fetchall()] or [1]
+    cursor.executemany(
+        "INSERT INTO HISTORIAL_SITIOS_WEB VALUES (?, ?, ?, ?)",
+        [(i, ahora - timedelta(seconds=rnd.randint(0, 30 * 24 * 3600)), str(rnd.choice([1, 2])), rnd.choice(sitios))
+         for i in range(1, n_muestras + 1)]
+    )
+    conn.commit()
+    cursor.execute("ANALYZE")
+    return sitios[0]
+
+
+def medir(conn, lista, repeticiones):
+    resultados = {}
+    for nombre, sql, params in lista:
+        plan = [fila[-1] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            filas = conn.execute(sql, params).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        resultados[nombre] = {
+            'plan': plan,
+            'filas': len(filas),
+            'mediana_ms': round(tiempos[len(tiempos) // 2], 3),
+            'min_ms': round(tiempos[0], 3),
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los índices de la migración 4.")
+    parser.add_argument('--dispositivos', type=int, default=2000)
+    parser.add_argument('--fallas', type=int, default=200000)
+    parser.add_argument('--muestras', type=int, default=100000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--salida', default='benchmark_indices.json')
+    args = parser.parse_args()
+
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    conn = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+    id_sitio = sembrar(conn, args.dispositivos, args.fallas, args.muestras, ahora)
+    id_falla = conn.execute(
+        "SELECT DISPOSITIVOS_id_dispositivo FROM HISTORIAL_FALLAS WHERE fecha_hora_fin IS NULL LIMIT 1").fetchone()[0]
+    lista = consultas(ahora, TIPOS.index('PC') + 1, id_sitio, id_falla)
+
+    antes = medir(conn, lista, args.repeticiones)
+    for indice in INDICES:
+        conn.execute(sql_crear_indice(*indice, dialecto='sqlite'))
+    conn.execute("ANALYZE")
+    despues = medir(conn, lista, args.repeticiones)
+
+    reporte = {
+        'motor': f'sqlite {sqlite3.sqlite_version}',
+        'parametros': vars(args),
+        'consultas': {
+            nombre: {'antes': antes[nombre], 'despues': despues[nombre],
+                     'aceleracion': round(antes[nombre]['mediana_ms'] / max(despues[nombre]['mediana_ms'], 1e-3), 1)}
+            for nombre in antes
+        },
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    for nombre, datos in reporte['consultas'].items():
+        print(f"{nombre:32} {datos['antes']['mediana_ms']:>10.3f} ms -> {datos['despues']['mediana_ms']:>10.3f} ms  (x{datos['aceleracion']})")
+    print(f"Reporte guardado en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
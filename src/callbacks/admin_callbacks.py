@@ -3,90 +3,38 @@
 from dash import dcc, html, Output, Input, State, MATCH, ALL
 import dash_bootstrap_components as dbc
 import dash
-import pandas as pd
 import logging
-from datetime import datetime
+import math
 
 from ..data.sql_connector import obtener_dispositivos_crud, obtener_edificios, eliminar_dispositivo, insertar_o_actualizar_dispositivo
 
 # -------------------------- FUNCIONES DE AYUDA DE LAYOUT --------------------------
 
-def generate_device_table(devices_data, search_term=""):
-    """Genera la tabla interactiva de dispositivos con botones de acción."""
-    if devices_data.get('error'):
-        return dbc.Alert(f"Error al cargar datos: {devices_data['error']}", color="danger")
-        
-    df = pd.DataFrame(devices_data['data'])
-
-    if df.empty:
-        return html.Div([
-            dbc.Button("Agregar Nuevo Dispositivo", id="add-device-button", color="success", className="mb-3 w-100"),
-            dbc.Alert("No hay dispositivos de este tipo registrados.", color="warning", className="mt-4 text-center")
-        ])
-
-    # --- Agregar columna de descripción si existe ---
-    if 'descripcion' not in df.columns:
-        df['descripcion'] = ""
-
-    # --- Filtrar por término de búsqueda ---
-    if search_term and not df.empty:
-        search_term = search_term.lower()
-        # Asegurarse de que las columnas de búsqueda existan en el DataFrame
-        search_cols = [col for col in ['nombre', 'descripcion', 'direccion'] if col in df.columns]
-        df = df[df.apply(
-            lambda row: any(str(row[col]).lower().find(search_term) != -1 for col in search_cols),
-            axis=1
-        )]
-
-
-    # Mapeo de columnas para la visualización
-    df = df.rename(columns={
-        'id': 'ID', 'nombre': 'Nombre', 'descripcion': 'Descripción', 'direccion': 'Dirección/IP', 
-        'ultima_verificacion': 'Última Verificación', 'nombre_edificio': 'Edificio',
-        'estado': 'Estado'
-    })
-    
-    # Agregar botones de acción
-    df['Acciones'] = [
-        html.Div([
-            dbc.Button("Editar", id={'type': 'edit-device-button', 'index': row['ID']}, 
-                       color="primary", size="sm", className="me-2", outline="True"),
-            dbc.Button("Eliminar", id={'type': 'delete-device-button', 'index': row['ID']}, 
-                       color="danger", size="sm", outline="True")
-        ], className="d-flex justify-content-center")
-        for index, row in df.iterrows()
+def generate_device_rows(devices):
+    """Filas de la tabla CRUD (sólo las columnas visibles, más 'id' para identificar la fila)."""
+    return [
+        {
+            'id': d['id'], 'nombre': d.get('nombre'), 'descripcion': d.get('descripcion') or '',
+            'direccion': d.get('direccion'), 'nombre_edificio': d.get('nombre_edificio') or 'N/A',
+            'estado': d.get('estado'), 'editar': 'Editar', 'eliminar': 'Eliminar',
+        }
+        for d in devices
     ]
-    
-    # Formatear la columna de fecha de forma segura
-    def safe_strftime(x):
-        if pd.notna(x) and isinstance(x, datetime):
-            return x.strftime('%Y-%m-%d %H:%M')
-        return x if isinstance(x, str) else 'N/A'
 
-    df['Última Verificación'] = df['Última Verificación'].apply(safe_strftime)
-    
-    # Seleccionar y reordenar columnas
-    cols = ['Nombre', 'Descripción', 'Dirección/IP', 'Edificio', 'Estado', 'Acciones']
-    
-    table = dbc.Table.from_dataframe(
-        df[cols],
-        striped=True, 
-        bordered=True, 
-        hover=True,
-        color="dark",
-        responsive=True,
-        className="text-center"
-    )
-    
-    # Contenedor deslizable para la tabla
-    scrollable_table_container = html.Div(
-        table,
-        className="device-table-scroll"
-    )
-    
+def generate_table_header(total, pagina, tamano_pagina, search_term=""):
+    """Botón de alta y resumen de resultados sobre la tabla."""
+    if total == 0:
+        mensaje = dbc.Alert(
+            "Ningún dispositivo coincide con la búsqueda." if search_term else "No hay dispositivos de este tipo registrados.",
+            color="warning", className="mt-2 text-center"
+        )
+    else:
+        desde = pagina * tamano_pagina + 1
+        hasta = min(total, (pagina + 1) * tamano_pagina)
+        mensaje = html.Small(f"Mostrando {desde}-{hasta} de {total} dispositivos", className="text-white-50 d-block mb-2")
     return html.Div([
-        dbc.Button("Agregar Nuevo Dispositivo", id="add-device-button", color="success", className="mb-3"),
-        scrollable_table_container
+        dbc.Button("Agregar Nuevo Dispositivo", id="add-device-button", color="success", className="mb-2"),
+        mensaje
     ])
 
 def generate_modal_form(device_data, is_new=False):
@@ -202,44 +150,56 @@ def register_admin_callbacks(app):
     """
     
 
-    # 2. Callback para cargar/filtrar la tabla y guardar metadata
+    # 2. Callback para cargar/filtrar la tabla y guardar metadata (búsqueda y paginación sobre el snapshot en memoria)
     @app.callback(
         [Output('dispositivos-crud-container', 'children'),
          Output('crud-data-store', 'data', allow_duplicate=True),
-         Output('search-bar-row', 'style')],
+         Output('search-bar-row', 'style'),
+         Output('crud-device-table', 'data'),
+         Output('crud-device-table', 'page_count'),
+         Output('crud-device-table', 'page_current'),
+         Output('crud-table-wrapper', 'style')],
         [Input('dropdown-tipo-dispositivo', 'value'),
-         Input('search-device-input', 'value')],
-        State('crud-data-store', 'data'),
+         Input('search-device-input', 'value'),
+         Input('crud-device-table', 'page_current')],
+        [State('crud-data-store', 'data'),
+         State('crud-device-table', 'page_size')],
         prevent_initial_call=True
     )
-    def load_or_filter_device_table(id_tipo_seleccionado, search_term, current_store):
+    def load_or_filter_device_table(id_tipo_seleccionado, search_term, page_current, current_store, page_size):
         ctx = dash.callback_context
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         if id_tipo_seleccionado is None:
-            return dbc.Alert("Selecciona un tipo de dispositivo para comenzar a gestionar.", color="info", className="mt-4"), dash.no_update, {'display': 'none'}
-
-        # Si el trigger es el dropdown, recargamos los datos desde la BD
-        if trigger_id == 'dropdown-tipo-dispositivo':
-            data = obtener_dispositivos_crud(id_tipo_seleccionado)
-            # Guardar metadata para usar en acciones CRUD
-            metadata = {
-                'id_tipo': data.get('id_tipo'),
-                'nombre_tipo': data.get('nombre_tipo'),
-                'is_special': data.get('is_special'),
-                'data': data.get('data', []), # Guardamos la lista completa
-                'data_map': {d['id']: d for d in data.get('data', [])} # Mapa para edición rápida
-            }
-            table = generate_device_table(data, search_term)
-            return table, metadata, {'display': 'block'}
-        
-        # Si el trigger es la barra de búsqueda, filtramos los datos ya guardados en el store
-        elif trigger_id == 'search-device-input' and current_store:
-            filtered_data = {'data': current_store.get('data', [])} # Usamos los datos completos del store
-            table = generate_device_table(filtered_data, search_term)
-            return table, dash.no_update, dash.no_update
-
-        raise dash.exceptions.PreventUpdate
+            alerta = dbc.Alert("Selecciona un tipo de dispositivo para comenzar a gestionar.", color="info", className="mt-4")
+            return alerta, dash.no_update, {'display': 'none'}, [], 1, 0, {'display': 'none'}
+
+        # Un cambio de tipo o de búsqueda vuelve a la primera página
+        pagina = (page_current or 0) if trigger_id == 'crud-device-table' else 0
+        data = obtener_dispositivos_crud(id_tipo_seleccionado, search_term, pagina, page_size)
+        if data.get('error'):
+            alerta = dbc.Alert(f"Error al cargar datos: {data['error']}", color="danger")
+            return alerta, dash.no_update, {'display': 'block'}, [], 1, 0, {'display': 'none'}
+
+        total = data.get('total', 0)
+        paginas = max(1, math.ceil(total / page_size))
+        if pagina >= paginas:
+            # La página quedó fuera de rango (p. ej. tras eliminar): se muestra la última
+            pagina = paginas - 1
+            data = obtener_dispositivos_crud(id_tipo_seleccionado, search_term, pagina, page_size)
+
+        dispositivos = data.get('data', [])
+        # Guardar metadata para usar en acciones CRUD (sólo la página visible)
+        metadata = {
+            **(current_store or {}),
+            'id_tipo': data.get('id_tipo'),
+            'nombre_tipo': data.get('nombre_tipo'),
+            'is_special': data.get('is_special'),
+            'data_map': {d['id']: d for d in dispositivos} # Mapa para edición rápida
+        }
+        header = generate_table_header(total, pagina, page_size, search_term)
+        tabla_visible = {'display': 'block'} if dispositivos else {'display': 'none'}
+        return header, metadata, {'display': 'block'}, generate_device_rows(dispositivos), paginas, pagina, tabla_visible
 
     # 3. Callback para abrir los modales (Agregar, Editar, Eliminar)
     @app.callback(
@@ -248,26 +208,27 @@ def register_admin_callbacks(app):
          Output('crud-modal-header', 'children'),
          Output('crud-modal-body', 'children'),
          Output('crud-delete-modal-body', 'children'),
-         Output('crud-data-store', 'data')], # Actualizamos el store con el ID del dispositivo a afectar
+         Output('crud-data-store', 'data'), # Actualizamos el store con el ID del dispositivo a afectar
+         Output('crud-device-table', 'active_cell')], # Se limpia para que volver a pulsar la misma celda dispare
         [Input('add-device-button', 'n_clicks'),
-         Input({'type': 'edit-device-button', 'index': ALL}, 'n_clicks'),
-         Input({'type': 'delete-device-button', 'index': ALL}, 'n_clicks'),
+         Input('crud-device-table', 'active_cell'),
          Input('crud-modal-close', 'n_clicks'),
          Input('crud-delete-modal-close', 'n_clicks')],
         [State('crud-data-store', 'data')],
         prevent_initial_call=True
     )
-    def handle_modal_toggles(n_add, n_edit, n_delete, n_close_edit, n_close_delete, current_store):
+    def handle_modal_toggles(n_add, active_cell, n_close_edit, n_close_delete, current_store):
         ctx = dash.callback_context
         if not ctx.triggered: raise dash.exceptions.PreventUpdate
         
         trigger = ctx.triggered[0]
         prop_id = trigger['prop_id']
+        sin_cambios = (dash.no_update,) * 7
         
         # Cierre de modales
         if 'crud-modal-close' in prop_id or 'crud-delete-modal-close' in prop_id:
             current_store['device_to_affect_id'] = None # Limpiamos el ID
-            return False, False, dash.no_update, dash.no_update, dash.no_update, current_store
+            return False, False, dash.no_update, dash.no_update, dash.no_update, current_store, dash.no_update
         
         # Abrir Modal de Añadir
         if 'add-device-button' in prop_id and trigger.get('value'):
@@ -275,34 +236,32 @@ def register_admin_callbacks(app):
             temp_data = {'id': 'NEW', 'id_tipo': current_store['id_tipo'], 'nombre_tipo': current_store['nombre_tipo'], 'is_special': current_store['is_special']}
             body = generate_modal_form(temp_data, is_new=True)
             current_store['device_to_affect_id'] = 'NEW'
-            return True, False, header, body, dash.no_update, current_store
-            
+            return True, False, header, body, dash.no_update, current_store, dash.no_update
+
+        if 'crud-device-table' not in prop_id or not active_cell or active_cell.get('column_id') not in ('editar', 'eliminar'):
+            return sin_cambios
+
+        device_id = active_cell.get('row_id')
+        # Las llaves de data_map llegan como texto desde el store
+        device_info = current_store.get('data_map', {}).get(device_id) or current_store.get('data_map', {}).get(str(device_id))
+        if not device_info:
+            return sin_cambios
+
         # Abrir Modal de Editar
-        if 'edit-device-button' in prop_id and trigger.get('value'):
-            device_id = ctx.triggered_id['index']
-            # --- CORRECCIÓN: Asegurarse de que device_id sea del mismo tipo que las llaves de data_map ---
-            device_info = current_store['data_map'].get(device_id) or current_store['data_map'].get(str(device_id))
-            if not device_info:
-                return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        if active_cell['column_id'] == 'editar':
             header = f"Editar {current_store.get('nombre_tipo', 'Dispositivo')}: {device_info.get('nombre', '')}"
-            # --- CORRECCIÓN: Pasar todos los datos del dispositivo al formulario ---
             edit_data = {**device_info, 'id_tipo': current_store['id_tipo'], 'is_special': current_store['is_special']}
             body = generate_modal_form(edit_data, is_new=False)
             current_store['device_to_affect_id'] = edit_data.get('id') # Aseguramos que el ID correcto se guarda
-            return True, False, header, body, dash.no_update, current_store
+            return True, False, header, body, dash.no_update, current_store, None
 
         # Abrir Modal de Eliminar
-        if 'delete-device-button' in prop_id and trigger.get('value'):
-            device_id = ctx.triggered_id['index']
-            device_info = current_store['data_map'].get(device_id, {})
-            body_text = html.Div([
-                html.P(f"¿Estás seguro de que deseas eliminar permanentemente el dispositivo '{device_info.get('nombre', 'N/A')}' (ID: {device_id})?", className="lead text-dark"),
-                dbc.Alert("Esta acción no se puede deshacer y eliminará registros de fallas asociados.", color="danger")
-            ])
-            current_store['device_to_affect_id'] = device_id
-            return False, True, dash.no_update, dash.no_update, body_text, current_store
-            
-        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        body_text = html.Div([
+            html.P(f"¿Estás seguro de que deseas eliminar permanentemente el dispositivo '{device_info.get('nombre', 'N/A')}' (ID: {device_id})?", className="lead text-dark"),
+            dbc.Alert("Esta acción no se puede deshacer y eliminará registros de fallas asociados.", color="danger")
+        ])
+        current_store['device_to_affect_id'] = device_id
+        return False, True, dash.no_update, dash.no_update, body_text, current_store, None
 
     # 4. Callback para confirmar la eliminación (Lógica REAL)
     @app.callback(
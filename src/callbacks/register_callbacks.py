@@ -1,21 +1,40 @@
 import dash
 from dash import dcc, html, Output, Input, State, MATCH, ALL, ctx
 import dash_bootstrap_components as dbc
-import pandas as pd
-import datetime
 import logging
 import time
 
 from ..components.internet_module import crear_layout_internet_speed
 from ..components.card_header import crear_header_modulo
+from ..models.vpn_poller import COLUMNAS_TABLA_VPN
 from ..data.sql_connector import (
     obtener_detalles_dispositivo, actualizar_credenciales_dispositivo,
-    obtener_detalles_servicio_contpaqi, actualizar_servicio_contpaqi
+    obtener_detalles_servicio_contpaqi, actualizar_servicio_contpaqi,
+    obtener_serie_historial_internet
 )
 from src.plotting.chart_factory import create_faults_pie_chart, create_internet_history_figure, create_storyline_figure
 import plotly.graph_objects as go
 import json
 
+# Puntos objetivo de las series largas del historial de internet (define la resolución pedida)
+PUNTOS_SERIE_INTERNET = 240
+# Las series de rollup sólo cambian con el job de rollups: se reconsultan a lo más cada minuto
+SERIE_INTERNET_TTL_SECONDS = 60
+_series_internet = {}  # horas -> (monotonic, figura dict)
+
+def _figura_serie_internet(horas):
+    """Figura del historial de internet para `horas`, leída de la tabla de rollup adecuada (con TTL)."""
+    entrada = _series_internet.get(horas)
+    if entrada and time.monotonic() - entrada[0] < SERIE_INTERNET_TTL_SECONDS:
+        return entrada[1]
+    serie = obtener_serie_historial_internet(horas, resolucion_segundos=int(horas * 3600 // PUNTOS_SERIE_INTERNET))
+    if "error" in serie:
+        logging.warning(f"No se pudo leer la serie de internet de {horas} h: {serie['error']}")
+    figura = create_internet_history_figure(serie).to_dict()
+    if "error" not in serie:
+        _series_internet[horas] = (time.monotonic(), figura)
+    return figura
+
 # --- Registro de Módulos ---
 MODULES_CONFIG = {
     'telefonos': {'title': "TELÉFONOS ACTIVOS", 'icon': '/assets/icons/telefono.png'},
@@ -260,17 +279,22 @@ def register_all_callbacks(app):
     @app.callback(
         [Output('internet-detail-history-graph', 'figure'),
          Output('internet-detail-storyline-graph', 'figure')],
-        [Input('graphs-store', 'data'), Input('url', 'pathname')],
+        [Input('graphs-store', 'data'), Input('url', 'pathname'), Input('internet-detail-history-range', 'value')],
         prevent_initial_call=True
     )
-    def update_internet_detail_graphs(graphs_data, pathname):
+    def update_internet_detail_graphs(graphs_data, pathname, rango_horas):
         if pathname != '/internet-detail': raise dash.exceptions.PreventUpdate
         if not graphs_data: raise dash.exceptions.PreventUpdate
         try:
             def _to_fig(key):
                 d = graphs_data.get(key)
                 return go.Figure(d) if d else go.Figure()
-            return _to_fig('internet_history'), _to_fig('storyline')
+            # La última hora ya viene del buffer en memoria; los rangos largos van a los rollups
+            if not rango_horas or rango_horas <= 1:
+                history_fig = _to_fig('internet_history')
+            else:
+                history_fig = go.Figure(_figura_serie_internet(rango_horas))
+            return history_fig, _to_fig('storyline')
         except Exception as e:
             logging.error(f"Error actualizando gráficos de internet-detail: {e}")
             return go.Figure(), go.Figure()
@@ -279,10 +303,11 @@ def register_all_callbacks(app):
     @app.callback(
         [Output('internet-detail-speed-content', 'children'),
          Output('internet-detail-vpn-table', 'children')],
-        Input('monitoreo-store', 'data'),
+        [Input('monitoreo-store', 'data'), Input('url', 'pathname')],
         prevent_initial_call=True
     )
-    def update_internet_detail_page(data):
+    def update_internet_detail_page(data, pathname):
+        if pathname != '/internet-detail': raise dash.exceptions.PreventUpdate
         if not data: raise dash.exceptions.PreventUpdate
 
         live_metrics = data.get('live_internet_metrics', {})
@@ -299,33 +324,15 @@ def register_all_callbacks(app):
             ], className="d-flex justify-content-around my-2 w-100")
         ], className="d-flex flex-column align-items-center w-100")
 
-        # Tabla de usuarios VPN (misma lógica que antes)
+        # Tabla de usuarios VPN: las filas llegan ya formateadas desde el poller, aquí sólo se pintan
         vpn_users = data.get('vpn_users_details', [])
-        if isinstance(vpn_users, list) and vpn_users and not isinstance(vpn_users, dict):
+        if isinstance(vpn_users, list) and vpn_users:
             try:
-                processed_users = []
-                for user in vpn_users:
-                    subsession = user.get('subsessions', [{}])[0]
-                    processed_users.append({
-                        'user_name': user.get('user_name', 'N/A'),
-                        'remote_host': user.get('remote_host', 'N/A'),
-                        'duration': user.get('duration', 0),
-                        'aip': subsession.get('aip', 'N/A'),
-                        'in_bytes': subsession.get('in_bytes', 0),
-                        'out_bytes': subsession.get('out_bytes', 0)
-                    })
-                df = pd.DataFrame(processed_users)
-                def format_bytes(byte_count):
-                    if byte_count is None or not isinstance(byte_count, (int, float)): return "0 B"
-                    power = 1024; n = 0; power_labels = {0: '', 1: 'K', 2: 'M', 3: 'G', 4: 'T'}
-                    while byte_count >= power and n < len(power_labels) -1 : byte_count /= power; n += 1
-                    return f"{byte_count:.2f} {power_labels[n]}B"
-                df['Recibido'] = df['in_bytes'].apply(format_bytes)
-                df['Enviado'] = df['out_bytes'].apply(format_bytes)
-                df['Duración'] = df['duration'].apply(lambda s: str(datetime.timedelta(seconds=s)))
-                df_display = df.rename(columns={'user_name': 'Usuario', 'remote_host': 'IP Pública', 'aip': 'IP VPN Asignada'})[['Usuario', 'IP Pública', 'IP VPN Asignada', 'Duración', 'Recibido', 'Enviado']]
                 vpn_table = html.Div(
-                    dbc.Table.from_dataframe(df_display, striped=True, bordered=True, hover=True, color="dark", responsive=True),
+                    dbc.Table([
+                        html.Thead(html.Tr([html.Th(col) for col in COLUMNAS_TABLA_VPN])),
+                        html.Tbody([html.Tr([html.Td(fila.get(col, '')) for col in COLUMNAS_TABLA_VPN]) for fila in vpn_users]),
+                    ], striped=True, bordered=True, hover=True, color="dark", responsive=True),
                     className="device-table-scroll"
                 )
             except Exception as e:
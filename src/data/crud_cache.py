@@ -0,0 +1,62 @@
+# src/data/crud_cache.py
+
+import threading
+import time
+
+# Columnas en las que busca la barra del panel de administración
+COLUMNAS_BUSQUEDA = ('nombre', 'descripcion', 'direccion')
+
+
+def clave_busqueda(fila: dict) -> str:
+    """Texto en minúsculas con las columnas buscables de la fila, precalculado una vez por snapshot."""
+    return '\n'.join(str(fila.get(columna) or '') for columna in COLUMNAS_BUSQUEDA).casefold()
+
+
+class CacheCrudDispositivos:
+    """
+    Snapshot por tipo de dispositivo de la tabla CRUD, en memoria. Las funciones de escritura del
+    panel lo invalidan; el TTL sólo cubre los cambios de estado que escriben los monitores.
+    """
+
+    def __init__(self, ttl_segundos: float = 60):
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        # id_tipo -> (monotonic de carga, snapshot)
+        self._snapshots = {}
+        # Se incrementa en cada invalidación; una carga iniciada antes no se guarda
+        self._generacion = 0
+
+    def obtener(self, id_tipo, cargar):
+        """Retorna el snapshot vigente de `id_tipo` o lo recarga con `cargar(id_tipo)` (que retorna un dict)."""
+        clave = str(id_tipo)
+        with self._lock:
+            entrada = self._snapshots.get(clave)
+            generacion = self._generacion
+        if entrada and time.monotonic() - entrada[0] < self.ttl_segundos:
+            return entrada[1]
+
+        snapshot = cargar(id_tipo)
+        if "error" not in snapshot:
+            snapshot['claves'] = [clave_busqueda(fila) for fila in snapshot['data']]
+            with self._lock:
+                # Si hubo una escritura del panel durante la carga, el snapshot puede ser anterior a ella:
+                # se entrega a este llamador pero no se cachea
+                if generacion == self._generacion:
+                    self._snapshots[clave] = (time.monotonic(), snapshot)
+        return snapshot
+
+    def invalidar(self, id_tipo=None):
+        with self._lock:
+            self._generacion += 1
+            if id_tipo is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(str(id_tipo), None)
+
+    @staticmethod
+    def filtrar(snapshot: dict, busqueda: str = '') -> list:
+        """Filas del snapshot cuya clave contiene `busqueda` (sin distinguir mayúsculas)."""
+        termino = (busqueda or '').strip().casefold()
+        if not termino:
+            return snapshot['data']
+        return [fila for fila, clave in zip(snapshot['data'], snapshot['claves']) if termino in clave]
@@ -0,0 +1,61 @@
+# src/data/fault_summary.py
+
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+# Nombre con el que cada `tipo` del write path aparece en la gráfica de fallas
+ETIQUETAS_TIPO_FALLA = {
+    'Servicio ContpaQi': 'Servicios Contpaqi',
+}
+
+
+def etiqueta_tipo_falla(tipo: str) -> str:
+    return ETIQUETAS_TIPO_FALLA.get(tipo, tipo)
+
+
+class ContadorFallasDiario:
+    """
+    Conteo de fallas por día y tipo para una ventana móvil de `dias` días, en memoria.
+    El write path lo incrementa al abrir cada falla; `reemplazar` lo reconcilia con la BD.
+    """
+
+    def __init__(self, dias: int = 30):
+        self.dias = dias
+        self._lock = threading.Lock()
+        self._por_dia = {}
+        self.cargado = False
+
+    def registrar(self, tipo: str, fecha: date = None):
+        fecha = fecha or date.today()
+        with self._lock:
+            self._por_dia.setdefault(fecha, Counter())[etiqueta_tipo_falla(tipo)] += 1
+            self._purgar(date.today())
+
+    def reemplazar(self, filas):
+        """Sustituye todos los buckets por filas (fecha, tipo, total) leídas de la BD."""
+        por_dia = {}
+        for fecha, tipo, total in filas:
+            if hasattr(fecha, 'date'):
+                fecha = fecha.date()
+            por_dia.setdefault(fecha, Counter())[tipo] += int(total or 0)
+        with self._lock:
+            self._por_dia = por_dia
+            self._purgar(date.today())
+            self.cargado = True
+
+    def conteo(self) -> dict:
+        """Totales por tipo en la ventana, con el formato de obtener_conteo_fallas()."""
+        with self._lock:
+            self._purgar(date.today())
+            totales = Counter()
+            for conteos in self._por_dia.values():
+                totales.update(conteos)
+        ordenados = [(tipo, total) for tipo, total in totales.most_common() if total > 0]
+        return {"fallas": [t for _, t in ordenados], "labels": [tipo for tipo, _ in ordenados]}
+
+    def _purgar(self, hoy):
+        # Debe llamarse con self._lock tomado
+        limite = hoy - timedelta(days=self.dias)
+        for fecha in [f for f in self._por_dia if f < limite]:
+            del self._por_dia[fecha]
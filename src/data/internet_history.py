@@ -0,0 +1,72 @@
+# src/data/internet_history.py
+
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+
+class BufferHistorialInternet:
+    """
+    Muestras recientes de HISTORIAL_INTERNET en memoria (ventana móvil de `ventana`).
+    Se siembra una vez desde la BD, el propio proceso agrega lo que inserta y las lecturas
+    sólo piden a la BD las filas posteriores a la última `fecha_hora` vista.
+    """
+
+    def __init__(self, ventana: timedelta = timedelta(hours=1)):
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        self._filas = deque()
+        self._ids = set()
+        # Mayor fecha_hora vista (no se recorta con la ventana); es el punto de partida de las lecturas de cola
+        self._marca = None
+        self.sembrado = False
+
+    def sembrar(self, filas):
+        """Reemplaza el contenido con `filas` (dicts con 'id' y 'fecha_hora'), ya ordenadas por fecha."""
+        with self._lock:
+            self._filas = deque()
+            self._ids = set()
+            self._marca = _utc_naive() - self.ventana
+            self._agregar(filas)
+            self.sembrado = True
+
+    def agregar(self, filas):
+        """Agrega filas nuevas; las repetidas (mismo id) se ignoran."""
+        with self._lock:
+            self._agregar(filas)
+
+    def ultima_fecha(self):
+        with self._lock:
+            return self._marca
+
+    def filas(self) -> list:
+        """Copia de las filas dentro de la ventana, en orden cronológico."""
+        with self._lock:
+            self._recortar()
+            return list(self._filas)
+
+    def _agregar(self, filas):
+        desordenado = False
+        for fila in filas:
+            if fila['id'] in self._ids:
+                continue
+            if self._filas and fila['fecha_hora'] < self._filas[-1]['fecha_hora']:
+                desordenado = True
+            self._filas.append(fila)
+            self._ids.add(fila['id'])
+            if self._marca is None or fila['fecha_hora'] > self._marca:
+                self._marca = fila['fecha_hora']
+        if desordenado:
+            # Un insert de otro escritor con fecha anterior: se reordena (caso raro)
+            self._filas = deque(sorted(self._filas, key=lambda f: f['fecha_hora']))
+        self._recortar()
+
+    def _recortar(self):
+        # fecha_hora se guarda en UTC (GETUTCDATE) y sin zona horaria
+        limite = _utc_naive() - self.ventana
+        while self._filas and self._filas[0]['fecha_hora'] < limite:
+            self._ids.discard(self._filas.popleft()['id'])
+
+
+def _utc_naive():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,216 @@
+# src/data/internet_rollups.py
+#
+# Agregados (rollups) de HISTORIAL_INTERNET en tablas de 5 minutos, 1 hora y 1 día, más la
+# retención de las muestras crudas. La agregación se hace en Python y el SQL es estándar
+# (SELECT/INSERT/DELETE con parámetros `?`), así que el job corre igual sobre SQL Server que
+# sobre una base local de prueba (sqlite3).
+
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+# (columna cruda, prefijo en las tablas de rollup)
+METRICAS = [
+    ('velocidad_descarga', 'descarga'),
+    ('velocidad_carga', 'carga'),
+    ('ping', 'ping'),
+    ('dispositivos_remotos', 'remotos'),
+    ('dispositivos_empresariales', 'empresariales'),
+]
+ESTADISTICAS = ('min', 'avg', 'max', 'p95')
+
+RETENCION_CRUDA_DIAS = int(os.getenv('HISTORIAL_INTERNET_RETENCION_DIAS', 30))
+
+# De más fino a más grueso: (tabla, segundos por bucket, días de retención o None = sin límite)
+NIVELES = [
+    ('HISTORIAL_INTERNET_5MIN', 5 * 60, int(os.getenv('HISTORIAL_INTERNET_5MIN_RETENCION_DIAS', 90))),
+    ('HISTORIAL_INTERNET_HORA', 60 * 60, int(os.getenv('HISTORIAL_INTERNET_HORA_RETENCION_DIAS', 400))),
+    ('HISTORIAL_INTERNET_DIA', 24 * 60 * 60, None),
+]
+
+_COLUMNAS_ROLLUP = ['bucket_inicio', 'muestras'] + [f'{prefijo}_{est}' for _, prefijo in METRICAS for est in ESTADISTICAS]
+
+# Hasta dónde está procesado cada nivel, haya o no muestras en ese tramo
+TABLA_PROGRESO = 'ROLLUP_PROGRESO'
+SQL_CREAR_PROGRESO = f"""CREATE TABLE {TABLA_PROGRESO} (
+    tabla VARCHAR(50) NOT NULL PRIMARY KEY,
+    procesado_hasta DATETIME NOT NULL
+)"""
+
+
+def sql_crear_tabla(tabla: str) -> str:
+    """CREATE TABLE portable de una tabla de rollup."""
+    columnas = ',\n    '.join(f'{c} FLOAT NULL' for c in _COLUMNAS_ROLLUP[2:])
+    return f"""CREATE TABLE {tabla} (
+    bucket_inicio DATETIME NOT NULL PRIMARY KEY,
+    muestras INT NOT NULL,
+    {columnas}
+)"""
+
+
+def percentil(valores_ordenados, p: float):
+    """Percentil `p` (0-100) con interpolación lineal sobre una lista ya ordenada."""
+    if not valores_ordenados:
+        return None
+    k = (len(valores_ordenados) - 1) * p / 100
+    f, c = math.floor(k), math.ceil(k)
+    if f == c:
+        return float(valores_ordenados[int(k)])
+    return valores_ordenados[f] + (valores_ordenados[c] - valores_ordenados[f]) * (k - f)
+
+
+def inicio_bucket(fecha: datetime, segundos: int) -> datetime:
+    epoch = datetime(1970, 1, 1)
+    return epoch + timedelta(seconds=(int((fecha - epoch).total_seconds()) // segundos) * segundos)
+
+
+def agregar_muestras(filas, segundos: int) -> list:
+    """
+    Agrupa filas crudas (dicts con 'fecha_hora' y las columnas de METRICAS) en buckets de `segundos`.
+    Los valores NULL (p. ej. throughput de las muestras de sólo latencia) no cuentan para su métrica.
+    """
+    buckets = {}
+    for fila in filas:
+        bucket = buckets.setdefault(inicio_bucket(fila['fecha_hora'], segundos), {'muestras': 0, 'valores': {p: [] for _, p in METRICAS}})
+        bucket['muestras'] += 1
+        for columna, prefijo in METRICAS:
+            valor = fila.get(columna)
+            if valor is not None:
+                bucket['valores'][prefijo].append(float(valor))
+
+    resultado = []
+    for inicio in sorted(buckets):
+        bucket = buckets[inicio]
+        agregado = {'bucket_inicio': inicio, 'muestras': bucket['muestras']}
+        for _, prefijo in METRICAS:
+            valores = sorted(bucket['valores'][prefijo])
+            agregado[f'{prefijo}_min'] = valores[0] if valores else None
+            agregado[f'{prefijo}_avg'] = sum(valores) / len(valores) if valores else None
+            agregado[f'{prefijo}_max'] = valores[-1] if valores else None
+            agregado[f'{prefijo}_p95'] = percentil(valores, 95)
+        resultado.append(agregado)
+    return resultado
+
+
+def ejecutar_rollups(conn, ahora: datetime = None) -> dict:
+    """
+    Calcula los buckets cerrados pendientes de cada nivel a partir de las muestras crudas,
+    aplica la retención y confirma después de cada tramo, así que un corte sólo repite el tramo en curso.
+    Cada nivel avanza desde su marca en ROLLUP_PROGRESO (no desde el último bucket con datos), y la
+    primera vez arranca en max(primera muestra, ahora - retención del nivel).
+    Retorna {tabla: buckets_escritos, 'crudas_eliminadas': n}.
+    """
+    ahora = ahora or _utc_naive()
+    cursor = conn.cursor()
+    resumen = {}
+    cubierto_hasta = []
+
+    for tabla, segundos, dias in NIVELES:
+        hasta = inicio_bucket(ahora, segundos)  # sólo buckets ya cerrados
+        desde = _marca_inicial(cursor, tabla, segundos, dias, ahora, hasta)
+
+        escritos = 0
+        # Por tramos de a lo más un día (o un bucket) para no cargar meses de crudas de una vez
+        tramo = timedelta(seconds=max(segundos, 24 * 60 * 60))
+        inicio = desde
+        while inicio < hasta:
+            fin = min(inicio + tramo, hasta)
+            escritos += _rollup_tramo(cursor, tabla, segundos, inicio, fin)
+            _guardar_marca(cursor, tabla, fin)
+            conn.commit()
+            inicio = fin
+        resumen[tabla] = escritos
+        cubierto_hasta.append(max(desde, hasta))
+
+    resumen['crudas_eliminadas'] = aplicar_retencion(cursor, ahora, min(cubierto_hasta))
+    conn.commit()
+    return resumen
+
+
+def _marca_inicial(cursor, tabla, segundos, dias, ahora, hasta):
+    cursor.execute(f"SELECT procesado_hasta FROM {TABLA_PROGRESO} WHERE tabla = ?", (tabla,))
+    row = cursor.fetchone()
+    if row:
+        return _a_datetime(row[0])
+
+    # Sin marca: se continúa desde el último bucket escrito (instalaciones anteriores a la marca)
+    cursor.execute(f"SELECT MAX(bucket_inicio) FROM {tabla}")
+    ultimo = _a_datetime(cursor.fetchone()[0])
+    if ultimo:
+        return ultimo + timedelta(seconds=segundos)
+
+    cursor.execute("SELECT MIN(fecha_hora) FROM HISTORIAL_INTERNET")
+    primera = _a_datetime(cursor.fetchone()[0])
+    if primera is None:
+        return hasta
+    # Los buckets que la retención borraría enseguida no se calculan
+    if dias is not None:
+        primera = max(primera, ahora - timedelta(days=dias))
+    return inicio_bucket(primera, segundos)
+
+
+def _guardar_marca(cursor, tabla, procesado_hasta):
+    cursor.execute(f"UPDATE {TABLA_PROGRESO} SET procesado_hasta = ? WHERE tabla = ?", (procesado_hasta, tabla))
+    if cursor.rowcount == 0:
+        cursor.execute(f"INSERT INTO {TABLA_PROGRESO} (tabla, procesado_hasta) VALUES (?, ?)", (tabla, procesado_hasta))
+
+
+def _rollup_tramo(cursor, tabla, segundos, desde, hasta) -> int:
+    cursor.execute(
+        "SELECT fecha_hora, velocidad_descarga, velocidad_carga, ping, dispositivos_remotos, dispositivos_empresariales "
+        "FROM HISTORIAL_INTERNET WHERE fecha_hora >= ? AND fecha_hora < ?",
+        (desde, hasta)
+    )
+    columnas = [c[0] for c in cursor.description]
+    filas = [dict(zip(columnas, row)) for row in cursor.fetchall()]
+    for fila in filas:
+        fila['fecha_hora'] = _a_datetime(fila['fecha_hora'])
+    agregados = agregar_muestras(filas, segundos)
+    if not agregados:
+        return 0
+    cursor.execute(f"DELETE FROM {tabla} WHERE bucket_inicio >= ? AND bucket_inicio < ?", (desde, hasta))
+    marcadores = ', '.join('?' for _ in _COLUMNAS_ROLLUP)
+    cursor.executemany(
+        f"INSERT INTO {tabla} ({', '.join(_COLUMNAS_ROLLUP)}) VALUES ({marcadores})",
+        [tuple(agregado[c] for c in _COLUMNAS_ROLLUP) for agregado in agregados]
+    )
+    return len(agregados)
+
+
+def aplicar_retencion(cursor, ahora: datetime, cubierto_hasta: datetime) -> int:
+    """Borra crudas más viejas que la retención (sólo las ya agregadas en todos los niveles) y rollups vencidos."""
+    limite_crudas = min(ahora - timedelta(days=RETENCION_CRUDA_DIAS), cubierto_hasta)
+    cursor.execute("DELETE FROM HISTORIAL_INTERNET WHERE fecha_hora < ?", (limite_crudas,))
+    eliminadas = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+    for tabla, _, dias in NIVELES:
+        if dias is not None:
+            cursor.execute(f"DELETE FROM {tabla} WHERE bucket_inicio < ?", (ahora - timedelta(days=dias),))
+    return eliminadas
+
+
+def elegir_nivel(ventana: timedelta, resolucion_segundos: int):
+    """
+    Retorna (tabla, segundos_bucket) del nivel más grueso cuya resolución no supera la pedida
+    y cuya retención cubre la ventana; ('HISTORIAL_INTERNET', None) si sólo sirven las crudas.
+    """
+    elegido = ('HISTORIAL_INTERNET', None)
+    for tabla, segundos, dias in NIVELES:
+        if segundos > resolucion_segundos:
+            break
+        if dias is None or timedelta(days=dias) >= ventana:
+            elegido = (tabla, segundos)
+    if elegido[0] == 'HISTORIAL_INTERNET' and ventana > timedelta(days=RETENCION_CRUDA_DIAS):
+        logging.warning(f"La ventana pedida ({ventana}) excede la retención de las muestras crudas.")
+    return elegido
+
+
+def _a_datetime(valor):
+    # sqlite3 devuelve texto ISO; pyodbc ya devuelve datetime
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(str(valor))
+
+
+def _utc_naive():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
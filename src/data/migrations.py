@@ -0,0 +1,170 @@
+# src/data/migrations.py
+#
+# Migraciones de esquema versionadas. Cada migración se aplica una sola vez, en orden, y queda
+# registrada en SCHEMA_VERSION. Las sentencias son además idempotentes (IF ... IS NULL / NOT EXISTS)
+# para que las instalaciones que ya tenían los cambios aplicados por asegurar_esquema no fallen.
+
+import logging
+
+from . import internet_rollups
+
+# Índices de las consultas de monitoreo: (nombre, tabla, columnas clave, columnas INCLUDE, filtro)
+INDICES = [
+    # Cierre de fallas en update_device_in_db: {id_historial} = ? AND fecha_hora_fin IS NULL
+    ('IX_HISTORIAL_FALLAS_abiertas_dispositivo', 'HISTORIAL_FALLAS',
+     ['DISPOSITIVOS_id_dispositivo'], [], 'fecha_hora_fin IS NULL'),
+    ('IX_HISTORIAL_FALLAS_abiertas_especial', 'HISTORIAL_FALLAS',
+     ['DISPOSITIVOS_ESPECIALES_id_especial'], [], 'fecha_hora_fin IS NULL'),
+    ('IX_HISTORIAL_FALLAS_abiertas_servicio', 'HISTORIAL_FALLAS',
+     ['SERVICIOS_CONTPAQI_id_servicio'], [], 'fecha_hora_fin IS NULL'),
+    # Historial/conteo de fallas por rango de fecha_hora_inicio
+    ('IX_HISTORIAL_FALLAS_inicio', 'HISTORIAL_FALLAS', ['fecha_hora_inicio'],
+     ['fecha_hora_fin', 'DISPOSITIVOS_id_dispositivo', 'DISPOSITIVOS_ESPECIALES_id_especial', 'SERVICIOS_CONTPAQI_id_servicio'], None),
+    # Ventana y cola de HISTORIAL_INTERNET por fecha_hora, y el job de rollups
+    ('IX_HISTORIAL_INTERNET_fecha', 'HISTORIAL_INTERNET', ['fecha_hora'],
+     ['velocidad_descarga', 'velocidad_carga', 'ping', 'dispositivos_remotos', 'dispositivos_empresariales', 'tipo_muestra'], None),
+    # Último estado por sitio y cambios recientes (siembra del log de sitios web)
+    ('IX_HISTORIAL_SITIOS_WEB_dispositivo_fecha', 'HISTORIAL_SITIOS_WEB', ['DISPOSITIVOS_id_dispositivo', 'fecha_hora'], ['estado'], None),
+    # obtener_dispositivos: WHERE TIPOS_DISPOSITIVO_id_tipo = ? ORDER BY direccion
+    ('IX_DISPOSITIVOS_tipo_direccion', 'DISPOSITIVOS', ['TIPOS_DISPOSITIVO_id_tipo', 'direccion'],
+     ['nombre', 'ESTADOS_id_estado', 'EDIFICIOS_id_edificio'], None),
+]
+
+
+def sql_crear_indice(nombre, tabla, columnas, incluidas, filtro, dialecto: str = 'mssql') -> str:
+    """CREATE INDEX idempotente para SQL Server ('mssql') o para una base local de prueba ('sqlite')."""
+    if dialecto == 'sqlite':
+        # SQLite no tiene INCLUDE: las columnas incluidas pasan a la clave
+        sql = f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({', '.join(columnas + incluidas)})"
+        return sql + (f" WHERE {filtro}" if filtro else '')
+    sql = f"CREATE NONCLUSTERED INDEX {nombre} ON {tabla} ({', '.join(columnas)})"
+    if incluidas:
+        sql += f" INCLUDE ({', '.join(incluidas)})"
+    if filtro:
+        sql += f" WHERE {filtro}"
+    return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nombre}' AND object_id = OBJECT_ID('{tabla}'))\n"
+            f"    {sql};")
+
+
+# (versión, descripción, sentencias)
+MIGRACIONES = [
+    (1, "HISTORIAL_INTERNET.tipo_muestra", [
+        """
+        IF COL_LENGTH('HISTORIAL_INTERNET', 'tipo_muestra') IS NULL
+            ALTER TABLE HISTORIAL_INTERNET ADD tipo_muestra VARCHAR(10) NOT NULL
+                CONSTRAINT DF_HISTORIAL_INTERNET_tipo_muestra DEFAULT 'completa' WITH VALUES;
+        """,
+    ]),
+    (2, "RESUMEN_FALLAS_DIARIO con backfill del historial", [
+        """
+        IF OBJECT_ID('RESUMEN_FALLAS_DIARIO', 'U') IS NULL
+        BEGIN
+            CREATE TABLE RESUMEN_FALLAS_DIARIO (
+                fecha DATE NOT NULL,
+                tipo VARCHAR(50) NOT NULL,
+                total INT NOT NULL,
+                CONSTRAINT PK_RESUMEN_FALLAS_DIARIO PRIMARY KEY (fecha, tipo)
+            );
+            INSERT INTO RESUMEN_FALLAS_DIARIO (fecha, tipo, total)
+            SELECT fecha, tipo, COUNT(*) FROM (
+                SELECT CAST(hf.fecha_hora_inicio AS DATE) AS fecha, td.nombre_tipo AS tipo
+                FROM HISTORIAL_FALLAS hf
+                JOIN DISPOSITIVOS d ON hf.DISPOSITIVOS_id_dispositivo = d.id_dispositivo
+                JOIN TIPOS_DISPOSITIVO td ON d.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
+                UNION ALL
+                SELECT CAST(hf.fecha_hora_inicio AS DATE), tde.nombre_tipo
+                FROM HISTORIAL_FALLAS hf
+                JOIN DISPOSITIVOS_ESPECIALES de ON hf.DISPOSITIVOS_ESPECIALES_id_especial = de.id_especial
+                JOIN TIPOS_DISPOSITIVO tde ON de.TIPOS_DISPOSITIVO_id_tipo = tde.id_tipo
+                UNION ALL
+                SELECT CAST(hf.fecha_hora_inicio AS DATE), 'Servicios Contpaqi'
+                FROM HISTORIAL_FALLAS hf
+                WHERE hf.SERVICIOS_CONTPAQI_id_servicio IS NOT NULL
+            ) AS fallas
+            GROUP BY fecha, tipo;
+        END
+        """,
+    ]),
+    (3, "Tablas de rollup de HISTORIAL_INTERNET (5 min, hora, día)", [
+        f"IF OBJECT_ID('{tabla}', 'U') IS NULL\n{internet_rollups.sql_crear_tabla(tabla)};"
+        for tabla, _, _ in internet_rollups.NIVELES
+    ]),
+    (4, "Índices cubrientes y filtrados para las consultas de monitoreo", [
+        sql_crear_indice(*indice) for indice in INDICES
+    ]),
+    (5, "Marca de avance por nivel de los rollups de HISTORIAL_INTERNET", [
+        f"IF OBJECT_ID('{internet_rollups.TABLA_PROGRESO}', 'U') IS NULL\n{internet_rollups.SQL_CREAR_PROGRESO};",
+    ]),
+]
+
+
+def aplicar_migraciones(conn) -> list:
+    """
+    Aplica en orden las migraciones que no figuran en SCHEMA_VERSION, cada una en su propia
+    transacción. Retorna las versiones aplicadas; una migración fallida detiene las siguientes.
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+    IF OBJECT_ID('SCHEMA_VERSION', 'U') IS NULL
+        CREATE TABLE SCHEMA_VERSION (
+            version INT NOT NULL PRIMARY KEY,
+            descripcion VARCHAR(200) NOT NULL,
+            aplicada DATETIME NOT NULL CONSTRAINT DF_SCHEMA_VERSION_aplicada DEFAULT GETDATE()
+        );
+    """)
+    cursor.execute("SELECT version FROM SCHEMA_VERSION")
+    aplicadas = {row[0] for row in cursor.fetchall()}
+
+    nuevas = []
+    autocommit_original = conn.autocommit
+    try:
+        for version, descripcion, sentencias in MIGRACIONES:
+            if version in aplicadas:
+                continue
+            conn.autocommit = False
+            try:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+                cursor.execute("INSERT INTO SCHEMA_VERSION (version, descripcion) VALUES (?, ?)", (version, descripcion))
+                conn.commit()
+            except Exception as e:
+                try: conn.rollback()
+                except Exception: pass
+                logging.error(f"Falló la migración {version} ({descripcion}): {e}")
+                raise
+            nuevas.append(version)
+            logging.info(f"Migración {version} aplicada: {descripcion}.")
+    finally:
+        conn.autocommit = autocommit_original
+    return nuevas
+
+
+def version_actual(conn) -> int:
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(version) FROM SCHEMA_VERSION")
+    row = cursor.fetchone()
+    return row[0] or 0 if row else 0
+
+
+def sugerencias_indices(conn, tablas=None) -> list:
+    """
+    Consulta las DMVs de índices faltantes de SQL Server y retorna las sugerencias ordenadas por
+    impacto estimado (sólo para revisión; no se aplican automáticamente).
+    """
+    cursor = conn.cursor()
+    cursor.execute("""
+    SELECT OBJECT_NAME(d.object_id, d.database_id) AS tabla,
+           d.equality_columns, d.inequality_columns, d.included_columns,
+           s.user_seeks, s.avg_user_impact,
+           s.user_seeks * s.avg_total_user_cost * s.avg_user_impact AS impacto
+    FROM sys.dm_db_missing_index_details d
+    JOIN sys.dm_db_missing_index_groups g ON g.index_handle = d.index_handle
+    JOIN sys.dm_db_missing_index_group_stats s ON s.group_handle = g.index_group_handle
+    WHERE d.database_id = DB_ID()
+    ORDER BY impacto DESC
+    """)
+    columnas = [c[0] for c in cursor.description]
+    sugerencias = [dict(zip(columnas, row)) for row in cursor.fetchall()]
+    if tablas:
+        sugerencias = [s for s in sugerencias if s['tabla'] in tablas]
+    return sugerencias
@@ -0,0 +1,50 @@
+# src/data/open_faults.py
+
+import threading
+
+# Columna de HISTORIAL_FALLAS según la clase de equipo
+COLUMNAS_FALLA = {
+    'dispositivo': 'DISPOSITIVOS_id_dispositivo',
+    'especial': 'DISPOSITIVOS_ESPECIALES_id_especial',
+    'servicio': 'SERVICIOS_CONTPAQI_id_servicio',
+}
+
+
+class IndiceFallasAbiertas:
+    """
+    Fallas abiertas (fecha_hora_fin IS NULL) en memoria: (clase, id del equipo) -> ids de HISTORIAL_FALLAS.
+    Se carga al arrancar y lo mantiene el writer, así que abrir y cerrar no necesitan buscar en la tabla.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._abiertas = {}
+        self.cargado = False
+
+    def cargar(self, filas):
+        """Reemplaza el índice con filas (id_historialfallas, id_dispositivo, id_especial, id_servicio)."""
+        abiertas = {}
+        for id_falla, id_dispositivo, id_especial, id_servicio in filas:
+            for clase, id_equipo in (('dispositivo', id_dispositivo), ('especial', id_especial), ('servicio', id_servicio)):
+                if id_equipo is not None:
+                    abiertas.setdefault((clase, id_equipo), []).append(id_falla)
+        with self._lock:
+            self._abiertas = abiertas
+            self.cargado = True
+
+    def abiertas(self, clase: str, id_equipo) -> list:
+        with self._lock:
+            return list(self._abiertas.get((clase, id_equipo), ()))
+
+    def abrir(self, clase: str, id_equipo, id_falla):
+        with self._lock:
+            self._abiertas.setdefault((clase, id_equipo), []).append(id_falla)
+
+    def cerrar(self, clase: str, id_equipo) -> list:
+        """Quita y retorna los ids abiertos del equipo (normalmente uno; más si la BD traía duplicados)."""
+        with self._lock:
+            return self._abiertas.pop((clase, id_equipo), [])
+
+    def duplicadas(self) -> dict:
+        with self._lock:
+            return {clave: list(ids) for clave, ids in self._abiertas.items() if len(ids) > 1}
@@ -0,0 +1,97 @@
+# src/data/sitios_history.py
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+
+class RegistroEventosSitios:
+    """
+    Log de cambios de estado por sitio web, en memoria: para cada sitio se guardan los eventos
+    de la ventana más el último evento anterior a ella (el estado con el que arranca la ventana).
+    Se siembra con una consulta al arrancar y después lo alimenta el propio write path.
+    """
+
+    def __init__(self, ventana: timedelta = timedelta(hours=1)):
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        # id_sitio -> {'direccion': str, 'eventos': [(fecha_utc, estado)]}
+        self._sitios = {}
+        self.sembrado = False
+
+    def sembrar(self, filas):
+        """Carga filas (fecha_hora, estado, direccion, id_dispositivo) leídas de la BD."""
+        sitios = {}
+        for fecha, estado, direccion, id_sitio in filas:
+            sitio = sitios.setdefault(id_sitio, {'direccion': direccion, 'eventos': []})
+            sitio['eventos'].append((_utc(fecha), int(estado)))
+        for sitio in sitios.values():
+            sitio['eventos'].sort(key=lambda e: e[0])
+        with self._lock:
+            self._sitios = sitios
+            self._recortar()
+            self.sembrado = True
+
+    def registrar(self, id_sitio, estado: int, direccion: str = None, fecha: datetime = None) -> bool:
+        """
+        Agrega un cambio de estado. Retorna False si el sitio no se conoce y no se dio su
+        dirección (el llamador debe volver a sembrar).
+        """
+        fecha = _utc(fecha) if fecha else datetime.now(timezone.utc)
+        with self._lock:
+            sitio = self._sitios.get(id_sitio)
+            if sitio is None:
+                if not direccion:
+                    return False
+                sitio = self._sitios[id_sitio] = {'direccion': direccion, 'eventos': []}
+            elif direccion:
+                sitio['direccion'] = direccion
+            sitio['eventos'].append((fecha, int(estado)))
+            self._recortar_sitio(sitio)
+            return True
+
+    def renombrar(self, id_sitio, direccion: str) -> bool:
+        """Cambia la dirección de un sitio conservando sus eventos. Retorna False si el sitio no está en el log."""
+        with self._lock:
+            sitio = self._sitios.get(id_sitio)
+            if sitio is None:
+                return False
+            sitio['direccion'] = direccion
+            return True
+
+    def olvidar(self, id_sitio=None):
+        """Descarta un sitio (o todo el log, que se volverá a sembrar en la próxima lectura)."""
+        with self._lock:
+            if id_sitio is None:
+                self._sitios = {}
+                self.sembrado = False
+            else:
+                self._sitios.pop(id_sitio, None)
+
+    def eventos(self) -> list:
+        """Filas (fecha_hora, estado, direccion, id_dispositivo) en orden cronológico."""
+        with self._lock:
+            self._recortar()
+            filas = [
+                (fecha, estado, sitio['direccion'], id_sitio)
+                for id_sitio, sitio in self._sitios.items()
+                for fecha, estado in sitio['eventos']
+            ]
+        filas.sort(key=lambda f: f[0])
+        return filas
+
+    def _recortar(self):
+        for sitio in self._sitios.values():
+            self._recortar_sitio(sitio)
+
+    def _recortar_sitio(self, sitio):
+        # Conserva los eventos de la ventana y el último anterior a ella
+        limite = datetime.now(timezone.utc) - self.ventana
+        eventos = sitio['eventos']
+        primero_en_ventana = next((i for i, (fecha, _) in enumerate(eventos) if fecha >= limite), len(eventos))
+        if primero_en_ventana > 1:
+            del eventos[:primero_en_ventana - 1]
+
+
+def _utc(fecha):
+    # HISTORIAL_SITIOS_WEB guarda fecha_hora en UTC (GETUTCDATE) y sin zona horaria
+    return fecha.replace(tzinfo=timezone.utc) if fecha.tzinfo is None else fecha
@@ -2,8 +2,16 @@
 import pyodbc
 import logging
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
+import time
+from .fault_summary import ContadorFallasDiario, etiqueta_tipo_falla
+from .internet_history import BufferHistorialInternet
+from .sitios_history import RegistroEventosSitios
+from .open_faults import COLUMNAS_FALLA, IndiceFallasAbiertas
+from .crud_cache import CacheCrudDispositivos
+from . import internet_rollups
+from .migrations import aplicar_migraciones
 
 # --- 1. CONFIGURACIÓN Y CONEXIÓN (ahora desde ENV) ---
 DB_DRIVER = os.getenv('DB_DRIVER', '{ODBC Driver 17 for SQL Server}')
@@ -53,6 +61,38 @@ def db_connection_manager():
         if conn:
             conn.close()
 
+# Conteo de fallas de los últimos 30 días en memoria; se reconcilia con RESUMEN_FALLAS_DIARIO cada tanto
+FALLAS_RECONCILIACION_SECONDS = int(os.getenv('FALLAS_RECONCILIACION_SECONDS', 15 * 60))
+contador_fallas = ContadorFallasDiario(dias=30)
+_ultima_reconciliacion_fallas = {'ts': None}
+
+# Última hora de HISTORIAL_INTERNET en memoria; tras sembrarse sólo se leen las filas nuevas
+buffer_historial_internet = BufferHistorialInternet()
+# Solape al leer la cola, para no perder inserts de otros escritores que confirmen con algo de retraso
+HISTORIAL_INTERNET_SOLAPE_SECONDS = 5
+
+# Cambios de estado de sitios web de la última hora (más el estado previo de cada sitio), en memoria
+registro_sitios_web = RegistroEventosSitios()
+
+# Fallas abiertas por equipo, en memoria; se carga al arrancar y la mantiene update_device_in_db
+indice_fallas_abiertas = IndiceFallasAbiertas()
+
+# Snapshot por tipo de la tabla CRUD del panel de administración; lo invalidan las escrituras del panel
+cache_crud = CacheCrudDispositivos(ttl_segundos=int(os.getenv('CRUD_CACHE_TTL_SECONDS', 60)))
+
+def asegurar_esquema() -> bool:
+    """Aplica las migraciones de esquema pendientes (ver src/data/migrations.py). Es seguro llamarla en cada arranque."""
+    with db_connection_manager() as conn:
+        if not conn:
+            logging.error("No se pudo conectar a la BD para verificar el esquema.")
+            return False
+        try:
+            aplicar_migraciones(conn)
+            return True
+        except Exception as e:
+            logging.error(f"Error al aplicar cambios de esquema: {e}")
+            return False
+
 # --- 2. FUNCIONES DE LECTURA (GETTERS) ---
 
 def get_estados_map() -> dict:
@@ -69,6 +109,43 @@ def get_estados_map() -> dict:
             logging.error(f"Error al obtener el mapa de estados: {e}")
             return {}
 
+def obtener_estados_actuales() -> dict:
+    """
+    Último estado guardado de todos los equipos (dispositivos, especiales y servicios ContpaQi) en una
+    sola consulta, para restaurar el estado en memoria al arrancar.
+    """
+    with db_connection_manager() as conn:
+        if not conn: return {"error": "No se pudo conectar a la base de datos."}
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT 'dispositivo' AS clase, d.id_dispositivo AS id, d.nombre, d.direccion, td.nombre_tipo,
+                       e.nombre AS nombre_edificio, es.nombre_estado, NULL AS puerto_checador
+                FROM DISPOSITIVOS d
+                JOIN TIPOS_DISPOSITIVO td ON d.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
+                LEFT JOIN EDIFICIOS e ON d.EDIFICIOS_id_edificio = e.id_edificio
+                LEFT JOIN ESTADOS es ON d.ESTADOS_id_estado = es.id_estado
+                UNION ALL
+                SELECT 'especial', de.id_especial, de.nombre, de.direccion, td.nombre_tipo,
+                       e.nombre, es.nombre_estado, de.puerto_checador
+                FROM DISPOSITIVOS_ESPECIALES de
+                JOIN TIPOS_DISPOSITIVO td ON de.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
+                LEFT JOIN EDIFICIOS e ON de.EDIFICIOS_id_edificio = e.id_edificio
+                LEFT JOIN ESTADOS es ON de.ESTADOS_id_estado = es.id_estado
+                UNION ALL
+                SELECT 'servicio', sc.id_servicio, sc.nombre_servicio, NULL, 'Servicio ContpaQi',
+                       NULL, es.nombre_estado, NULL
+                FROM SERVICIOS_CONTPAQI sc
+                LEFT JOIN ESTADOS es ON sc.ESTADOS_id_estado = es.id_estado
+                """
+            )
+            columnas = [c[0] for c in cursor.description]
+            return {"equipos": [dict(zip(columnas, row)) for row in cursor.fetchall()]}
+        except Exception as e:
+            logging.error(f"Error al obtener los estados actuales: {e}")
+            return {"error": str(e)}
+
 def obtener_dispositivos(nombre_tipo_dispositivo, agrupar_por_edificio=False) -> list:
     """Obtiene la lista de dispositivos de la base de datos por tipo."""
     with db_connection_manager() as conn:
@@ -195,81 +272,150 @@ def obtener_dvr_db() -> dict:
     return {"dispositivos": dvr_info}
 
 def obtener_conteo_fallas() -> dict:
-    """Obtiene el conteo de todas las fallas ocurridas en el último mes agrupadas por tipo de dispositivo."""
+    """
+    Conteo de fallas de los últimos 30 días agrupadas por tipo de dispositivo.
+    Se sirve desde el contador en memoria; sólo consulta la BD (el resumen diario) para reconciliar.
+    """
+    ultima = _ultima_reconciliacion_fallas['ts']
+    if not contador_fallas.cargado or ultima is None or time.monotonic() - ultima >= FALLAS_RECONCILIACION_SECONDS:
+        resultado = reconciliar_conteo_fallas()
+        if "error" in resultado and not contador_fallas.cargado:
+            return resultado
+    return contador_fallas.conteo()
+
+def reconciliar_conteo_fallas() -> dict:
+    """Recarga el contador en memoria desde RESUMEN_FALLAS_DIARIO."""
     with db_connection_manager() as conn:
         if not conn: return {"error": "No se pudo conectar a la base de datos."}
         try:
             cursor = conn.cursor()
-            # Consulta que une ambos tipos de dispositivos y agrupa por tipo, considerando el último mes
-            query = """
-            SELECT tipo, COUNT(*) AS total_fallas FROM (
-                SELECT td.nombre_tipo AS tipo
-                FROM HISTORIAL_FALLAS hf
-                JOIN DISPOSITIVOS d ON hf.DISPOSITIVOS_id_dispositivo = d.id_dispositivo
-                JOIN TIPOS_DISPOSITIVO td ON d.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
-                WHERE hf.fecha_hora_inicio >= DATEADD(month, -1, GETDATE())
-                UNION ALL
-                SELECT tde.nombre_tipo AS tipo
-                FROM HISTORIAL_FALLAS hf
-                JOIN DISPOSITIVOS_ESPECIALES de ON hf.DISPOSITIVOS_ESPECIALES_id_especial = de.id_especial
-                JOIN TIPOS_DISPOSITIVO tde ON de.TIPOS_DISPOSITIVO_id_tipo = tde.id_tipo
-                WHERE hf.fecha_hora_inicio >= DATEADD(month, -1, GETDATE())
-                UNION ALL
-                SELECT 'Servicios Contpaqi' AS tipo
-                FROM HISTORIAL_FALLAS hf
-                JOIN SERVICIOS_CONTPAQI sc ON hf.SERVICIOS_CONTPAQI_id_servicio = sc.id_servicio
-                WHERE hf.fecha_hora_inicio >= DATEADD(month, -1, GETDATE())
-            ) AS fallas
-            GROUP BY tipo
-            ORDER BY total_fallas DESC;
-            """
-            cursor.execute(query)
-            resultados = cursor.fetchall()
-            
-            if not resultados:
-                return {"fallas": [], "labels": []}
-            labels = [row[0] for row in resultados]
-            values = [row[1] for row in resultados]
-            return {"fallas": values, "labels": labels}
+            cursor.execute(
+                "SELECT fecha, tipo, total FROM RESUMEN_FALLAS_DIARIO WHERE fecha >= DATEADD(day, -?, CAST(GETDATE() AS DATE))",
+                contador_fallas.dias
+            )
+            contador_fallas.reemplazar((row.fecha, row.tipo, row.total) for row in cursor.fetchall())
+            _ultima_reconciliacion_fallas['ts'] = time.monotonic()
+            return {"success": True}
         except Exception as e:
             logging.error(f"Error al procesar el conteo de fallas: {e}", exc_info=True)
             return {"error": f"Error al obtener el conteo de fallas: {e}"}
 
+_COLUMNAS_HISTORIAL_INTERNET = """
+    id_historialinternet, fecha_hora, velocidad_descarga, velocidad_carga, ping,
+    dispositivos_remotos, dispositivos_empresariales, tipo_muestra
+"""
+
+def _fila_historial_internet(row) -> dict:
+    return {
+        'id': row.id_historialinternet, 'fecha_hora': row.fecha_hora,
+        'velocidad_descarga': row.velocidad_descarga, 'velocidad_carga': row.velocidad_carga, 'ping': row.ping,
+        'remotos': row.dispositivos_remotos, 'empresariales': row.dispositivos_empresariales,
+        'tipo_muestra': row.tipo_muestra,
+    }
+
 def obtener_historial_internet() -> dict:
-    """Obtiene el historial de internet de la última hora."""
+    """Obtiene el historial de internet de la última hora (desde el buffer en memoria)."""
     with db_connection_manager() as conn:
-        if not conn: return {"error": "No se pudo conectar a la base de datos."}
+        if not conn and not buffer_historial_internet.sembrado:
+            return {"error": "No se pudo conectar a la base de datos."}
         try:
-            cursor = conn.cursor()
-            query = """
-            SELECT 
-                fecha_hora, velocidad_descarga, velocidad_carga, ping, 
-                dispositivos_remotos, dispositivos_empresariales
-            FROM HISTORIAL_INTERNET
-            WHERE fecha_hora >= DATEADD(hour, -1, GETUTCDATE())
-            ORDER BY fecha_hora ASC;
-            """
-            cursor.execute(query)
-            resultados = cursor.fetchall()
-            
-            fechas = [row.fecha_hora for row in resultados]
-            descarga = [row.velocidad_descarga if row.velocidad_descarga is not None else 0 for row in resultados]
-            carga = [row.velocidad_carga if row.velocidad_carga is not None else 0 for row in resultados]
-            pings = [row.ping if row.ping is not None else 0 for row in resultados]
-            remotos = [row.dispositivos_remotos if row.dispositivos_remotos is not None else 0 for row in resultados]
-            empresariales = [row.dispositivos_empresariales if row.dispositivos_empresariales is not None else 0 for row in resultados]
-            
+            if conn:
+                cursor = conn.cursor()
+                ultima = buffer_historial_internet.ultima_fecha()
+                if not buffer_historial_internet.sembrado:
+                    # Única lectura de la ventana completa: al arrancar
+                    cursor.execute(f"""
+                    SELECT {_COLUMNAS_HISTORIAL_INTERNET} FROM HISTORIAL_INTERNET
+                    WHERE fecha_hora >= DATEADD(hour, -1, GETUTCDATE())
+                    ORDER BY fecha_hora ASC;
+                    """)
+                    buffer_historial_internet.sembrar([_fila_historial_internet(row) for row in cursor.fetchall()])
+                else:
+                    # Cola: sólo filas posteriores a la última vista (por si hay otros escritores)
+                    cursor.execute(f"""
+                    SELECT {_COLUMNAS_HISTORIAL_INTERNET} FROM HISTORIAL_INTERNET
+                    WHERE fecha_hora > ?
+                    ORDER BY fecha_hora ASC;
+                    """, ultima - timedelta(seconds=HISTORIAL_INTERNET_SOLAPE_SECONDS))
+                    buffer_historial_internet.agregar([_fila_historial_internet(row) for row in cursor.fetchall()])
+
+            resultados = buffer_historial_internet.filas()
+            fechas = [row['fecha_hora'] for row in resultados]
+            # Las muestras de sólo latencia no miden throughput: se dejan como hueco (None), no como caída a 0
+            descarga = [None if row['tipo_muestra'] == 'latencia' else (row['velocidad_descarga'] or 0) for row in resultados]
+            carga = [None if row['tipo_muestra'] == 'latencia' else (row['velocidad_carga'] or 0) for row in resultados]
+            pings = [row['ping'] if row['ping'] is not None else 0 for row in resultados]
+            remotos = [row['remotos'] if row['remotos'] is not None else 0 for row in resultados]
+            empresariales = [row['empresariales'] if row['empresariales'] is not None else 0 for row in resultados]
+
             return {
-                "fechas": fechas, "descarga": descarga, "carga": carga, "pings": pings, 
+                "fechas": fechas, "descarga": descarga, "carga": carga, "pings": pings,
                 "remotos": remotos, "empresariales": empresariales
             }
-            
+
         except Exception as e:
             logging.error(f"Error al obtener el historial de internet: {e}")
             return {"error": f"Error al obtener el historial de internet: {e}"}
 
+def obtener_serie_historial_internet(horas: float, resolucion_segundos: int = 60) -> dict:
+    """
+    Serie de internet para una ventana de `horas`, leída de la tabla más gruesa que respeta la
+    resolución pedida (rollups de 5 min/hora/día o las muestras crudas). Usa los promedios del bucket.
+    """
+    tabla, _ = internet_rollups.elegir_nivel(timedelta(hours=horas), resolucion_segundos)
+    if tabla == 'HISTORIAL_INTERNET':
+        query = """
+        SELECT fecha_hora, velocidad_descarga AS descarga, velocidad_carga AS carga, ping,
+               dispositivos_remotos AS remotos, dispositivos_empresariales AS empresariales
+        FROM HISTORIAL_INTERNET WHERE fecha_hora >= ? ORDER BY fecha_hora ASC
+        """
+    else:
+        query = f"""
+        SELECT bucket_inicio AS fecha_hora, descarga_avg AS descarga, carga_avg AS carga, ping_avg AS ping,
+               remotos_avg AS remotos, empresariales_avg AS empresariales
+        FROM {tabla} WHERE bucket_inicio >= ? ORDER BY bucket_inicio ASC
+        """
+    desde = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=horas)
+    with db_connection_manager() as conn:
+        if not conn: return {"error": "No se pudo conectar a la base de datos."}
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, desde)
+            resultados = cursor.fetchall()
+            return {
+                "fechas": [row.fecha_hora for row in resultados],
+                "descarga": [row.descarga for row in resultados],
+                "carga": [row.carga for row in resultados],
+                "pings": [row.ping for row in resultados],
+                "remotos": [row.remotos for row in resultados],
+                "empresariales": [row.empresariales for row in resultados],
+                "tabla": tabla,
+            }
+        except Exception as e:
+            logging.error(f"Error al obtener la serie de internet desde {tabla}: {e}")
+            return {"error": f"Error al obtener la serie de internet: {e}"}
+
+def ejecutar_rollups_internet() -> dict:
+    """Agrega las muestras crudas de internet en las tablas de rollup y aplica la retención."""
+    with db_connection_manager() as conn:
+        if not conn: return {"error": "No se pudo conectar a la base de datos."}
+        try:
+            conn.autocommit = False
+            return internet_rollups.ejecutar_rollups(conn)
+        except Exception as e:
+            try: conn.rollback()
+            except Exception: pass
+            logging.error(f"Error al ejecutar los rollups de internet: {e}")
+            return {"error": str(e)}
+
 def obtener_historial_sitios_web() -> dict:
-    """Obtiene los registros de estado de sitios web de la última hora."""
+    """Obtiene los registros de estado de sitios web de la última hora (desde el log en memoria)."""
+    if registro_sitios_web.sembrado:
+        return {"data": registro_sitios_web.eventos()}
+    return _sembrar_historial_sitios_web()
+
+def _sembrar_historial_sitios_web() -> dict:
+    # Única consulta al historial completo: último estado de cada sitio + cambios de la última hora
     with db_connection_manager() as conn:
         if not conn: return {"error": "No se pudo conectar a la base de datos."}
         try:
@@ -299,8 +445,8 @@ def obtener_historial_sitios_web() -> dict:
             """
             cursor = conn.cursor()
             cursor.execute(query)
-            resultados = cursor.fetchall()
-            return {"data": resultados}
+            registro_sitios_web.sembrar((row.fecha_hora, row.estado, row.direccion, row.id_dispositivo) for row in cursor.fetchall())
+            return {"data": registro_sitios_web.eventos()}
             
         except Exception as e:
             logging.error(f"Error al obtener el historial de sitios web: {e}")
@@ -343,8 +489,28 @@ def obtener_edificios() -> list:
             logging.error(f"Error al obtener edificios: {e}")
             return []
 
-def obtener_dispositivos_crud(id_tipo) -> dict:
-    """Obtiene dispositivos de DISPOSITIVOS o DISPOSITIVOS_ESPECIALES por id_tipo para la tabla CRUD."""
+def obtener_dispositivos_crud(id_tipo, busqueda: str = '', pagina: int = 0, tamano_pagina: int = None) -> dict:
+    """
+    Dispositivos de `id_tipo` para la tabla CRUD, servidos desde el snapshot en memoria del tipo.
+    `busqueda` filtra por nombre, descripción o dirección; con `tamano_pagina` se devuelve sólo
+    la página `pagina` (base 0) y 'total' trae el número de coincidencias.
+    """
+    snapshot = cache_crud.obtener(id_tipo, _leer_dispositivos_crud)
+    if "error" in snapshot:
+        return snapshot
+    filas = cache_crud.filtrar(snapshot, busqueda)
+    if tamano_pagina:
+        inicio = max(0, int(pagina or 0)) * tamano_pagina
+        pagina_filas = filas[inicio:inicio + tamano_pagina]
+    else:
+        pagina_filas = filas
+    return {
+        "data": pagina_filas, "total": len(filas), "is_special": snapshot['is_special'],
+        "id_tipo": snapshot['id_tipo'], "nombre_tipo": snapshot['nombre_tipo']
+    }
+
+def _leer_dispositivos_crud(id_tipo) -> dict:
+    """Lee de la BD todos los dispositivos de DISPOSITIVOS o DISPOSITIVOS_ESPECIALES de `id_tipo`."""
     with db_connection_manager() as conn:
         if not conn: return {"error": "No se pudo conectar a la base de datos."}
         try:
@@ -371,7 +537,7 @@ def obtener_dispositivos_crud(id_tipo) -> dict:
                 LEFT JOIN EDIFICIOS e ON de.EDIFICIOS_id_edificio = e.id_edificio
                 JOIN ESTADOS es ON de.ESTADOS_id_estado = es.id_estado
                 WHERE de.TIPOS_DISPOSITIVO_id_tipo = ?
-                ORDER BY de.nombre;
+                ORDER BY de.nombre, de.id_especial;
                 """
             else:
                 # Dispositivos Comunes (DISPOSITIVOS)
@@ -385,7 +551,7 @@ def obtener_dispositivos_crud(id_tipo) -> dict:
                 LEFT JOIN EDIFICIOS e ON d.EDIFICIOS_id_edificio = e.id_edificio
                 JOIN ESTADOS es ON d.ESTADOS_id_estado = es.id_estado
                 WHERE d.TIPOS_DISPOSITIVO_id_tipo = ?
-                ORDER BY d.nombre;
+                ORDER BY d.nombre, d.id_dispositivo;
                 """
             
             cursor.execute(query, id_tipo)
@@ -410,20 +576,80 @@ def actualizar_credenciales_dispositivo(id_dispositivo, usuario, contrasena) ->
             cursor.execute(query, usuario, contrasena, id_dispositivo)
             if cursor.rowcount == 0:
                 return {"error": "No se encontró el dispositivo para actualizar."}
+            cache_crud.invalidar()
             return {"success": True}
         except Exception as e:
             logging.error(f"Error al actualizar credenciales del dispositivo {id_dispositivo}: {e}")
             return {"error": str(e)}
 
-def registrar_cambio_estado_sitio(id_dispositivo, nuevo_estado):
+def registrar_cambio_estado_sitio(id_dispositivo, nuevo_estado, direccion=None):
     """Registra el cambio de estado de un sitio web."""
-    with db_connection_manager() as conn:
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO HISTORIAL_SITIOS_WEB (fecha_hora, estado, DISPOSITIVOS_id_dispositivo) VALUES (GETUTCDATE(), ?, ?)",
-                nuevo_estado, id_dispositivo
-            )
+    return registrar_cambios_estado_sitios([{'id_dispositivo': id_dispositivo, 'estado': nuevo_estado, 'direccion': direccion}])
+
+def registrar_cambios_estado_sitios(cambios: list, retries: int = 3, delay: int = 2) -> bool:
+    """
+    Registra en un solo INSERT por lotes los cambios de estado de sitios web.
+    `cambios` es una lista de {'id_dispositivo': ..., 'estado': 0/1, 'direccion': ...}. Reintenta si falla la BD.
+    Tras confirmar la escritura, los cambios se agregan al log en memoria de sitios web.
+    """
+    if not cambios:
+        return True
+    params = [(cambio['estado'], cambio['id_dispositivo']) for cambio in cambios]
+
+    for attempt in range(retries):
+        with db_connection_manager() as conn:
+            if conn:
+                try:
+                    conn.autocommit = False
+                    cursor = conn.cursor()
+                    cursor.fast_executemany = True
+                    cursor.executemany(
+                        "INSERT INTO HISTORIAL_SITIOS_WEB (fecha_hora, estado, DISPOSITIVOS_id_dispositivo) VALUES (GETUTCDATE(), ?, ?)",
+                        params
+                    )
+                    conn.commit()
+                    _registrar_en_log_sitios(cambios)
+                    return True
+                except Exception as e:
+                    try: conn.rollback()
+                    except Exception: pass
+                    logging.warning(f"Intento {attempt + 1} de registrar {len(params)} cambios de sitios web falló: {e}")
+        if attempt < retries - 1:
+            time.sleep(delay)
+
+    logging.error(f"No se pudieron registrar {len(params)} cambios de estado de sitios web después de {retries} intentos.")
+    return False
+
+def _registrar_en_log_sitios(cambios):
+    if not registro_sitios_web.sembrado:
+        return
+    for cambio in cambios:
+        if not registro_sitios_web.registrar(cambio['id_dispositivo'], cambio['estado'], cambio.get('direccion')):
+            # Sitio desconocido y sin dirección: se vuelve a sembrar en la próxima lectura
+            registro_sitios_web.olvidar()
+            return
+
+def cargar_fallas_abiertas(cursor=None) -> dict:
+    """Carga el índice en memoria de fallas abiertas (fecha_hora_fin IS NULL) desde HISTORIAL_FALLAS."""
+    if cursor is None:
+        with db_connection_manager() as conn:
+            if not conn: return {"error": "No se pudo conectar a la base de datos."}
+            return cargar_fallas_abiertas(conn.cursor())
+    try:
+        cursor.execute(
+            """
+            SELECT id_historialfallas, DISPOSITIVOS_id_dispositivo, DISPOSITIVOS_ESPECIALES_id_especial, SERVICIOS_CONTPAQI_id_servicio
+            FROM HISTORIAL_FALLAS WHERE fecha_hora_fin IS NULL
+            """
+        )
+        indice_fallas_abiertas.cargar(tuple(row) for row in cursor.fetchall())
+        duplicadas = indice_fallas_abiertas.duplicadas()
+        if duplicadas:
+            logging.warning(f"{len(duplicadas)} equipos tienen más de una falla abierta; se cerrarán juntas al recuperarse.")
+        return {"success": True}
+    except Exception as e:
+        logging.error(f"Error al cargar las fallas abiertas: {e}")
+        return {"error": str(e)}
 
 def update_device_in_db(cursor, data, estados_map):
     """Actualiza el estado de un dispositivo/servicio en la BD y gestiona el historial de fallas."""
@@ -440,30 +666,67 @@ def update_device_in_db(cursor, data, estados_map):
         if es_servicio_contpaqi:
             tabla_a_actualizar = "SERVICIOS_CONTPAQI"
             id_columna = "id_servicio"
-            id_historial = "SERVICIOS_CONTPAQI_id_servicio"
+            clase = 'servicio'
         elif es_especial:
             tabla_a_actualizar = "DISPOSITIVOS_ESPECIALES"
             id_columna = "id_especial"
-            id_historial = "DISPOSITIVOS_ESPECIALES_id_especial"
+            clase = 'especial'
         else:
             tabla_a_actualizar = "DISPOSITIVOS"
             id_columna = "id_dispositivo"
-            id_historial = "DISPOSITIVOS_id_dispositivo"
+            clase = 'dispositivo'
+        id_historial = COLUMNAS_FALLA[clase]
 
         id_estado = estados_map.get(estado_final)
         if id_estado:
             query_update = f"UPDATE {tabla_a_actualizar} SET ESTADOS_id_estado = ?, ultima_verificacion = GETDATE() WHERE {id_columna} = ?"
             cursor.execute(query_update, id_estado, id_dispositivo)
 
+        if tipo_dispositivo == 'PC':
+            return
+
         # Lógica de registro de historial de fallas (iniciar o cerrar)
-        if tipo_dispositivo != 'PC' and estado_anterior not in ['Error', 'Inactivo'] and estado_final == 'Error':
+        if not indice_fallas_abiertas.cargado:
+            cargar_fallas_abiertas(cursor)
+        if indice_fallas_abiertas.cargado:
+            # Con el índice, estado_anterior (que se pierde al reiniciar) no basta para decidir:
+            # no se abre una segunda falla y se cierra la que quedó abierta antes del reinicio
+            abiertas = indice_fallas_abiertas.abiertas(clase, id_dispositivo)
+            abrir = not abiertas and estado_anterior not in ['Error', 'Inactivo'] and estado_final == 'Error'
+            cerrar = bool(abiertas) and estado_final in ['Activo', 'Advertencia']
+        else:
+            abiertas = None
+            abrir = estado_anterior not in ['Error', 'Inactivo'] and estado_final == 'Error'
+            cerrar = estado_anterior == 'Error' and estado_final in ['Activo', 'Advertencia']
+
+        if abrir:
             detalle = f"Dispositivo cambió a estado {estado_final}."
-            query_insert = f"INSERT INTO HISTORIAL_FALLAS (fecha_hora_inicio, detalle_falla, {id_historial}) VALUES (GETDATE(), ?, ?)"
+            query_insert = f"INSERT INTO HISTORIAL_FALLAS (fecha_hora_inicio, detalle_falla, {id_historial}) OUTPUT INSERTED.id_historialfallas VALUES (GETDATE(), ?, ?)"
             cursor.execute(query_insert, detalle, id_dispositivo)
+            insertada = cursor.fetchone()
+            if insertada and indice_fallas_abiertas.cargado:
+                indice_fallas_abiertas.abrir(clase, id_dispositivo, insertada[0])
+            etiqueta = etiqueta_tipo_falla(tipo_dispositivo)
+            cursor.execute(
+                """
+                UPDATE RESUMEN_FALLAS_DIARIO SET total = total + 1 WHERE fecha = CAST(GETDATE() AS DATE) AND tipo = ?;
+                IF @@ROWCOUNT = 0
+                    INSERT INTO RESUMEN_FALLAS_DIARIO (fecha, tipo, total) VALUES (CAST(GETDATE() AS DATE), ?, 1);
+                """,
+                etiqueta, etiqueta
+            )
+            contador_fallas.registrar(tipo_dispositivo)
             logging.warning(f"Nueva falla registrada para {tipo_dispositivo} {id_dispositivo}: {detalle}")
-        elif tipo_dispositivo != 'PC' and estado_anterior == 'Error' and estado_final in ['Activo', 'Advertencia']:
-            query_update_fallas = f"UPDATE HISTORIAL_FALLAS SET fecha_hora_fin = GETDATE() WHERE {id_historial} = ? AND fecha_hora_fin IS NULL"
-            cursor.execute(query_update_fallas, id_dispositivo)
+        elif cerrar:
+            if abiertas:
+                # Cierre por clave primaria
+                marcadores = ', '.join('?' for _ in abiertas)
+                query_update_fallas = f"UPDATE HISTORIAL_FALLAS SET fecha_hora_fin = GETDATE() WHERE id_historialfallas IN ({marcadores}) AND fecha_hora_fin IS NULL"
+                cursor.execute(query_update_fallas, *abiertas)
+                indice_fallas_abiertas.cerrar(clase, id_dispositivo)
+            else:
+                query_update_fallas = f"UPDATE HISTORIAL_FALLAS SET fecha_hora_fin = GETDATE() WHERE {id_historial} = ? AND fecha_hora_fin IS NULL"
+                cursor.execute(query_update_fallas, id_dispositivo)
             logging.info(f"Falla finalizada para {tipo_dispositivo} {id_dispositivo}.")
     except Exception as e:
         logging.error(f"ERROR: Fallo al actualizar el estado del dispositivo/servicio {id_dispositivo} en la BD: {e}")
@@ -477,29 +740,64 @@ def registrar_historial_internet(data):
                 """
                 INSERT INTO HISTORIAL_INTERNET (
                     fecha_hora, velocidad_descarga, velocidad_carga, ping, 
-                    dispositivos_remotos, dispositivos_empresariales
-                ) VALUES (GETUTCDATE(), ?, ?, ?, ?, ?)
+                    dispositivos_remotos, dispositivos_empresariales, tipo_muestra
+                )
+                OUTPUT INSERTED.id_historialinternet, INSERTED.fecha_hora
+                VALUES (GETUTCDATE(), ?, ?, ?, ?, ?, ?)
                 """,
                 data.get('velocidad_descarga'), 
                 data.get('velocidad_carga'), 
                 data.get('ping'),
                 data.get('remotos'),
-                data.get('empresariales')
+                data.get('empresariales'),
+                data.get('tipo_muestra', 'completa')
             )
+            insertada = cursor.fetchone()
+            # El buffer sólo se alimenta una vez sembrado; antes de eso la siembra ya incluirá esta fila
+            if insertada and buffer_historial_internet.sembrado:
+                buffer_historial_internet.agregar([{
+                    'id': insertada.id_historialinternet, 'fecha_hora': insertada.fecha_hora,
+                    'velocidad_descarga': data.get('velocidad_descarga'), 'velocidad_carga': data.get('velocidad_carga'),
+                    'ping': data.get('ping'), 'remotos': data.get('remotos'), 'empresariales': data.get('empresariales'),
+                    'tipo_muestra': data.get('tipo_muestra', 'completa'),
+                }])
 
 def eliminar_dispositivo(id_dispositivo, is_special) -> dict:
     """Elimina un dispositivo de DISPOSITIVOS o DISPOSITIVOS_ESPECIALES, incluyendo la eliminación en cascada de registros relacionados."""
     with db_connection_manager() as conn:
         if not conn: return {"error": "No se pudo conectar a la base de datos."}
         try:
+            # Todo en una transacción: el resumen diario no puede quedar descontado sin el borrado (ni al revés)
+            conn.autocommit = False
             cursor = conn.cursor()
             
             # 1. Determinar tablas y columnas
             tabla_principal = "DISPOSITIVOS_ESPECIALES" if is_special else "DISPOSITIVOS"
             id_columna_principal = "id_especial" if is_special else "id_dispositivo"
             id_columna_historial = "DISPOSITIVOS_ESPECIALES_id_especial" if is_special else "DISPOSITIVOS_id_dispositivo"
+
+            # 2a. Descontar del resumen diario las fallas que se van a borrar, en el tipo con el que se contaron
+            cursor.execute(f"""
+                SELECT td.nombre_tipo FROM {tabla_principal} t
+                JOIN TIPOS_DISPOSITIVO td ON t.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
+                WHERE t.{id_columna_principal} = ?
+            """, id_dispositivo)
+            row = cursor.fetchone()
+            if row:
+                etiqueta = etiqueta_tipo_falla(row.nombre_tipo)
+                cursor.execute(f"""
+                    UPDATE r SET total = r.total - f.n
+                    FROM RESUMEN_FALLAS_DIARIO r
+                    JOIN (
+                        SELECT CAST(fecha_hora_inicio AS DATE) AS fecha, COUNT(*) AS n
+                        FROM HISTORIAL_FALLAS WHERE {id_columna_historial} = ?
+                        GROUP BY CAST(fecha_hora_inicio AS DATE)
+                    ) f ON r.fecha = f.fecha
+                    WHERE r.tipo = ?;
+                    DELETE FROM RESUMEN_FALLAS_DIARIO WHERE tipo = ? AND total <= 0;
+                """, id_dispositivo, etiqueta, etiqueta)
             
-            # 2. ELIMINACIÓN EN CASCADA: Borrar registros relacionados en HISTORIAL_FALLAS
+            # 2b. ELIMINACIÓN EN CASCADA: Borrar registros relacionados en HISTORIAL_FALLAS
             query_cascada = f"DELETE FROM HISTORIAL_FALLAS WHERE {id_columna_historial} = ?"
             cursor.execute(query_cascada, id_dispositivo)
             logging.info(f"Eliminados {cursor.rowcount} registros de fallas para {tabla_principal} ID {id_dispositivo}.")
@@ -519,10 +817,20 @@ def eliminar_dispositivo(id_dispositivo, is_special) -> dict:
             
             if cursor.rowcount == 0:
                 # Si la eliminación principal falló, devolvemos un error
+                conn.rollback()
                 return {"error": "Dispositivo no encontrado para eliminar."}
+            conn.commit()
             
+            if not is_special:
+                registro_sitios_web.olvidar(id_dispositivo)
+            indice_fallas_abiertas.cerrar('especial' if is_special else 'dispositivo', id_dispositivo)
+            # El contador en memoria se reconcilia con el resumen ya descontado en la próxima lectura
+            _ultima_reconciliacion_fallas['ts'] = None
+            cache_crud.invalidar()
             return {"success": True}
         except Exception as e:
+            try: conn.rollback()
+            except Exception: pass
             logging.error(f"Error CRÍTICO al eliminar dispositivo {id_dispositivo} (Cascada): {e}", exc_info=True)
             return {"error": str(e)}
         
@@ -605,6 +913,7 @@ def insertar_o_actualizar_dispositivo(data) -> dict:
                 query = f"INSERT INTO {tabla} ({final_campos}) VALUES ({final_valores})"
                 cursor.execute(query, final_params)
                 logging.info(f"Nuevo dispositivo insertado en {tabla} con tipo {data['id_tipo']}.")
+                cache_crud.invalidar(data['id_tipo'])
                 return {"success": True, "action": "insertado"}
                 
             # --- Lógica de Actualización ---
@@ -622,6 +931,12 @@ def insertar_o_actualizar_dispositivo(data) -> dict:
                     return {"error": "Dispositivo no encontrado para actualizar."}
                 
                 logging.info(f"Dispositivo actualizado en {tabla} ID {device_id}.")
+                if not is_special:
+                    # Si es un sitio web su dirección pudo cambiar: se actualiza en el log conservando sus eventos
+                    # (los demás tipos no están en el log y renombrar no hace nada)
+                    registro_sitios_web.renombrar(device_id, data['direccion'])
+                # El tipo del dispositivo pudo cambiar: se invalidan todos los snapshots
+                cache_crud.invalidar()
                 return {"success": True, "action": "actualizado"}
 
         except Exception as e:
@@ -680,40 +995,63 @@ def actualizar_servicio_contpaqi(id_servicio, servidor, nombre_servicio) -> dict
             logging.error(f"Error al actualizar servicio CONTPAQI {id_servicio}: {e}")
             return {"error": str(e)}
 
-def obtener_historial_fallas(dias: int = 7):
+# Filas por bloque al leer HISTORIAL_FALLAS para reportes (fetchmany)
+HISTORIAL_FALLAS_BLOQUE = int(os.getenv('HISTORIAL_FALLAS_BLOQUE', 5000))
+
+_QUERY_HISTORIAL_FALLAS = """
+SELECT
+    COALESCE(d.nombre, de.nombre) AS nombre_dispositivo,
+    COALESCE(td.nombre_tipo, tde.nombre_tipo, 'Servicio ContpaQi') AS tipo_dispositivo,
+    hf.fecha_hora_inicio,
+    hf.fecha_hora_fin,
+    DATEDIFF(MINUTE, hf.fecha_hora_inicio, ISNULL(hf.fecha_hora_fin, GETDATE())) AS duracion_minutos,
+    CASE
+        WHEN hf.fecha_hora_fin IS NULL THEN 'Abierta'
+        ELSE 'Cerrada'
+    END AS estado_falla
+FROM HISTORIAL_FALLAS hf
+LEFT JOIN DISPOSITIVOS d ON hf.DISPOSITIVOS_id_dispositivo = d.id_dispositivo
+LEFT JOIN TIPOS_DISPOSITIVO td ON d.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
+LEFT JOIN DISPOSITIVOS_ESPECIALES de ON hf.DISPOSITIVOS_ESPECIALES_id_especial = de.id_especial
+LEFT JOIN TIPOS_DISPOSITIVO tde ON de.TIPOS_DISPOSITIVO_id_tipo = tde.id_tipo
+LEFT JOIN SERVICIOS_CONTPAQI sc ON hf.SERVICIOS_CONTPAQI_id_servicio = sc.id_servicio
+WHERE hf.fecha_hora_inicio >= DATEADD(day, ?, GETDATE())
+ORDER BY hf.fecha_hora_inicio DESC
+"""
+
+def iterar_historial_fallas(dias: int = 7, tamano_bloque: int = None):
     """
-    Obtiene el historial de fallas de los últimos N días, incluyendo dispositivo, tipo, fechas y duración.
+    Genera el historial de fallas de los últimos N días en bloques por columna
+    ({columna: [valores]}), leídos con fetchmany para no cargar todas las filas a la vez.
+    La conexión queda abierta mientras se consume el generador. Lanza la excepción si falla la lectura.
     """
+    tamano_bloque = tamano_bloque or HISTORIAL_FALLAS_BLOQUE
     with db_connection_manager() as conn:
         if not conn:
-            return {"error": "No se pudo conectar a la base de datos."}
+            raise ConnectionError("No se pudo conectar a la base de datos.")
         try:
             cursor = conn.cursor()
-            query = """
-            SELECT
-                COALESCE(d.nombre, de.nombre) AS nombre_dispositivo,
-                COALESCE(td.nombre_tipo, tde.nombre_tipo, 'Servicio ContpaQi') AS tipo_dispositivo,
-                hf.fecha_hora_inicio,
-                hf.fecha_hora_fin,
-                DATEDIFF(MINUTE, hf.fecha_hora_inicio, ISNULL(hf.fecha_hora_fin, GETDATE())) AS duracion_minutos,
-                CASE
-                    WHEN hf.fecha_hora_fin IS NULL THEN 'Abierta'
-                    ELSE 'Cerrada'
-                END AS estado_falla
-            FROM HISTORIAL_FALLAS hf
-            LEFT JOIN DISPOSITIVOS d ON hf.DISPOSITIVOS_id_dispositivo = d.id_dispositivo
-            LEFT JOIN TIPOS_DISPOSITIVO td ON d.TIPOS_DISPOSITIVO_id_tipo = td.id_tipo
-            LEFT JOIN DISPOSITIVOS_ESPECIALES de ON hf.DISPOSITIVOS_ESPECIALES_id_especial = de.id_especial
-            LEFT JOIN TIPOS_DISPOSITIVO tde ON de.TIPOS_DISPOSITIVO_id_tipo = tde.id_tipo
-            LEFT JOIN SERVICIOS_CONTPAQI sc ON hf.SERVICIOS_CONTPAQI_id_servicio = sc.id_servicio
-            WHERE hf.fecha_hora_inicio >= DATEADD(day, ?, GETDATE())
-            ORDER BY hf.fecha_hora_inicio DESC
-            """
-            cursor.execute(query, -dias)
-            rows = cursor.fetchall()
+            cursor.arraysize = tamano_bloque
+            cursor.execute(_QUERY_HISTORIAL_FALLAS, -dias)
             columns = [column[0] for column in cursor.description]
-            data = [dict(zip(columns, row)) for row in rows]
-            return {"data": data}
+            while True:
+                rows = cursor.fetchmany(tamano_bloque)
+                if not rows:
+                    break
+                yield {columna: list(valores) for columna, valores in zip(columns, zip(*rows))}
         except Exception as e:
             logging.error(f"Error al obtener historial de fallas para los últimos {dias} días: {e}")
-            return {"error": str(e)}
\ No newline at end of file
+            raise
+
+def obtener_historial_fallas(dias: int = 7):
+    """
+    Obtiene el historial de fallas de los últimos N días, incluyendo dispositivo, tipo, fechas y duración.
+    """
+    try:
+        data = []
+        for bloque in iterar_historial_fallas(dias):
+            columnas = list(bloque)
+            data.extend(dict(zip(columnas, valores)) for valores in zip(*bloque.values()))
+        return {"data": data}
+    except Exception as e:
+        return {"error": str(e)}
@@ -1,10 +1,45 @@
 # src/layouts/admin_layout.py
 
-from dash import dcc, html
+from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 from ..data.sql_connector import obtener_tipos_dispositivos_crud
 from ..components.dashboard_header_row import create_dashboard_header_row
 
+# Filas por página de la tabla CRUD (la paginación y la búsqueda se resuelven en el servidor)
+TAMANO_PAGINA_CRUD = 100
+
+# (id de columna, encabezado); 'editar' y 'eliminar' son celdas de acción
+COLUMNAS_TABLA_CRUD = [
+    ('nombre', 'Nombre'), ('descripcion', 'Descripción'), ('direccion', 'Dirección/IP'),
+    ('nombre_edificio', 'Edificio'), ('estado', 'Estado'), ('editar', ''), ('eliminar', ''),
+]
+
+def crear_tabla_dispositivos_crud():
+    """Tabla virtualizada de dispositivos; sus datos los llena el callback página por página."""
+    return dash_table.DataTable(
+        id='crud-device-table',
+        columns=[{'name': nombre, 'id': columna} for columna, nombre in COLUMNAS_TABLA_CRUD],
+        data=[],
+        page_action='custom',
+        page_current=0,
+        page_size=TAMANO_PAGINA_CRUD,
+        page_count=1,
+        virtualization=True,
+        fixed_rows={'headers': True},
+        style_table={'height': 'calc(100vh - 330px)', 'overflowY': 'auto'},
+        style_header={'backgroundColor': '#212529', 'color': 'white', 'fontWeight': 'bold', 'textAlign': 'center'},
+        style_cell={
+            'backgroundColor': '#2b3035', 'color': 'white', 'textAlign': 'center', 'border': '1px solid #454d55',
+            'fontSize': '0.88rem', 'minWidth': '90px', 'maxWidth': '320px',
+            'overflow': 'hidden', 'textOverflow': 'ellipsis', 'whiteSpace': 'nowrap',
+        },
+        style_data_conditional=[
+            {'if': {'column_id': 'editar'}, 'color': '#6ea8fe', 'fontWeight': 'bold', 'cursor': 'pointer'},
+            {'if': {'column_id': 'eliminar'}, 'color': '#ea868f', 'fontWeight': 'bold', 'cursor': 'pointer'},
+            {'if': {'state': 'active'}, 'backgroundColor': '#3a4047', 'border': '1px solid #6c757d'},
+        ],
+    )
+
 def create_admin_layout():
     """
     Crea el layout para la página de administración (CRUD de dispositivos).
@@ -56,6 +91,7 @@ def create_admin_layout():
                     id='search-device-input',
                     placeholder='Buscar por Nombre, Descripción, Dirección/IP...',
                     type='text',
+                    debounce=0.3,  # Filtra tras 0.3 s sin teclear (True sólo enviaría al presionar Enter o salir del campo)
                     className='mb-2 w-100',
                     style={'width': '100%'}
                 ),
@@ -68,14 +104,13 @@ def create_admin_layout():
             dbc.Col(
                 dbc.Card([
                     dbc.CardHeader("Dispositivos"),
-                    dbc.CardBody(
+                    dbc.CardBody([
                         html.Div(
                             id='dispositivos-crud-container',
                             children=dbc.Alert("Selecciona un tipo de dispositivo para comenzar a gestionar.", color="info", className="mt-2"),
-                            className="device-table-scroll"
                         ),
-                        className="p-1"
-                    )
+                        html.Div(crear_tabla_dispositivos_crud(), id='crud-table-wrapper', style={'display': 'none'}),
+                    ], className="p-1")
                 ], className="bg-dark text-white h-100"),
                 lg=11, md=12, xs=12, className="mx-auto", style={'minWidth': 0}
             )
@@ -5,6 +5,10 @@ import dash_bootstrap_components as dbc
 from ..components.dashboard_header_row import create_dashboard_header_row
 from src.config import OVERSCAN_PADDING
 
+# Rangos del historial de velocidad: (etiqueta, horas). La última hora sale del buffer en memoria;
+# los demás se leen de la tabla de rollup más gruesa que alcanza para la ventana
+RANGOS_HISTORIAL_INTERNET = [('1 h', 1), ('24 h', 24), ('7 d', 24 * 7), ('30 d', 24 * 30), ('1 año', 24 * 365)]
+
 def create_internet_detail_layout():
     """
     Crea y retorna el layout para la página de detalles de Internet.
@@ -21,7 +25,19 @@ def create_internet_detail_layout():
             ], className="bg-dark text-white h-100"), lg=3, md=12),
             
             dbc.Col(dbc.Card([
-                dbc.CardHeader("Historial de Velocidad (Última Hora)"),
+                dbc.CardHeader(html.Div([
+                    html.Span("Historial de Velocidad"),
+                    dbc.RadioItems(
+                        id='internet-detail-history-range',
+                        options=[{'label': etiqueta, 'value': horas} for etiqueta, horas in RANGOS_HISTORIAL_INTERNET],
+                        value=1,
+                        inline=True,
+                        className="btn-group btn-group-sm",
+                        inputClassName="btn-check",
+                        labelClassName="btn btn-outline-info btn-sm",
+                        labelCheckedClassName="active",
+                    ),
+                ], className="d-flex justify-content-between align-items-center")),
                 dbc.CardBody(
                     dcc.Graph(
                         id='internet-detail-history-graph',
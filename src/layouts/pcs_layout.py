@@ -6,7 +6,13 @@ from ..models.internet_logic import get_primary_ip
 from ..models.monitoring_logic import ping_dispositivo
 from ..data.sql_connector import obtener_dispositivos
 from ..components.device_module import crear_layout_modulo_dispositivos
-from ..utils.concurrency import get_shared_executor as get_executor
+from ..utils.concurrency import get_executor, POOL_PCS
+from ..utils.dns_cache import dns_cache
+from ..utils.dns_bulk import resolver_masivo
+from ..utils.neighbor_presence import presencia_pasiva
+
+# Plazo único para resolver todos los hostnames de PCs en un ciclo
+PCS_DNS_DEADLINE_SECONDS = 5
 
 def _process_single_pc(pc):
     """
@@ -14,10 +20,18 @@ def _process_single_pc(pc):
     Esto permite que el proceso se ejecute de forma concurrente.
     """
     hostname = pc.get('ip') # En la BD, la IP de la PC es su hostname
-    ip_resuelta = get_primary_ip(hostname) # Intenta resolver el nombre
+    # Sin bloquear: los hostnames que no respondieron en la resolución masiva se resuelven en segundo
+    # plano y la PC queda Inactiva sólo en este ciclo, sin entrada negativa en el cache
+    ip_resuelta = get_primary_ip(hostname, bloquear=False)
     
     if ip_resuelta != hostname:
-        ping_exitoso = ping_dispositivo(ip_resuelta)
+        # Un host visto en la tabla de vecinos está encendido; el ping sólo se usa para los demás
+        if presencia_pasiva.visto_recientemente(ip_resuelta):
+            ping_exitoso = True
+        else:
+            ping_exitoso = ping_dispositivo(ip_resuelta)
+            if ping_exitoso:
+                presencia_pasiva.marcar(ip_resuelta)
         pc['estado'] = 'Activo' if ping_exitoso else 'Inactivo'
         # Mantenemos la IP resuelta para el layout, pero usamos 'N/A' si está inactiva
         pc['ip_display'] = ip_resuelta if ping_exitoso else 'N/A'
@@ -38,10 +52,19 @@ def create_pcs_layout():
     if not pcs_from_db:
         return {"error": "No se encontraron PCs para monitorear."}
 
-    # 2. Procesar todas las PCs en paralelo para determinar su estado real
+    # 2. Resolver en bloque los hostnames sin entrada vigente en cache, con un único plazo;
+    #    así los hilos de ping sólo leen direcciones ya cacheadas
+    pendientes = [pc.get('ip') for pc in pcs_from_db if pc.get('ip') and not dns_cache.vigente(pc.get('ip'))]
+    if pendientes:
+        dns_cache.guardar_masivo(resolver_masivo(pendientes, deadline=PCS_DNS_DEADLINE_SECONDS))
+
+    # Lectura pasiva de la tabla de vecinos antes de los sondeos activos
+    presencia_pasiva.actualizar()
+
+    # 3. Procesar todas las PCs en paralelo para determinar su estado real
     lista_dispositivos = []
     updates_to_db = []
-    executor = get_executor(max_workers=20)
+    executor = get_executor(POOL_PCS)
     future_to_pc = {executor.submit(_process_single_pc, pc): pc for pc in pcs_from_db}
     for future in as_completed(future_to_pc):
         try:
@@ -59,13 +82,20 @@ def create_pcs_layout():
             pc_original = future_to_pc[future]
             logging.error(f"Error procesando la PC {pc_original.get('nombre')}: {e}")
 
+    return {
+        "layout": construir_layout_pcs(lista_dispositivos, len(pcs_from_db)),
+        "updates": updates_to_db 
+    }
+
+def construir_layout_pcs(lista_dispositivos, total_dispositivos):
+    """Crea el layout de PCs a partir de la lista de PCs ya procesadas (con 'estado' e 'ip_display')."""
     # Ordenar la lista de dispositivos alfabéticamente por nombre para una visualización estable
     lista_dispositivos.sort(key=lambda x: x.get('nombre', ''))
 
     # Calcular el total de activos después del procesamiento
     total_activos = sum(1 for pc in lista_dispositivos if pc['estado'] == 'Activo')
 
-    # 3. Agrupar resultados por edificio para el layout
+    # 4. Agrupar resultados por edificio para el layout
     pcs_por_edificio = {}
     for device in lista_dispositivos:
         nombre_edificio = device.get('nombre_edificio', 'Sin Edificio')
@@ -75,17 +105,13 @@ def create_pcs_layout():
         device_for_layout['ip'] = device_for_layout.get('ip_display', 'N/A')
         pcs_por_edificio[nombre_edificio].append(device_for_layout)
     
-    # 4. Crea el layout llamando a la capa de componentes
+    # 5. Crea el layout llamando a la capa de componentes
     layout = crear_layout_modulo_dispositivos(
         titulo="PC ENCENDIDAS",
         icono='/assets/icons/pc.png',
         datos_por_edificio=pcs_por_edificio,
         total_activos=total_activos,
-        total_dispositivos=len(pcs_from_db),
+        total_dispositivos=total_dispositivos,
         show_tooltip=True
     )
-
-    return {
-        "layout": layout,
-        "updates": updates_to_db 
-    }
\ No newline at end of file
+    return layout
\ No newline at end of file
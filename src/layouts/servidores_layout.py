@@ -12,10 +12,17 @@ def create_servidores_layout():
     if "error" in resultados_monitoreo:
         return resultados_monitoreo
 
+    return {
+        "layout": construir_layout_servidores(resultados_monitoreo),
+        "updates": resultados_monitoreo.get('updates', [])
+    }
+
+def construir_layout_servidores(resultados_monitoreo):
+    """Crea el layout de Servidores a partir de resultados con la forma de monitorear_dispositivos_ping."""
     # Añadimos el id_dispositivo a cada item para pasarlo al layout (necesario para el modal)
     updates = resultados_monitoreo['updates']
     for ip, data in resultados_monitoreo['items'].items():
-        data['id_dispositivo'] = next((d['id_dispositivo'] for d in updates if d['ip'] == ip), None)
+        data['id_dispositivo'] = next((d['id_dispositivo'] for d in updates if d['ip'] == ip), data.get('id_dispositivo'))
 
     # Crea el layout llamando a la capa de componentes
     layout = crear_layout_servidores(
@@ -23,8 +30,4 @@ def create_servidores_layout():
         total_servidores_activos=resultados_monitoreo['total_activos'],
         total_servidores=resultados_monitoreo['total_dispositivos']
     )
-    
-    return {
-        "layout": layout,
-        "updates": resultados_monitoreo.get('updates', [])
-    }
\ No newline at end of file
+    return layout
\ No newline at end of file
@@ -15,8 +15,10 @@ def create_sitios_web_layout():
     if "error" in resultados:
         return resultados 
 
-    data = resultados['layout']
-    
+    return {"layout": construir_layout_sitios_web(resultados['layout']), "updates": resultados['updates']}
+
+def construir_layout_sitios_web(data):
+    """Crea el layout de Sitios Web a partir de {'resultados', 'activos', 'total'}."""
     resultados_layout = data['resultados']
     sitios_activos = data['activos']
     total_sitios = data['total']
@@ -53,4 +55,4 @@ def create_sitios_web_layout():
     header = crear_header_modulo("SITIOS WEB", '/assets/icons/sitio_web.png', f"{sitios_activos}/{total_sitios}")
     body = html.Div(sitios_layout, className="p-1")
 
-    return {"layout": {"header": header, "body": body}, "updates": resultados['updates']}
\ No newline at end of file
+    return {"header": header, "body": body}
\ No newline at end of file
@@ -11,6 +11,13 @@ def create_telefonos_layout():
     if "error" in resultados_monitoreo:
         return resultados_monitoreo
 
+    return {
+        "layout": construir_layout_telefonos(resultados_monitoreo),
+        "updates": resultados_monitoreo.get('updates', [])
+    }
+
+def construir_layout_telefonos(resultados_monitoreo):
+    """Crea el layout de Teléfonos a partir de resultados con la forma de monitorear_dispositivos_ping."""
     # Procesamiento y ordenamiento de resultados (Lógica de telefonos.py)
     lista_dispositivos = []
     for ip, data in resultados_monitoreo['items'].items():
@@ -34,8 +41,4 @@ def create_telefonos_layout():
         total_dispositivos=resultados_monitoreo['total_dispositivos'],
         show_tooltip=True 
     )
-
-    return {
-        "layout": layout,
-        "updates": resultados_monitoreo.get('updates', [])
-    }
\ No newline at end of file
+    return layout
\ No newline at end of file
@@ -0,0 +1,116 @@
+# src/layouts/warm_start.py
+
+import logging
+from ..data.sql_connector import obtener_estados_actuales
+from ..models.network_monitoring import sembrar_estados
+from ..models.special_devices_logic import (
+    ultimo_estado_checadores, ultimo_estado_dvrs, ultimo_estado_sitios,
+    ultimo_estado_servicios, ultimo_estado_conmutador
+)
+from ..components.conmutador_module import crear_layout_conmutador
+from ..components.checadores_module import crear_layout_checadores
+from ..components.contpaqi_module import crear_layout_contpaqi
+from .telefonos_layout import construir_layout_telefonos
+from .servidores_layout import construir_layout_servidores
+from .sitios_web_layout import construir_layout_sitios_web
+from .pcs_layout import construir_layout_pcs
+
+# Estado del módulo de checadores -> status que espera su componente
+_STATUS_CHECADOR = {'Activo': 'ok', 'Advertencia': 'warning'}
+
+
+def _resultados_ping(equipos):
+    # Misma forma que monitorear_dispositivos_ping, sin updates
+    items = {
+        e['direccion']: {
+            'estado': e['nombre_estado'], 'tipo': e['nombre_tipo'], 'nombre_edificio': e['nombre_edificio'],
+            'nombre': e['nombre'], 'identifier': e['nombre'], 'id_dispositivo': e['id'],
+        }
+        for e in equipos
+    }
+    return {
+        'items': items, 'updates': [],
+        'total_activos': sum(1 for e in equipos if e['nombre_estado'] == 'Activo'),
+        'total_dispositivos': len(equipos),
+    }
+
+
+def restaurar_estado_inicial() -> dict:
+    """
+    Lee de la BD el último estado guardado de cada equipo, siembra los estados en memoria de los
+    monitores y retorna los layouts de último estado conocido ({'<modulo>_data': layout}) para el cache.
+    Los equipos sin estado guardado se dejan en 'Desconocido' y su módulo espera al primer ciclo.
+    """
+    resultado = obtener_estados_actuales()
+    if "error" in resultado:
+        logging.warning(f"No se pudo restaurar el estado inicial: {resultado['error']}")
+        return {}
+
+    grupos = {}
+    for equipo in resultado['equipos']:
+        if not equipo['nombre_estado']:
+            continue
+        if equipo['clase'] == 'especial' and equipo['puerto_checador'] is not None:
+            grupos.setdefault('Checador', []).append(equipo)
+        else:
+            grupos.setdefault((equipo['clase'], equipo['nombre_tipo']), []).append(equipo)
+
+    telefonos = grupos.get(('dispositivo', 'Telefono IP'), [])
+    servidores = grupos.get(('dispositivo', 'Servidor'), [])
+    sitios = grupos.get(('dispositivo', 'Sitio Web'), [])
+    conmutadores = grupos.get(('dispositivo', 'Conmutador'), [])
+    pcs = grupos.get(('dispositivo', 'PC'), [])
+    checadores = grupos.get('Checador', [])
+    dvrs = grupos.get(('especial', 'Camara DVR'), [])
+    servicios = grupos.get(('servicio', 'Servicio ContpaQi'), [])
+
+    sembrados = sembrar_estados({e['id']: e['nombre_estado'] for e in telefonos + servidores})
+    for store, equipos in (
+        (ultimo_estado_sitios, sitios), (ultimo_estado_conmutador, conmutadores),
+        (ultimo_estado_checadores, checadores), (ultimo_estado_dvrs, dvrs), (ultimo_estado_servicios, servicios),
+    ):
+        sembrados += store.seed({e['id']: e['nombre_estado'] for e in equipos})
+
+    layouts = {}
+    try:
+        if telefonos:
+            layouts['telefonos_data'] = construir_layout_telefonos(_resultados_ping(telefonos))
+        if servidores:
+            layouts['servidores_data'] = construir_layout_servidores(_resultados_ping(servidores))
+        if sitios:
+            layouts['sitios_web_data'] = construir_layout_sitios_web({
+                'resultados': sorted(
+                    ({'direccion': e['direccion'], 'estado': e['nombre_estado'], 'id_dispositivo': e['id']} for e in sitios),
+                    key=lambda x: x['direccion']
+                ),
+                'activos': sum(1 for e in sitios if e['nombre_estado'] == 'Activo'),
+                'total': len(sitios),
+            })
+        if conmutadores:
+            layouts['conmutador_data'] = {'body': crear_layout_conmutador(conmutadores[0]['nombre_estado'])}
+        if pcs:
+            layouts['pcs_data'] = construir_layout_pcs([
+                {'id_dispositivo': e['id'], 'nombre': e['nombre'], 'identifier': e['nombre'],
+                 'nombre_edificio': e['nombre_edificio'], 'estado': e['nombre_estado'],
+                 'ip_display': e['direccion'] if e['nombre_estado'] == 'Activo' else 'N/A'}
+                for e in pcs
+            ], len(pcs))
+        if checadores:
+            datos = [
+                {'id_reloj': e['id'], 'ip': e['direccion'] or 'N/A', 'hora_reloj': 'N/A',
+                 'status': _STATUS_CHECADOR.get(e['nombre_estado'], 'error'), 'nombre_edificio': e['nombre_edificio'] or 'Desconocido',
+                 'estado_ping': 'Inactivo' if e['nombre_estado'] == 'Error' else 'Activo'}
+                for e in checadores
+            ]
+            ok = sum(1 for d in datos if d['status'] == 'ok')
+            layouts['checadores_data'] = crear_layout_checadores(datos, ok, len(datos))
+        if servicios:
+            layouts['contpaqi_data'] = crear_layout_contpaqi(
+                [{'id_servicio': e['id'], 'nombre': e['nombre'], 'estado': e['nombre_estado']} for e in servicios],
+                sum(1 for e in servicios if e['nombre_estado'] == 'Activo'), len(servicios)
+            )
+    except Exception as e:
+        logging.error(f"Error al construir los layouts del estado inicial: {e}", exc_info=True)
+
+    logging.info(f"Estado inicial restaurado: {sembrados} equipos, {len(layouts)} módulos con último estado conocido.")
+    return layouts
@@ -1,13 +1,16 @@
 import speedtest
+import copy
 import logging
+import os
 import time
-import requests
-import ipaddress
+import statistics
 import socket
 from datetime import datetime, timedelta, timezone
 import urllib3
 from concurrent.futures import ThreadPoolExecutor
 from ..data.sql_connector import db_connection_manager, obtener_historial_sitios_web
+from .vpn_poller import FortiGateVPNPoller
+from ..utils.dns_cache import dns_cache
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -17,12 +20,88 @@ API_KEY = '8w77bGkj5fHq0xpmrpgtbNr6mbs5jj'
 VDOM = 'root'
 API_ENDPOINT_VPN_USERS = f'https://{FORTIGATE_IP}/api/v2/monitor/vpn/ssl?vdom={VDOM}'
 
+vpn_poller = FortiGateVPNPoller(API_ENDPOINT_VPN_USERS, API_KEY)
+
+# --- Medición por niveles: latencia cada ciclo, prueba completa con menor frecuencia ---
+TIPO_MUESTRA_LATENCIA = 'latencia'
+TIPO_MUESTRA_COMPLETA = 'completa'
+FULL_SPEEDTEST_INTERVAL_SECONDS = int(os.getenv('FULL_SPEEDTEST_INTERVAL_SECONDS', 30 * 60))
+# Separación mínima entre pruebas completas disparadas por degradación de latencia
+FULL_SPEEDTEST_MIN_GAP_SECONDS = int(os.getenv('FULL_SPEEDTEST_MIN_GAP_SECONDS', 5 * 60))
+# Hosts "host:puerto" separados por coma; la latencia se mide como tiempo de conexión TCP
+LATENCY_PROBE_HOSTS = [
+    (h.rsplit(':', 1)[0], int(h.rsplit(':', 1)[1]))
+    for h in os.getenv('LATENCY_PROBE_HOSTS', '8.8.8.8:53,1.1.1.1:53').split(',') if ':' in h
+]
+LATENCY_DEGRADATION_FACTOR = 2.0
+LATENCY_DEGRADATION_MIN_MS = 20
+
+# --- Cache de configuración y servidor de Speedtest ---
+SPEEDTEST_SERVER_TTL_SECONDS = int(os.getenv('SPEEDTEST_SERVER_TTL_SECONDS', 24 * 60 * 60))
+SPEEDTEST_SERVER_DEGRADATION_FACTOR = 1.5
+SPEEDTEST_SERVER_DEGRADATION_MIN_MS = 15
+
+_cache_speedtest = {
+    'config': None,     # config parseada de speedtest.net (cliente, tamaños, hilos...)
+    'server': None,     # servidor elegido por get_best_server()
+    'latencia': None,   # latencia medida al elegirlo
+    'ts': None,         # time.monotonic() de la última selección completa
+}
+
+_estado_medicion = {
+    'ultimo_completo_ts': None,  # time.monotonic() de la última prueba completa
+    'ultimo_completo': {},       # último resultado completo exitoso
+    'latencia_base': None,       # promedio móvil de la latencia en condiciones normales
+}
+
+class _SpeedtestConConfigCacheada(speedtest.Speedtest):
+    # Speedtest que reutiliza una configuración ya descargada en lugar de pedirla en cada instancia
+    def __init__(self, config_cacheada=None, **kwargs):
+        self._config_cacheada = config_cacheada
+        super().__init__(**kwargs)
+
+    def get_config(self):
+        if not self._config_cacheada:
+            return super().get_config()
+        self.config = copy.deepcopy(self._config_cacheada)
+        client = self.config['client']
+        self.lat_lon = (float(client['lat']), float(client['lon']))
+        return self.config
+
+def _latencia_servidor_aceptable(latencia: float, latencia_referencia: float) -> bool:
+    return latencia <= max(latencia_referencia * SPEEDTEST_SERVER_DEGRADATION_FACTOR, latencia_referencia + SPEEDTEST_SERVER_DEGRADATION_MIN_MS)
+
+def _preparar_speedtest():
+    # Devuelve un Speedtest con servidor elegido, reutilizando config/servidor cacheados mientras sigan vigentes
+    cache = _cache_speedtest
+    vigente = cache['ts'] is not None and time.monotonic() - cache['ts'] < SPEEDTEST_SERVER_TTL_SECONDS
+
+    if vigente and cache['server']:
+        st = _SpeedtestConConfigCacheada(config_cacheada=cache['config'], secure=True)
+        try:
+            # Con un único candidato, get_best_server() sólo mide la latencia a ese servidor
+            st.get_best_server(servers=[cache['server']])
+            if _latencia_servidor_aceptable(st.results.ping, cache['latencia']):
+                return st
+            logging.info(f"Latencia al servidor de speedtest cacheado degradada ({st.results.ping} ms vs {cache['latencia']} ms); re-evaluando servidores.")
+        except Exception as e:
+            logging.warning(f"El servidor de speedtest cacheado no respondió: {e}; re-evaluando servidores.")
+    else:
+        st = speedtest.Speedtest(secure=True)
+
+    st.get_servers()
+    st.get_best_server()
+    cache['config'] = copy.deepcopy(st.config)
+    cache['server'] = st.results.server
+    cache['latencia'] = st.results.ping
+    cache['ts'] = time.monotonic()
+    return st
+
 def monitorear_velocidad_internet(retries: int = 2, delay: int = 5) -> dict:
     # Mide la velocidad de internet usando Speedtest
     for attempt in range(retries):
         try:
-            st = speedtest.Speedtest(secure=True)
-            st.get_best_server()
+            st = _preparar_speedtest()
             st.download()
             st.upload()
             
@@ -43,6 +122,88 @@ def monitorear_velocidad_internet(retries: int = 2, delay: int = 5) -> dict:
     logging.error(f"La prueba de velocidad de internet falló después de {retries} intentos.")
     return {"error": "Fallo al medir la velocidad de internet."}
 
+def medir_latencia_internet(hosts: list = None, muestras: int = 4, timeout: float = 2) -> dict:
+    # Sonda barata: tiempos de conexión TCP a hosts conocidos (sin descargar datos)
+    hosts = hosts or LATENCY_PROBE_HOSTS
+    tiempos_por_host = []
+    for host, puerto in hosts:
+        tiempos = []
+        for _ in range(muestras):
+            inicio = time.perf_counter()
+            try:
+                with socket.create_connection((host, puerto), timeout=timeout):
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+            except OSError:
+                continue
+        if tiempos:
+            tiempos_por_host.append(tiempos)
+
+    if not tiempos_por_host:
+        return {"error": "Ningún host de latencia respondió."}
+
+    todos = [t for tiempos in tiempos_por_host for t in tiempos]
+    variaciones = [abs(a - b) for tiempos in tiempos_por_host for a, b in zip(tiempos, tiempos[1:])]
+    return {
+        "ping": round(statistics.mean(todos), 2),
+        "jitter": round(statistics.mean(variaciones), 2) if variaciones else 0.0,
+    }
+
+def _latencia_degradada(latencia: dict) -> bool:
+    if "error" in latencia:
+        return True
+    base = _estado_medicion['latencia_base']
+    if base is None:
+        return False
+    return latencia['ping'] > max(base * LATENCY_DEGRADATION_FACTOR, base + LATENCY_DEGRADATION_MIN_MS)
+
+def _actualizar_latencia_base(ping: float):
+    base = _estado_medicion['latencia_base']
+    _estado_medicion['latencia_base'] = ping if base is None else round(0.8 * base + 0.2 * ping, 2)
+
+def obtener_ultima_medicion_completa() -> dict:
+    # Último resultado de throughput completo (para mostrar velocidades entre pruebas completas)
+    return dict(_estado_medicion['ultimo_completo'])
+
+def monitorear_internet_por_niveles() -> dict:
+    # Cada llamada mide latencia/jitter; la prueba completa corre según FULL_SPEEDTEST_INTERVAL_SECONDS o si la latencia se degrada.
+    ahora = time.monotonic()
+    latencia = medir_latencia_internet()
+    ultimo_ts = _estado_medicion['ultimo_completo_ts']
+    completa_vencida = ultimo_ts is None or ahora - ultimo_ts >= FULL_SPEEDTEST_INTERVAL_SECONDS
+    degradada = _latencia_degradada(latencia)
+    gap_cumplido = ultimo_ts is None or ahora - ultimo_ts >= FULL_SPEEDTEST_MIN_GAP_SECONDS
+
+    if completa_vencida or (degradada and gap_cumplido):
+        if degradada and not completa_vencida:
+            logging.info(f"Latencia degradada ({latencia.get('ping', 'sin respuesta')} ms); adelantando prueba de velocidad completa.")
+        resultado = monitorear_velocidad_internet()
+        if "error" in resultado:
+            # Reintentar tras el gap mínimo en lugar de esperar un intervalo completo
+            _estado_medicion['ultimo_completo_ts'] = ahora - FULL_SPEEDTEST_INTERVAL_SECONDS + FULL_SPEEDTEST_MIN_GAP_SECONDS
+            resultado['tipo_muestra'] = TIPO_MUESTRA_COMPLETA
+            return resultado
+        _estado_medicion['ultimo_completo_ts'] = ahora
+        _estado_medicion['ultimo_completo'] = dict(resultado)
+        if "error" not in latencia and not degradada:
+            _actualizar_latencia_base(latencia['ping'])
+        resultado['jitter'] = latencia.get('jitter')
+        resultado['tipo_muestra'] = TIPO_MUESTRA_COMPLETA
+        return resultado
+
+    if "error" in latencia:
+        latencia['tipo_muestra'] = TIPO_MUESTRA_LATENCIA
+        return latencia
+
+    if not degradada:
+        _actualizar_latencia_base(latencia['ping'])
+    return {
+        "velocidad_descarga": None,
+        "velocidad_carga": None,
+        "ping": latencia['ping'],
+        "jitter": latencia['jitter'],
+        "tipo_muestra": TIPO_MUESTRA_LATENCIA,
+    }
+
 def local_users() -> int:
     # Cuenta el número de PCs activas
     try:
@@ -63,24 +224,9 @@ def local_users() -> int:
         return 0
 
 def vpn_users() -> dict:
-    # Obtiene el número y detalles de usuarios VPN (API FortiGate).
-    headers = {
-        'Authorization': f'Bearer {API_KEY}',
-        'Content-Type': 'application/json',
-    }
-    vpn_data = {'count': 0, 'details': []}
-    try:
-        response = requests.get(API_ENDPOINT_VPN_USERS, headers=headers, verify=False, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-        
-        if 'results' in data and data['results']:
-            vpn_data['count'] = len(data['results'])
-            vpn_data['details'] = data['results']
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error al conectar con FortiGate (VPN): {e}")
-    
-    return vpn_data
+    # Obtiene el número de usuarios VPN y sus filas ya formateadas para la tabla (API FortiGate, sesión persistente).
+    resultado = vpn_poller.poll()
+    return {'count': resultado['count'], 'details': resultado['formatted']}
 
 def all_users() -> dict:
     # Consolida usuarios locales y VPN.
@@ -92,23 +238,9 @@ def all_users() -> dict:
     }
     return users
 
-def get_primary_ip(hostname: str) -> str:
-    try:
-        _, _, ip_addresses = socket.gethostbyname_ex(hostname)
-        if not ip_addresses: return hostname
-        
-        corporate_subnet = ipaddress.ip_network('192.168.0.0/23')
-
-        for ip_str in ip_addresses:
-            try:
-                if ipaddress.ip_address(ip_str) in corporate_subnet:
-                    return ip_str
-            except ValueError:
-                continue 
-
-        return ip_addresses[0]
-    except socket.gaierror:
-        return hostname
+def get_primary_ip(hostname: str, bloquear: bool = True) -> str:
+    # IP (preferentemente corporativa) de `hostname` desde el cache DNS; el hostname si no resuelve.
+    return dns_cache.obtener(hostname, bloquear=bloquear) or hostname
 
 def process_sitios_web_history(interval_seconds: int = 60, hours: int = 1) -> dict:
     """
@@ -125,27 +257,13 @@ def process_sitios_web_history(interval_seconds: int = 60, hours: int = 1) -> di
     if not rows:
         return {'fechas': [], 'sitios': {}}
 
-    # Normalizar filas (soporta row.attr o tupla)
+    # Las filas del log en memoria ya vienen en UTC y en orden cronológico
     sitios_map = {}
     events_by_site = {}
-    for row in rows:
-        try:
-            fecha = row.fecha_hora
-            estado = int(row.estado)
-            direccion = row.direccion
-            id_sitio = row.id_dispositivo
-        except Exception:
-            fecha, estado, direccion, id_sitio = row
-            estado = int(estado)
-        if fecha.tzinfo is None:
-            fecha = fecha.replace(tzinfo=timezone.utc)
+    for fecha, estado, direccion, id_sitio in rows:
         sitios_map[id_sitio] = direccion
         events_by_site.setdefault(id_sitio, []).append((fecha, estado))
 
-    # Ordenar eventos por tiempo por sitio
-    for ev_list in events_by_site.values():
-        ev_list.sort(key=lambda x: x[0])
-
     now = datetime.now(timezone.utc)
     start = now - timedelta(hours=hours)
 
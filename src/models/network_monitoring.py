@@ -1,16 +1,31 @@
 # src/models/network_monitoring.py
 
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
 from ..data.sql_connector import obtener_dispositivos
 from .monitoring_logic import ping_dispositivo, CONTADOR_ADVERTENCIA, CONTADOR_ERROR
 import logging
 import atexit
-from ..utils.concurrency import get_shared_executor as get_executor
+from ..utils.concurrency import get_executor, POOL_PING
 
 ultimo_estado_dispositivos = {}
 lock = threading.Lock()
 
+def sembrar_estados(estados: dict) -> int:
+    """
+    Carga estados conocidos ({id_dispositivo: estado}) sin pisar los ya observados. El contador de
+    inactividad se ajusta al estado para que las transiciones sigan igual que antes del reinicio.
+    """
+    contadores = {'Error': CONTADOR_ERROR, 'Advertencia': CONTADOR_ADVERTENCIA, 'Inactivo': 1}
+    cargados = 0
+    with lock:
+        for id_dispositivo, estado in estados.items():
+            if not estado or id_dispositivo in ultimo_estado_dispositivos:
+                continue
+            ultimo_estado_dispositivos[id_dispositivo] = {'contador_inactividad': contadores.get(estado, 0), 'estado_final': estado}
+            cargados += 1
+    return cargados
+
 def _ping_and_process_device_state(dispositivo: dict) -> dict:
     """
     Realiza un ping y determina el nuevo estado con contadores.
@@ -64,7 +79,7 @@ def monitorear_dispositivos_ping_from_list(dispositivos: list) -> dict:
     if not dispositivos:
         return {"error": "No se proporcionaron dispositivos para monitorear."}
     try:
-        future_to_device = {get_executor().submit(_ping_and_process_device_state, d): d for d in dispositivos}
+        future_to_device = {get_executor(POOL_PING).submit(_ping_and_process_device_state, d): d for d in dispositivos}
         # Espera a que todos los pings terminen
         resultados_ping = [future.result() for future in as_completed(future_to_device)]
 
@@ -1,37 +1,43 @@
 # src/models/special_devices_logic.py
 from requests.auth import HTTPDigestAuth
 import logging
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from concurrent.futures import as_completed, TimeoutError
 import requests
 import xml.etree.ElementTree as ET
-import winrm
 import time
 from zk import ZK
 from datetime import datetime
 import urllib3
 import atexit
 from ..data.sql_connector import (
-    obtener_checadores_db, obtener_dvr_db, registrar_cambio_estado_sitio,
+    obtener_checadores_db, obtener_dvr_db, registrar_cambios_estado_sitios,
     db_connection_manager, obtener_dispositivos 
 )
 from .monitoring_logic import ping_dispositivo
-from ..utils.concurrency import get_shared_executor as get_executor
+from .state_store import EstadoStore
+from ..utils.concurrency import get_executor, POOL_CHECADORES, POOL_DVR, POOL_CONTPAQI
+from ..utils.winrm_sessions import WinRMSessionCache
+from ..utils.website_checker import AsyncWebsiteChecker
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# --- Variables globales de estado ---
-ultimo_estado_checadores = {}
-ultimo_estado_dvrs = {}
-ultimo_estado_sitios = {}
-ultimo_estado_servicios = {}
-ultimo_estado_conmutador = {'id_dispositivo': None, 'estado': 'Desconocido'}
-lock = threading.Lock()
+# --- Estado por módulo (cada store tiene su propio lock) ---
+ultimo_estado_checadores = EstadoStore('checadores')
+ultimo_estado_dvrs = EstadoStore('dvrs')
+ultimo_estado_sitios = EstadoStore('sitios_web')
+ultimo_estado_servicios = EstadoStore('servicios_contpaqi')
+ultimo_estado_conmutador = EstadoStore('conmutador')
+
+# Sesiones WinRM reutilizables entre ciclos (evita renegociar NTLM en cada chequeo)
+winrm_sessions = WinRMSessionCache(idle_ttl=300, max_por_host=2, operation_timeout_sec=15)
+
+# Chequeo HTTP asíncrono de sitios web; el plazo cubre todos los sitios de un ciclo
+website_checker = AsyncWebsiteChecker(timeout_por_intento=10, reintentos=3, keepalive_timeout=120)
+SITIOS_WEB_DEADLINE_SECONDS = 45
 
 # --- Conmutador ---
 def monitorear_conmutador():
     """Monitorea el conmutador y prepara los updates a BD y datos de layout."""
-    global ultimo_estado_conmutador
     updates_to_db = []
     
     try:
@@ -46,16 +52,11 @@ def monitorear_conmutador():
         ping_exitoso = ping_dispositivo(ip)
         estado_conmutador_str = "Inactivo" if not ping_exitoso else "Activo"
 
-        with lock:
-            estado_anterior_str = ultimo_estado_conmutador['estado']
-            
-            updates_to_db.append({
-                'id_dispositivo': id_conmutador, 'estado_final': estado_conmutador_str, 'estado_anterior': estado_anterior_str,
-                'tipo': 'Conmutador', 'ip': ip, 'es_especial': False
-            })
-
-            ultimo_estado_conmutador['estado'] = estado_conmutador_str
-            ultimo_estado_conmutador['id_dispositivo'] = id_conmutador
+        estado_anterior_str = ultimo_estado_conmutador.transition(id_conmutador, estado_conmutador_str)
+        updates_to_db.append({
+            'id_dispositivo': id_conmutador, 'estado_final': estado_conmutador_str, 'estado_anterior': estado_anterior_str,
+            'tipo': 'Conmutador', 'ip': ip, 'es_especial': False
+        })
 
         # Devolvemos solo el estado para que la capa de layout construya el HTML
         return {"layout": {"estado": estado_conmutador_str}, "updates": updates_to_db}
@@ -68,34 +69,10 @@ def monitorear_conmutador():
 def check_website_status(url: str) -> bool:
     """Verifica el estado HTTP de un sitio web."""
     if not url: return False
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    retries = 3
-    delay = 2
-
-    for attempt in range(retries):
-        try:
-            response = requests.get(url, timeout=10, allow_redirects=True, verify=False, headers=headers)
-            if 200 <= response.status_code < 400: return True
-        
-            if 400 <= response.status_code < 600:
-                url_with_index = f"{url.rstrip('/')}/index.html"
-                response_index = requests.get(url_with_index, timeout=10, allow_redirects=True, verify=False, headers=headers)
-                if 200 <= response_index.status_code < 400: return True
-                else: return False
-        
-        except requests.exceptions.RequestException:
-            pass
-        
-        if attempt < retries - 1:
-            time.sleep(delay)
-    
-    return False
+    return website_checker.verificar_sitios([url]).get(url, False)
 
 def monitorear_sitios_web():
     """Orquesta el monitoreo de sitios web y prepara los updates a BD y datos de layout."""
-    global ultimo_estado_sitios
 
     # 1. Obtener sitios desde la capa de datos
     with db_connection_manager() as conn:
@@ -111,43 +88,38 @@ def monitorear_sitios_web():
     if not sitios_db:
         return {"layout": {"resultados": [], "activos": 0, "total": 0}, "updates": []}
 
-    # 2. Ejecutar chequeos concurrentemente
-    max_workers_sites = min(12, max(2, len(sitios_db)))
-    with ThreadPoolExecutor(max_workers=max_workers_sites) as executor:
-        future_to_site = {executor.submit(check_website_status, site[1]): site for site in sitios_db}
+    # 2. Ejecutar chequeos concurrentemente (asyncio, un solo plazo para todo el ciclo)
+    estado_por_url = website_checker.verificar_sitios([site[1] for site in sitios_db], deadline=SITIOS_WEB_DEADLINE_SECONDS)
     
     resultados_layout = []
     sitios_activos = 0
     updates_to_db = []
+    cambios_historial = []
     
-    with lock:
-        for future in as_completed(future_to_site, timeout=120):
-            id_dispositivo, direccion = future_to_site[future]
-            is_up = False
-            try:
-                is_up = future.result()
-            except Exception as exc:
-                logging.error(f"Error al verificar {direccion}: {exc}")
-            
-            estado_final = "Error"
+    for id_dispositivo, direccion in sitios_db:
+        is_up = estado_por_url.get(direccion, False)
+        
+        estado_final = "Error"
 
-            if is_up:
-                sitios_activos += 1
-                estado_final = "Activo"
-            
-            resultados_layout.append({'direccion': direccion, 'estado': estado_final, 'id_dispositivo': id_dispositivo})
+        if is_up:
+            sitios_activos += 1
+            estado_final = "Activo"
+        
+        resultados_layout.append({'direccion': direccion, 'estado': estado_final, 'id_dispositivo': id_dispositivo})
 
-            estado_anterior = ultimo_estado_sitios.get(id_dispositivo, {}).get('estado', 'Desconocido')
-            
-            if estado_anterior != estado_final:
-                registrar_cambio_estado_sitio(id_dispositivo, 1 if estado_final == "Activo" else 0)
-                logging.info(f"Sitio {direccion} cambió de {estado_anterior} a {estado_final}. Registrando en la base de datos.")
-            ultimo_estado_sitios[id_dispositivo] = {'estado': estado_final, 'direccion': direccion}
+        estado_anterior = ultimo_estado_sitios.transition(id_dispositivo, estado_final)
+        
+        if estado_anterior != estado_final:
+            cambios_historial.append({'id_dispositivo': id_dispositivo, 'estado': 1 if estado_final == "Activo" else 0, 'direccion': direccion})
+            logging.info(f"Sitio {direccion} cambió de {estado_anterior} a {estado_final}. Registrando en la base de datos.")
 
-            updates_to_db.append({
-                'id_dispositivo': id_dispositivo, 'estado_final': estado_final, 'estado_anterior': estado_anterior,
-                'tipo': 'Sitio Web', 'es_especial': False
-            })
+        updates_to_db.append({
+            'id_dispositivo': id_dispositivo, 'estado_final': estado_final, 'estado_anterior': estado_anterior,
+            'tipo': 'Sitio Web', 'es_especial': False
+        })
+
+    # 3. Registrar el historial en un solo lote
+    registrar_cambios_estado_sitios(cambios_historial)
 
     resultados_layout.sort(key=lambda x: x['direccion'])
 
@@ -199,7 +171,6 @@ def check_checador_status(device_info: dict) -> dict:
 
 def monitorear_checadores():
     """Orquesta el monitoreo de los relojes checadores y prepara los updates a BD y datos de layout."""
-    global ultimo_estado_checadores
 
     checadores = obtener_checadores_db() # Llama a la capa de datos
     if "error" in checadores:
@@ -213,24 +184,22 @@ def monitorear_checadores():
         return {"layout": {"datos": [], "ok": 0, "total": 0}, "updates": []}
 
     try:
-        with lock:
-            for checador in checadores['dispositivos']:
-                resultado = check_checador_status(checador)
-                datos_checadores.append(resultado)
-                
-                id_reloj = resultado['id_reloj']
-                
-                estado_final_str = 'Activo'
-                if resultado['status'] == 'warning': estado_final_str = 'Advertencia'
-                elif resultado['status'] == 'error' or resultado['estado_ping'] == 'Inactivo': estado_final_str = 'Error'
-                
-                estado_anterior_str = ultimo_estado_checadores.get(id_reloj, 'Desconocido')
-                ultimo_estado_checadores[id_reloj] = estado_final_str
+        # Los relojes se consultan en paralelo y sin ningún lock tomado; map conserva el orden de la BD
+        datos_checadores = get_executor(POOL_CHECADORES).map(check_checador_status, checadores['dispositivos'])
 
-                updates_to_db.append({
-                    'id_dispositivo': id_reloj, 'estado_final': estado_final_str, 'estado_anterior': estado_anterior_str,
-                    'tipo': 'Checador', 'es_especial': True
-                })
+        for resultado in datos_checadores:
+            id_reloj = resultado['id_reloj']
+            
+            estado_final_str = 'Activo'
+            if resultado['status'] == 'warning': estado_final_str = 'Advertencia'
+            elif resultado['status'] == 'error' or resultado['estado_ping'] == 'Inactivo': estado_final_str = 'Error'
+            
+            estado_anterior_str = ultimo_estado_checadores.transition(id_reloj, estado_final_str)
+
+            updates_to_db.append({
+                'id_dispositivo': id_reloj, 'estado_final': estado_final_str, 'estado_anterior': estado_anterior_str,
+                'tipo': 'Checador', 'es_especial': True
+            })
         
     except Exception as e:
         logging.error(f"ERROR: Ocurrió un error mayor en monitorear_checadores: {e}")
@@ -323,7 +292,6 @@ def get_camera_status_from_dvr(dvr_info: dict) -> dict:
 
 def monitorear_dvr():
     """Orquesta el monitoreo de los DVRs y prepara los updates a BD y datos de layout."""
-    global ultimo_estado_dvrs
     
     dvr_monitoreo = obtener_dvr_db()
     if "error" in dvr_monitoreo:
@@ -338,51 +306,48 @@ def monitorear_dvr():
         return {"layout": {"datos_por_edificio": {}, "total_activos": 0, "total_dispositivos": 0}, "updates": []}
 
     try:
-        max_workers_dvrs = min(8, max(2, len(dvr_monitoreo['dispositivos'])))
-        with ThreadPoolExecutor(max_workers=max_workers_dvrs) as executor:
-            future_to_dvr = {executor.submit(get_camera_status_from_dvr, dvr): dvr for dvr in dvr_monitoreo['dispositivos']}
-            for future in as_completed(future_to_dvr, timeout=120):
-                dvr = future_to_dvr[future]
-                try:
-                    status_dvr = future.result()
-                    id_dvr = dvr['id_dvr']
-                    nombre_edificio = dvr.get('nombre_edificio', 'Sin Edificio')
-                    
-                    datos_por_edificio.setdefault(nombre_edificio, [])
-
-                    # Mostrar el identificador del canal SIEMPRE que haya cámaras, y solo el id del DVR si no hay cámaras
-                    if status_dvr['status'] == 'Activo' and status_dvr['cameras']:
-                        for cam in status_dvr['cameras']:
-                            if cam['status'] == 'Activo':
-                                total_activos += 1
-                            datos_por_edificio[nombre_edificio].append({
-                                'ip': dvr['direccion'],
-                                'estado': cam['status'],
-                                'name': cam.get('name'),
-                                'identifier': cam.get('identifier') or cam.get('name') or '',
-                                'nombre_edificio': nombre_edificio
-                            })
-                        total_dispositivos += len(status_dvr['cameras'])
-                    else:
+        executor = get_executor(POOL_DVR)
+        future_to_dvr = {executor.submit(get_camera_status_from_dvr, dvr): dvr for dvr in dvr_monitoreo['dispositivos']}
+        for future in as_completed(future_to_dvr, timeout=120):
+            dvr = future_to_dvr[future]
+            try:
+                status_dvr = future.result()
+                id_dvr = dvr['id_dvr']
+                nombre_edificio = dvr.get('nombre_edificio', 'Sin Edificio')
+                
+                datos_por_edificio.setdefault(nombre_edificio, [])
+
+                # Mostrar el identificador del canal SIEMPRE que haya cámaras, y solo el id del DVR si no hay cámaras
+                if status_dvr['status'] == 'Activo' and status_dvr['cameras']:
+                    for cam in status_dvr['cameras']:
+                        if cam['status'] == 'Activo':
+                            total_activos += 1
                         datos_por_edificio[nombre_edificio].append({
                             'ip': dvr['direccion'],
-                            'estado': status_dvr['status'],
-                            'identifier': '', 
+                            'estado': cam['status'],
+                            'name': cam.get('name'),
+                            'identifier': cam.get('identifier') or cam.get('name') or '',
                             'nombre_edificio': nombre_edificio
                         })
-                        total_dispositivos += 1
-
-                    with lock:
-                        estado_final_str = status_dvr['status']
-                        estado_anterior_str = ultimo_estado_dvrs.get(id_dvr, 'Desconocido')
-                        ultimo_estado_dvrs[id_dvr] = estado_final_str
-                        
-                        updates_to_db.append({
-                            'id_dispositivo': id_dvr, 'estado_final': estado_final_str, 'estado_anterior': estado_anterior_str,
-                            'tipo': 'Camara DVR', 'es_especial': True # Corregido para coincidir con la BD
-                        })
-                except Exception as exc:
-                    logging.error(f"Error al procesar el resultado del DVR {dvr.get('direccion')}: {exc}")
+                    total_dispositivos += len(status_dvr['cameras'])
+                else:
+                    datos_por_edificio[nombre_edificio].append({
+                        'ip': dvr['direccion'],
+                        'estado': status_dvr['status'],
+                        'identifier': '', 
+                        'nombre_edificio': nombre_edificio
+                    })
+                    total_dispositivos += 1
+
+                estado_final_str = status_dvr['status']
+                estado_anterior_str = ultimo_estado_dvrs.transition(id_dvr, estado_final_str)
+                
+                updates_to_db.append({
+                    'id_dispositivo': id_dvr, 'estado_final': estado_final_str, 'estado_anterior': estado_anterior_str,
+                    'tipo': 'Camara DVR', 'es_especial': True # Corregido para coincidir con la BD
+                })
+            except Exception as exc:
+                logging.error(f"Error al procesar el resultado del DVR {dvr.get('direccion')}: {exc}")
 
     except (Exception, TimeoutError) as e:
         logging.error(f"ERROR: Fallo en el proceso de monitoreo de DVRs: {e}")
@@ -406,11 +371,11 @@ def check_contpaqi_service_status(service_info: dict) -> dict:
         return {"id_servicio": service_info.get('id_servicio'), "estado": "Error", "detalle": "Faltan datos de conexión."}
     
     auth_user = f"{hostname}\\{username}"
-    session = winrm.Session(hostname, auth=(auth_user, password), transport='ntlm', operation_timeout_sec=15)
     
     try:
         command = f'powershell -command "Get-Service -Name \'{service_name}\' | Select-Object -ExpandProperty Status"'
-        result = session.run_ps(command)
+        with winrm_sessions.sesion(hostname, auth_user, password) as session:
+            result = session.run_ps(command)
         
         if result.std_err:
             error_message = result.std_err.decode('utf-8', errors='ignore').strip()
@@ -431,7 +396,6 @@ def check_contpaqi_service_status(service_info: dict) -> dict:
 
 def monitorear_servicios_contpaqi():
     """Orquesta el monitoreo de servicios ContpaQi y prepara los updates a BD y datos de layout."""
-    global ultimo_estado_servicios
 
     with db_connection_manager() as conn:
         if not conn: return {"error": "No se pudo conectar a la base de datos."}
@@ -473,9 +437,8 @@ def monitorear_servicios_contpaqi():
     if not servicios_a_monitorear:
         return {"error": "No hay servicios de ContpaQi configurados para monitorear."}
     
-    max_workers_contpaqi = min(10, max(2, len(servicios_a_monitorear)))
-    with ThreadPoolExecutor(max_workers=max_workers_contpaqi) as executor:
-        future_to_service = {executor.submit(check_contpaqi_service_status, s): s for s in servicios_a_monitorear}
+    executor = get_executor(POOL_CONTPAQI)
+    future_to_service = {executor.submit(check_contpaqi_service_status, s): s for s in servicios_a_monitorear}
     
     resultados_layout = []
     total_activos = 0
@@ -488,9 +451,7 @@ def monitorear_servicios_contpaqi():
                 result = future.result()
                 estado_final = result.get('estado')
                 
-                with lock:
-                    estado_anterior = ultimo_estado_servicios.get(result.get('id_servicio'), {}).get('estado_final', 'Desconocido')
-                    ultimo_estado_servicios[result.get('id_servicio')] = {'estado_final': estado_final}
+                estado_anterior = ultimo_estado_servicios.transition(result.get('id_servicio'), estado_final)
 
                 updates_to_db.append({
                     'id_dispositivo': result.get('id_servicio'), 'estado_final': estado_final, 'estado_anterior': estado_anterior,
@@ -507,13 +468,11 @@ def monitorear_servicios_contpaqi():
                 })
 
             except Exception as exc:
-                with lock:
-                    estado_anterior = ultimo_estado_servicios.get(service_info.get('id_servicio'), {}).get('estado_final', 'Desconocido')
-                    ultimo_estado_servicios[service_info.get('id_servicio')] = {'estado_final': 'Error'}
-                    updates_to_db.append({
-                        'id_dispositivo': service_info.get('id_servicio'), 'estado_final': 'Error', 'estado_anterior': estado_anterior,
-                        'tipo': 'Servicio ContpaQi', 'es_especial': False, 'es_servicio_contpaqi': True
-                    })
+                estado_anterior = ultimo_estado_servicios.transition(service_info.get('id_servicio'), 'Error')
+                updates_to_db.append({
+                    'id_dispositivo': service_info.get('id_servicio'), 'estado_final': 'Error', 'estado_anterior': estado_anterior,
+                    'tipo': 'Servicio ContpaQi', 'es_especial': False, 'es_servicio_contpaqi': True
+                })
                 resultados_layout.append({
                     'id_servicio': service_info.get('id_servicio'),
                     'nombre': service_info.get('nombre_servicio'),
@@ -0,0 +1,44 @@
+# src/models/state_store.py
+
+import threading
+
+
+class EstadoStore:
+    """
+    Último estado conocido de cada dispositivo de un módulo, con su propio lock.
+    Las operaciones son atómicas y cortas: ningún monitor retiene el lock durante I/O.
+    """
+
+    def __init__(self, nombre: str, default: str = 'Desconocido'):
+        self.nombre = nombre
+        self.default = default
+        self._lock = threading.Lock()
+        self._estados = {}
+
+    def get(self, id_dispositivo, default=None):
+        """Retorna el estado actual de `id_dispositivo` (o el default del store)."""
+        with self._lock:
+            return self._estados.get(id_dispositivo, self.default if default is None else default)
+
+    def transition(self, id_dispositivo, new_state):
+        """Compare-and-swap atómico: guarda `new_state` y retorna el estado anterior."""
+        with self._lock:
+            anterior = self._estados.get(id_dispositivo, self.default)
+            self._estados[id_dispositivo] = new_state
+            return anterior
+
+    def seed(self, estados: dict) -> int:
+        """Carga estados conocidos (p. ej. desde la BD al arrancar) sin pisar los ya observados; retorna cuántos cargó."""
+        with self._lock:
+            nuevos = {k: v for k, v in estados.items() if k not in self._estados and v}
+            self._estados.update(nuevos)
+            return len(nuevos)
+
+    def snapshot(self) -> dict:
+        """Copia de todos los estados actuales."""
+        with self._lock:
+            return dict(self._estados)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._estados)
@@ -0,0 +1,142 @@
+# src/models/vpn_poller.py
+
+import datetime
+import logging
+import threading
+import time
+
+import requests
+
+# Columnas de la tabla de usuarios VPN, en orden de despliegue
+COLUMNAS_TABLA_VPN = ['Usuario', 'IP Pública', 'IP VPN Asignada', 'Duración', 'Recibido', 'Enviado', 'Bajada', 'Subida']
+
+
+class FortiGateVPNPoller:
+    """
+    Consulta las sesiones SSL-VPN del FortiGate con una sesión HTTP persistente (keep-alive,
+    sin un handshake TLS nuevo por consulta) y mantiene en memoria una tabla de sesiones
+    indexada por (usuario, IP pública, inicio de sesión).
+
+    Cada consulta se compara con la anterior: se registran altas/bajas y, con la diferencia
+    de bytes entre consultas, la tasa de recepción/envío por sesión.
+    """
+
+    def __init__(self, endpoint: str, api_key: str, timeout: float = 15, verify: bool = False):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._http = requests.Session()
+        self._http.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+        self._http.verify = verify
+        # clave -> {'row': {...}, 'ts': time.monotonic() de la última lectura}
+        self._sesiones = {}
+        self._filas = []
+        self._filas_formateadas = []
+        self.ultimo_cambio = {'altas': [], 'bajas': []}
+
+    def poll(self) -> dict:
+        """
+        Consulta el FortiGate y actualiza la tabla de sesiones.
+        Retorna {'count', 'rows', 'formatted', 'altas', 'bajas'}; ante un error de red conserva la última tabla conocida.
+        """
+        try:
+            response = self._http.get(self.endpoint, timeout=self.timeout)
+            response.raise_for_status()
+            resultados = response.json().get('results') or []
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.error(f"Error al conectar con FortiGate (VPN): {e}")
+            with self._lock:
+                return {'count': len(self._filas), 'rows': list(self._filas), 'formatted': list(self._filas_formateadas),
+                        'altas': [], 'bajas': [], 'error': str(e)}
+
+        return self._aplicar(resultados, time.monotonic())
+
+    def filas(self) -> list:
+        """Última lista compacta de filas, sin consultar al FortiGate."""
+        with self._lock:
+            return list(self._filas)
+
+    def _aplicar(self, resultados, ahora):
+        nuevas = {}
+        for user in resultados:
+            key, fila = _fila_compacta(user)
+            nuevas[key] = fila
+
+        with self._lock:
+            anteriores = self._sesiones
+            altas = [k for k in nuevas if k not in anteriores]
+            bajas = [k for k in anteriores if k not in nuevas]
+
+            sesiones = {}
+            for key, fila in nuevas.items():
+                previa = anteriores.get(key)
+                if previa is not None:
+                    dt = ahora - previa['ts']
+                    fila['rx_bps'] = _tasa(fila['in_bytes'], previa['row']['in_bytes'], dt)
+                    fila['tx_bps'] = _tasa(fila['out_bytes'], previa['row']['out_bytes'], dt)
+                sesiones[key] = {'row': fila, 'ts': ahora}
+
+            self._sesiones = sesiones
+            self._filas = sorted((s['row'] for s in sesiones.values()), key=lambda r: r['user_name'].lower())
+            # Se formatea una sola vez por consulta; la UI sólo pinta estos dicts
+            self._filas_formateadas = [formatear_fila_vpn(f) for f in self._filas]
+            self.ultimo_cambio = {'altas': altas, 'bajas': bajas}
+            filas = list(self._filas)
+            formateadas = list(self._filas_formateadas)
+
+        for user_name, remote_host, _ in altas:
+            logging.info(f"VPN: conexión de {user_name} desde {remote_host}.")
+        for user_name, remote_host, _ in bajas:
+            logging.info(f"VPN: desconexión de {user_name} ({remote_host}).")
+
+        return {'count': len(filas), 'rows': filas, 'formatted': formateadas, 'altas': altas, 'bajas': bajas}
+
+
+def formatear_fila_vpn(fila: dict) -> dict:
+    """Convierte una fila compacta en un dict {columna: texto} listo para la tabla."""
+    return {
+        'Usuario': fila['user_name'],
+        'IP Pública': fila['remote_host'],
+        'IP VPN Asignada': fila['aip'],
+        'Duración': str(datetime.timedelta(seconds=int(fila['duration']))),
+        'Recibido': formatear_bytes(fila['in_bytes']),
+        'Enviado': formatear_bytes(fila['out_bytes']),
+        'Bajada': '-' if fila['rx_bps'] is None else f"{formatear_bytes(fila['rx_bps'] / 8)}/s",
+        'Subida': '-' if fila['tx_bps'] is None else f"{formatear_bytes(fila['tx_bps'] / 8)}/s",
+    }
+
+
+def formatear_bytes(byte_count) -> str:
+    if byte_count is None or not isinstance(byte_count, (int, float)): return "0 B"
+    power = 1024; n = 0; power_labels = {0: '', 1: 'K', 2: 'M', 3: 'G', 4: 'T'}
+    while byte_count >= power and n < len(power_labels) - 1: byte_count /= power; n += 1
+    return f"{byte_count:.2f} {power_labels[n]}B"
+
+
+def _fila_compacta(user):
+    # Aplana una entrada de `results` a los campos que usa la tabla del dashboard
+    subsession = (user.get('subsessions') or [{}])[0]
+    user_name = user.get('user_name', 'N/A')
+    remote_host = user.get('remote_host', 'N/A')
+    key = (user_name, remote_host, user.get('last_login_time'))
+    fila = {
+        'user_name': user_name,
+        'remote_host': remote_host,
+        'aip': subsession.get('aip', 'N/A'),
+        'duration': user.get('duration', 0) or 0,
+        'in_bytes': subsession.get('in_bytes', 0) or 0,
+        'out_bytes': subsession.get('out_bytes', 0) or 0,
+        'rx_bps': None,
+        'tx_bps': None,
+    }
+    return key, fila
+
+
+def _tasa(actual, previo, dt):
+    # Bits por segundo entre dos lecturas; si el contador se reinició no hay tasa válida
+    if dt <= 0 or actual < previo:
+        return None
+    return (actual - previo) * 8 / dt
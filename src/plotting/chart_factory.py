@@ -20,8 +20,9 @@ def create_internet_history_figure(history_data: dict) -> go.Figure:
         history_data.get('descarga') and
         history_data.get('carga')):
         fechas_locales = [_to_local_datetime(f) for f in history_data['fechas']]
-        fig.add_trace(go.Scatter(x=fechas_locales, y=history_data['descarga'], mode='lines', name='Descarga (Mbps)', line_color='#56C0BD'))
-        fig.add_trace(go.Scatter(x=fechas_locales, y=history_data['carga'], mode='lines', name='Carga (Mbps)', line_color="#BF71FF"))
+        # connectgaps: entre pruebas completas hay muestras de sólo latencia (None en throughput)
+        fig.add_trace(go.Scatter(x=fechas_locales, y=history_data['descarga'], mode='lines', name='Descarga (Mbps)', line_color='#56C0BD', connectgaps=True))
+        fig.add_trace(go.Scatter(x=fechas_locales, y=history_data['carga'], mode='lines', name='Carga (Mbps)', line_color="#BF71FF", connectgaps=True))
         fig.update_layout(
             title_text='',
             template='plotly_dark', xaxis_title="Fecha y Hora",
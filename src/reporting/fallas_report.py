@@ -2,21 +2,38 @@ import pandas as pd
 from datetime import datetime
 import tempfile
 import os
-from src.data.sql_connector import obtener_historial_fallas
+from src.data.sql_connector import iterar_historial_fallas
+
+COLUMNAS_FALLAS = [
+    'nombre_dispositivo', 'tipo_dispositivo', 'fecha_hora_inicio',
+    'fecha_hora_fin', 'duracion_minutos', 'estado_falla'
+]
+
+def _bloque_a_dataframe(bloque: dict) -> pd.DataFrame:
+    # Cada bloque se convierte a columnas tipadas antes de leer el siguiente
+    df = pd.DataFrame(bloque, columns=COLUMNAS_FALLAS)
+    df['fecha_hora_inicio'] = pd.to_datetime(df['fecha_hora_inicio'])
+    df['fecha_hora_fin'] = pd.to_datetime(df['fecha_hora_fin'])
+    df['duracion_minutos'] = pd.to_numeric(df['duracion_minutos'], downcast='integer')
+    for columna in ('tipo_dispositivo', 'estado_falla'):
+        df[columna] = df[columna].astype('category')
+    return df
 
 def generar_dataframe_fallas(dias: int = 7):
     """
-    Obtiene el historial de fallas y lo convierte en un DataFrame de pandas.
+    Obtiene el historial de fallas por bloques y lo convierte en un DataFrame de pandas.
     """
-    resultado = obtener_historial_fallas(dias)
-    if "error" in resultado:
-        raise Exception(resultado["error"])
-    df = pd.DataFrame(resultado["data"])
-    if not df.empty:
-        # Formatear fechas y duración
-        df['fecha_hora_inicio'] = pd.to_datetime(df['fecha_hora_inicio'])
-        df['fecha_hora_fin'] = pd.to_datetime(df['fecha_hora_fin'])
-        df['duracion'] = df['duracion_minutos'].apply(lambda x: f"{x//60}h {x%60}m" if pd.notnull(x) else "")
+    bloques = [_bloque_a_dataframe(bloque) for bloque in iterar_historial_fallas(dias)]
+    if not bloques:
+        return pd.DataFrame(columns=COLUMNAS_FALLAS + ['duracion'])
+    df = pd.concat(bloques, ignore_index=True)
+    del bloques
+    # concat de categorías distintas entre bloques produce object: se vuelven a categorizar
+    for columna in ('tipo_dispositivo', 'estado_falla'):
+        df[columna] = df[columna].astype('category')
+    # Formatear duración (vectorizado)
+    minutos = df['duracion_minutos']
+    df['duracion'] = ((minutos // 60).astype('Int64').astype(str) + 'h ' + (minutos % 60).astype('Int64').astype(str) + 'm').where(minutos.notna(), "")
     return df
 
 def exportar_fallas_excel(dias: int = 7, filepath=None):
@@ -1,12 +1,153 @@
 import atexit
+import logging
+import os
+import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 
-_shared_executor = None
+# Pools nombrados: cada monitor declara en cuál corre para que una carga lenta no acapare a las demás.
+# (hilos, cola máxima); se pueden ajustar con EXECUTOR_<NOMBRE>_WORKERS / EXECUTOR_<NOMBRE>_QUEUE
+POOL_PING = 'ping'              # teléfonos y servidores (ciclo rápido)
+POOL_PCS = 'pcs'                # ping de PCs (ciclo lento)
+POOL_DNS = 'dns'                # re-resolución DNS en segundo plano
+POOL_DVR = 'dvr'
+POOL_CONTPAQI = 'contpaqi'
+POOL_CHECADORES = 'checadores'
+POOL_COMPARTIDO = 'compartido'  # compatibilidad con get_shared_executor()
+
+_CONFIG_POOLS = {
+    POOL_PING: (20, 500),
+    POOL_PCS: (20, 1000),
+    POOL_DNS: (4, 1000),
+    POOL_DVR: (8, 200),
+    POOL_CONTPAQI: (10, 200),
+    POOL_CHECADORES: (8, 200),
+    POOL_COMPARTIDO: (20, 1000),
+}
+
+
+class BoundedExecutor:
+    """
+    ThreadPoolExecutor con cola acotada y métricas. `submit` bloquea (backpressure) cuando hay
+    `max_workers + max_cola` tareas pendientes en lugar de encolar sin límite.
+    """
+
+    def __init__(self, nombre: str, max_workers: int, max_cola: int):
+        self.nombre = nombre
+        self.max_workers = max_workers
+        self.max_cola = max_cola
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'pool-{nombre}')
+        self._cupos = threading.BoundedSemaphore(max_workers + max_cola)
+        self._lock = threading.Lock()
+        self._activas = 0
+        self._en_cola = 0
+        self._completadas = 0
+        self._rechazadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def submit(self, fn, *args, espera_cola: float = None, **kwargs):
+        """
+        Encola `fn(*args, **kwargs)`; si la cola está llena espera hasta `espera_cola` segundos
+        (None = sin límite) y luego lanza RuntimeError.
+        """
+        if not self._cupos.acquire(timeout=espera_cola):
+            with self._lock:
+                self._rechazadas += 1
+            raise RuntimeError(f"Cola del pool '{self.nombre}' llena ({self.max_workers + self.max_cola} tareas).")
+        with self._lock:
+            self._en_cola += 1
+        encolada = time.monotonic()
+        try:
+            future = self._executor.submit(self._ejecutar, encolada, fn, args, kwargs)
+        except Exception:
+            self._liberar_en_cola()
+            raise
+        future.add_done_callback(self._al_terminar)
+        return future
+
+    def map(self, fn, iterable):
+        """Como Executor.map pero sobre la cola acotada; conserva el orden de entrada."""
+        futures = [self.submit(fn, item) for item in iterable]
+        return [f.result() for f in futures]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'activas': self._activas,
+                'en_cola': self._en_cola,
+                'completadas': self._completadas,
+                'rechazadas': self._rechazadas,
+                'espera_promedio_ms': round(self._espera_total / self._completadas * 1000, 1) if self._completadas else 0.0,
+                'espera_max_ms': round(self._espera_max * 1000, 1),
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def _liberar_en_cola(self):
+        with self._lock:
+            self._en_cola -= 1
+        self._cupos.release()
+
+    def _al_terminar(self, future):
+        # Un future cancelado antes de empezar nunca pasa por _ejecutar: su cupo se devuelve aquí
+        if future.cancelled():
+            self._liberar_en_cola()
+
+    def _ejecutar(self, encolada, fn, args, kwargs):
+        espera = time.monotonic() - encolada
+        with self._lock:
+            self._en_cola -= 1
+            self._activas += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._activas -= 1
+                self._completadas += 1
+            self._cupos.release()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_executor(nombre: str) -> BoundedExecutor:
+    """Retorna el pool nombrado `nombre`, creándolo la primera vez con su tamaño configurado."""
+    with _pools_lock:
+        pool = _pools.get(nombre)
+        if pool is None:
+            workers, cola = _CONFIG_POOLS.get(nombre, _CONFIG_POOLS[POOL_COMPARTIDO])
+            prefijo = f'EXECUTOR_{nombre.upper()}'
+            workers = int(os.getenv(f'{prefijo}_WORKERS', workers))
+            cola = int(os.getenv(f'{prefijo}_QUEUE', cola))
+            pool = BoundedExecutor(nombre, workers, cola)
+            _pools[nombre] = pool
+            logging.info(f"Pool '{nombre}' creado con {workers} hilos y cola de {cola}.")
+        return pool
+
+
+def executor_stats() -> dict:
+    """Métricas de todos los pools creados: hilos activos, tareas en cola y espera en cola."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {nombre: pool.stats() for nombre, pool in pools.items()}
+
 
 def get_shared_executor(max_workers: int = 20):
-    
-    global _shared_executor
-    if _shared_executor is None:
-        _shared_executor = ThreadPoolExecutor(max_workers=max_workers)
-        atexit.register(lambda: _shared_executor.shutdown(wait=True))
-    return _shared_executor
+    # Compatibilidad: el antiguo pool global; el tamaño se fija en _CONFIG_POOLS, no en la llamada
+    return get_executor(POOL_COMPARTIDO)
+
+
+def _apagar_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+atexit.register(_apagar_pools)
@@ -0,0 +1,216 @@
+# src/utils/dns_bulk.py
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import random
+import socket
+import struct
+import threading
+
+from .dns_cache import elegir_ip_primaria
+
+# Servidores DNS "ip[:puerto]" separados por coma; si no hay, se usa el resolver del sistema
+DNS_SERVERS = [s.strip() for s in os.getenv('DNS_SERVERS', '').split(',') if s.strip()]
+# Dominio que se agrega a los hostnames cortos (p. ej. nombres NetBIOS de las PCs)
+DNS_SEARCH_DOMAIN = os.getenv('DNS_SEARCH_DOMAIN', '').strip('.')
+# Tiempo que se espera a un servidor antes de repetir la consulta en el siguiente
+DNS_RETRY_INTERVAL_SECONDS = 1.0
+# Hilos para getaddrinfo (resolver del sistema); una consulta NetBIOS/LLMNR colgada ocupa uno hasta que el SO la suelta
+DNS_BULK_MAX_THREADS = 16
+
+_QTYPE_A = 1
+_QCLASS_IN = 1
+
+
+def resolver_masivo(hostnames, deadline: float = 5.0) -> dict:
+    """
+    Resuelve todos los `hostnames` de forma concurrente dentro de un único plazo.
+    Retorna {hostname: ip | None} sólo con las respuestas definitivas (None = el nombre no existe);
+    los hostnames que no obtuvieron respuesta antes del plazo no aparecen, para no cachearlos como negativos.
+    """
+    hostnames = [h for h in dict.fromkeys(hostnames) if h]
+    if not hostnames:
+        return {}
+    # El loop y su executor viven entre ciclos: asyncio.run() esperaría al cerrar a los getaddrinfo
+    # que siguen colgados y el plazo dejaría de ser un límite real para el llamador
+    futuro = asyncio.run_coroutine_threadsafe(_resolver_todos(hostnames, deadline), _loop_resolucion())
+    try:
+        return futuro.result(timeout=deadline + 1)
+    except concurrent.futures.TimeoutError:
+        futuro.cancel()
+        logging.warning(f"La resolución DNS masiva excedió el plazo de {deadline}s.")
+        return {}
+    except Exception as e:
+        logging.error(f"Error en la resolución DNS masiva: {e}")
+        return {}
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _loop_resolucion():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            loop.set_default_executor(
+                concurrent.futures.ThreadPoolExecutor(max_workers=DNS_BULK_MAX_THREADS, thread_name_prefix='dns-masivo'))
+            threading.Thread(target=loop.run_forever, name='dns-masivo-loop', daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+async def _resolver_todos(hostnames, deadline):
+    loop = asyncio.get_running_loop()
+    fin = loop.time() + deadline
+    resultados = {}
+
+    clientes = []
+    try:
+        for servidor in DNS_SERVERS:
+            host, _, puerto = servidor.partition(':')
+            try:
+                transport, protocolo = await loop.create_datagram_endpoint(
+                    _DNSClientProtocol, remote_addr=(host, int(puerto or 53)))
+                clientes.append((transport, protocolo))
+            except OSError as e:
+                logging.warning(f"No se pudo abrir socket UDP hacia el DNS {servidor}: {e}")
+
+        tareas = {h: asyncio.ensure_future(_resolver_uno(loop, clientes, h, fin)) for h in hostnames}
+        _, pendientes = await asyncio.wait(tareas.values(), timeout=max(0.0, fin - loop.time()))
+        for tarea in pendientes:
+            tarea.cancel()
+        for h, tarea in tareas.items():
+            # Una tarea terminada con excepción es un timeout de getaddrinfo: tampoco es respuesta definitiva
+            if tarea.done() and not tarea.cancelled() and tarea.exception() is None:
+                resultados[h] = tarea.result()
+        sin_respuesta = len(hostnames) - len(resultados)
+        if sin_respuesta:
+            logging.warning(f"{sin_respuesta} hostnames sin respuesta dentro del plazo de {deadline}s.")
+    finally:
+        for transport, _ in clientes:
+            transport.close()
+    return resultados
+
+
+async def _resolver_uno(loop, clientes, hostname, fin):
+    if clientes:
+        for nombre in _candidatos(hostname):
+            ips = await _consultar_a(loop, clientes, nombre, fin)
+            if ips:
+                return elegir_ip_primaria(ips)
+    # Sin servidores configurados (o sin respuesta): resolver del sistema, que también cubre NetBIOS/LLMNR.
+    # asyncio.TimeoutError se propaga: un timeout no dice que el nombre no exista
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(hostname, None, family=socket.AF_INET, type=socket.SOCK_STREAM),
+            timeout=max(0.0, fin - loop.time()))
+    except (OSError, UnicodeError):
+        return None
+    return elegir_ip_primaria(list(dict.fromkeys(info[4][0] for info in infos)))
+
+
+def _candidatos(hostname):
+    if DNS_SEARCH_DOMAIN and '.' not in hostname:
+        return [f"{hostname}.{DNS_SEARCH_DOMAIN}", hostname]
+    return [hostname]
+
+
+async def _consultar_a(loop, clientes, nombre, fin):
+    # Envía la consulta al primer servidor y, si no contesta a tiempo, la repite en el siguiente
+    for transport, protocolo in clientes:
+        restante = fin - loop.time()
+        if restante <= 0:
+            break
+        query_id, future = protocolo.registrar(loop)
+        paquete = _construir_consulta(query_id, nombre)
+        try:
+            transport.sendto(paquete)
+            respuesta = await asyncio.wait_for(asyncio.shield(future), timeout=min(DNS_RETRY_INTERVAL_SECONDS, restante))
+        except asyncio.TimeoutError:
+            continue
+        finally:
+            protocolo.liberar(query_id)
+        if respuesta is not None:
+            # Respuesta definitiva (incluido NXDOMAIN, que llega como lista vacía)
+            return respuesta
+    return []
+
+
+def _construir_consulta(query_id, nombre):
+    # Cabecera: id, flags (RD=1), 1 pregunta, 0 respuestas/autoridad/adicionales
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    qname = b''.join(bytes([len(parte)]) + parte for parte in (p.encode('idna') for p in nombre.split('.') if p)) + b'\x00'
+    return header + qname + struct.pack('!HH', _QTYPE_A, _QCLASS_IN)
+
+
+def _parsear_respuesta(datos):
+    # Retorna (id, [ips A]) o None si el paquete no se puede interpretar; rcode != 0 produce lista vacía
+    if len(datos) < 12:
+        return None
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack('!HHHHHH', datos[:12])
+    if flags & 0x000F:
+        return query_id, []
+    offset = 12
+    for _ in range(qdcount):
+        offset = _saltar_nombre(datos, offset) + 4
+    ips = []
+    for _ in range(ancount):
+        offset = _saltar_nombre(datos, offset)
+        if offset + 10 > len(datos):
+            break
+        rtype, rclass, _, rdlength = struct.unpack('!HHIH', datos[offset:offset + 10])
+        offset += 10
+        if rtype == _QTYPE_A and rclass == _QCLASS_IN and rdlength == 4:
+            ips.append(socket.inet_ntoa(datos[offset:offset + 4]))
+        offset += rdlength
+    return query_id, ips
+
+
+def _saltar_nombre(datos, offset):
+    while offset < len(datos):
+        longitud = datos[offset]
+        if longitud & 0xC0 == 0xC0:
+            # Puntero de compresión: ocupa 2 bytes y termina el nombre
+            return offset + 2
+        offset += 1
+        if longitud == 0:
+            return offset
+        offset += longitud
+    return offset
+
+
+class _DNSClientProtocol(asyncio.DatagramProtocol):
+    # Reparte las respuestas UDP entre las consultas pendientes según su id
+    def __init__(self):
+        self._pendientes = {}
+
+    def registrar(self, loop):
+        # Id aleatorio que no choque con otra consulta en vuelo sobre este socket
+        query_id = random.getrandbits(16)
+        while query_id in self._pendientes:
+            query_id = random.getrandbits(16)
+        future = loop.create_future()
+        self._pendientes[query_id] = future
+        return query_id, future
+
+    def liberar(self, query_id):
+        self._pendientes.pop(query_id, None)
+
+    def datagram_received(self, data, addr):
+        try:
+            parsed = _parsear_respuesta(data)
+        except (struct.error, IndexError):
+            return
+        if parsed is None:
+            return
+        query_id, ips = parsed
+        future = self._pendientes.get(query_id)
+        if future is not None and not future.done():
+            future.set_result(ips)
+
+    def error_received(self, exc):
+        logging.debug(f"Error UDP en consulta DNS: {exc}")
@@ -0,0 +1,152 @@
+# src/utils/dns_cache.py
+
+import ipaddress
+import logging
+import os
+import socket
+import threading
+import time
+
+from .concurrency import get_executor, POOL_DNS
+
+# Subred corporativa precompilada: se prefiere una IP de esta red cuando un hostname tiene varias
+CORPORATE_SUBNET = ipaddress.ip_network(os.getenv('CORPORATE_SUBNET', '192.168.0.0/23'))
+
+DNS_POSITIVE_TTL_SECONDS = int(os.getenv('DNS_POSITIVE_TTL_SECONDS', 300))
+DNS_NEGATIVE_TTL_SECONDS = int(os.getenv('DNS_NEGATIVE_TTL_SECONDS', 60))
+# Fracción del TTL a partir de la cual se refresca en segundo plano (antes de que expire)
+DNS_REFRESH_AHEAD_FRACTION = 0.8
+
+
+def elegir_ip_primaria(ip_addresses) -> str:
+    """De las IPs de un hostname, retorna la primera de la subred corporativa (o la primera de todas)."""
+    if not ip_addresses:
+        return None
+    for ip_str in ip_addresses:
+        try:
+            if ipaddress.ip_address(ip_str) in CORPORATE_SUBNET:
+                return ip_str
+        except ValueError:
+            continue
+    return ip_addresses[0]
+
+
+def _resolver_sistema(hostname):
+    try:
+        _, _, ip_addresses = socket.gethostbyname_ex(hostname)
+    except (socket.gaierror, socket.herror, UnicodeError):
+        return None
+    return elegir_ip_primaria(ip_addresses)
+
+
+class DNSCache:
+    """
+    Cache de resolución hostname -> IP con TTL positivo y negativo.
+
+    Sólo la primera resolución de un hostname bloquea al llamador. Después se entrega siempre
+    la dirección cacheada (aunque esté vencida) y la re-resolución corre en el pool 'dns',
+    así que un DNS lento no ocupa los hilos que hacen ping.
+    """
+
+    def __init__(self, positive_ttl: float = DNS_POSITIVE_TTL_SECONDS, negative_ttl: float = DNS_NEGATIVE_TTL_SECONDS,
+                 refresh_ahead: float = DNS_REFRESH_AHEAD_FRACTION, resolver=None):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.refresh_ahead = refresh_ahead
+        self._resolver = resolver or _resolver_sistema
+        self._lock = threading.Lock()
+        # hostname -> {'ip': str | None, 'ts': time.monotonic() de la resolución}
+        self._entradas = {}
+        self._en_refresco = set()
+
+    def obtener(self, hostname: str, bloquear: bool = True):
+        """
+        Retorna la IP cacheada de `hostname` (None si no resuelve), refrescando en segundo plano si toca.
+        Con `bloquear=False` un hostname sin entrada no se resuelve en el acto: se programa su resolución y se retorna None.
+        """
+        if not hostname:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(hostname)
+        if entrada is None:
+            if not bloquear:
+                self._programar_refresco(hostname)
+                return None
+            return self._resolver_y_guardar(hostname)
+
+        edad = time.monotonic() - entrada['ts']
+        ttl = self.positive_ttl if entrada['ip'] else self.negative_ttl
+        if edad >= ttl * self.refresh_ahead:
+            # Stale-while-revalidate: se entrega lo cacheado y se re-resuelve sin bloquear
+            self._programar_refresco(hostname)
+        return entrada['ip']
+
+    def guardar(self, hostname: str, ip):
+        """Registra una resolución hecha por fuera (p. ej. una consulta masiva) como si fuera propia."""
+        with self._lock:
+            self._entradas[hostname] = {'ip': ip, 'ts': time.monotonic()}
+
+    def guardar_masivo(self, resultados: dict):
+        """
+        Registra {hostname: ip | None} de una resolución masiva (sólo respuestas definitivas; los
+        timeouts no llegan aquí). Un None no pisa una IP conocida; sí queda como entrada negativa si no había nada.
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            for hostname, ip in resultados.items():
+                if ip is None and (self._entradas.get(hostname) or {}).get('ip'):
+                    continue
+                self._entradas[hostname] = {'ip': ip, 'ts': ahora}
+
+    def vigente(self, hostname: str) -> bool:
+        """True si hay una entrada de `hostname` que todavía no necesita refrescarse."""
+        with self._lock:
+            entrada = self._entradas.get(hostname)
+        if entrada is None:
+            return False
+        ttl = self.positive_ttl if entrada['ip'] else self.negative_ttl
+        return time.monotonic() - entrada['ts'] < ttl * self.refresh_ahead
+
+    def invalidar(self, hostname: str = None):
+        with self._lock:
+            if hostname is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(hostname, None)
+
+    def _resolver_y_guardar(self, hostname):
+        ip = self._resolver(hostname)
+        self.guardar(hostname, ip)
+        return ip
+
+    def _programar_refresco(self, hostname):
+        with self._lock:
+            if hostname in self._en_refresco:
+                return
+            self._en_refresco.add(hostname)
+        try:
+            get_executor(POOL_DNS).submit(self._refrescar, hostname, espera_cola=0)
+        except RuntimeError:
+            # Cola de refresco llena: se reintenta en la próxima lectura
+            with self._lock:
+                self._en_refresco.discard(hostname)
+
+    def _refrescar(self, hostname):
+        try:
+            ip = self._resolver(hostname)
+            with self._lock:
+                anterior = self._entradas.get(hostname)
+            if ip is None and anterior and anterior['ip']:
+                # Un fallo puntual no borra una IP conocida; se conserva hasta agotar el TTL negativo
+                logging.debug(f"No se pudo re-resolver {hostname}; se conserva {anterior['ip']}.")
+                if time.monotonic() - anterior['ts'] < self.positive_ttl + self.negative_ttl:
+                    return
+            self.guardar(hostname, ip)
+        except Exception as e:
+            logging.warning(f"Error refrescando DNS de {hostname}: {e}")
+        finally:
+            with self._lock:
+                self._en_refresco.discard(hostname)
+
+
+dns_cache = DNSCache()
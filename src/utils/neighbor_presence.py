@@ -0,0 +1,129 @@
+# src/utils/neighbor_presence.py
+
+import logging
+import os
+import platform
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+# Un host visto en la tabla de vecinos dentro de esta ventana se considera presente sin hacer ping
+PRESENCE_WINDOW_SECONDS = int(os.getenv('PRESENCE_WINDOW_SECONDS', 120))
+# Separación mínima entre lecturas de la tabla de vecinos
+PRESENCE_REFRESH_SECONDS = 10
+# Archivo opcional con la tabla ARP de otro equipo (p. ej. volcada por SNMP desde el switch), una IP por línea
+PRESENCE_EXTRA_ARP_FILE = os.getenv('PRESENCE_EXTRA_ARP_FILE', '')
+
+# Estados de `ip neigh` que implican tráfico reciente confirmado (STALE sólo es una MAC recordada);
+# en Windows se usan los equivalentes Reachable, Delay y Probe de Get-NetNeighbor
+_ESTADOS_RECIENTES = {'REACHABLE', 'DELAY', 'PROBE'}
+_RE_IP = re.compile(r'^\s*(\d{1,3}(?:\.\d{1,3}){3})\b')
+
+
+class PresenciaPasiva:
+    """
+    Detecta hosts presentes en la LAN leyendo la tabla de vecinos (ARP/NDP) del propio servidor,
+    sin generar tráfico. Guarda la última vez que se vio cada IP; los monitores sólo hacen ping
+    activo a los hosts que no se vieron recientemente.
+    """
+
+    def __init__(self, ventana: float = PRESENCE_WINDOW_SECONDS, refresco: float = PRESENCE_REFRESH_SECONDS):
+        self.ventana = ventana
+        self.refresco = refresco
+        self._lock = threading.Lock()
+        self._ultimo_visto = {}
+        self._ultima_lectura = None
+        self._fuentes_extra = []
+        if PRESENCE_EXTRA_ARP_FILE:
+            self.registrar_fuente(lambda: _leer_archivo_extra(PRESENCE_EXTRA_ARP_FILE))
+
+    def registrar_fuente(self, fuente):
+        """Agrega una fuente extra: callable sin argumentos que retorna las IPs vistas (p. ej. un ARP por SNMP)."""
+        with self._lock:
+            self._fuentes_extra.append(fuente)
+
+    def actualizar(self, forzar: bool = False) -> int:
+        """Lee la tabla de vecinos y las fuentes extra; retorna cuántas IPs se vieron en esta lectura."""
+        ahora = time.monotonic()
+        with self._lock:
+            if not forzar and self._ultima_lectura is not None and ahora - self._ultima_lectura < self.refresco:
+                return 0
+            self._ultima_lectura = ahora
+            fuentes = [_leer_tabla_vecinos] + list(self._fuentes_extra)
+
+        vistas = set()
+        for fuente in fuentes:
+            try:
+                vistas.update(fuente() or ())
+            except Exception as e:
+                logging.warning(f"No se pudo leer una fuente de presencia pasiva: {e}")
+
+        with self._lock:
+            for ip in vistas:
+                self._ultimo_visto[ip] = ahora
+        return len(vistas)
+
+    def marcar(self, ip: str):
+        """Registra que `ip` respondió a un sondeo activo."""
+        with self._lock:
+            self._ultimo_visto[ip] = time.monotonic()
+
+    def visto_recientemente(self, ip: str) -> bool:
+        with self._lock:
+            visto = self._ultimo_visto.get(ip)
+        return visto is not None and time.monotonic() - visto <= self.ventana
+
+
+def _leer_tabla_vecinos():
+    system = platform.system().lower()
+    if system == 'windows':
+        return _leer_net_neighbor_windows()
+    if shutil.which('ip'):
+        return _leer_ip_neigh()
+    # /proc/net/arp no distingue entradas confirmadas de las STALE: sin `ip` no hay presencia pasiva
+    return set()
+
+
+def _leer_ip_neigh():
+    resultado = subprocess.run(['ip', '-4', 'neigh', 'show'], capture_output=True, text=True, timeout=5, check=False)
+    vistas = set()
+    for linea in resultado.stdout.splitlines():
+        partes = linea.split()
+        if partes and partes[-1] in _ESTADOS_RECIENTES:
+            vistas.add(partes[0])
+    return vistas
+
+
+def _leer_net_neighbor_windows():
+    # `arp -a` lista como "dinámico" también las entradas Stale, que Windows conserva por horas;
+    # Get-NetNeighbor expone el estado y se filtra igual que en Linux
+    creation_flags = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+    comando = (
+        "Get-NetNeighbor -AddressFamily IPv4 -State Reachable,Delay,Probe -ErrorAction SilentlyContinue "
+        "| Select-Object -ExpandProperty IPAddress"
+    )
+    resultado = subprocess.run(
+        ['powershell', '-NoProfile', '-NonInteractive', '-Command', comando],
+        capture_output=True, text=True, timeout=10, check=False, creationflags=creation_flags
+    )
+    if resultado.returncode != 0:
+        # Sin estado de vecino no se puede distinguir un host apagado: se deja todo al ping activo
+        logging.warning(f"Get-NetNeighbor no disponible; presencia pasiva desactivada en este ciclo: {resultado.stderr.strip()}")
+        return set()
+    return {m.group(1) for m in (_RE_IP.match(linea) for linea in resultado.stdout.splitlines()) if m}
+
+
+def _leer_archivo_extra(ruta):
+    # Si el archivo no se actualizó dentro de la ventana, su contenido ya no prueba presencia
+    try:
+        if time.time() - os.path.getmtime(ruta) > PRESENCE_WINDOW_SECONDS:
+            return set()
+        with open(ruta) as f:
+            return {m.group(1) for m in (_RE_IP.match(linea) for linea in f) if m}
+    except OSError:
+        return set()
+
+
+presencia_pasiva = PresenciaPasiva()
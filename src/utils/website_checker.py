@@ -0,0 +1,155 @@
+# src/utils/website_checker.py
+
+import asyncio
+import logging
+import random
+import ssl
+import threading
+
+import aiohttp
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+class AsyncWebsiteChecker:
+    """
+    Verifica sitios web con asyncio sobre un event loop propio (hilo daemon) y una
+    ClientSession compartida entre ciclos. Prueba primero con HEAD y sólo cae a GET
+    si hace falta; nunca lee el cuerpo de la respuesta.
+
+    Las conexiones keep-alive duran más que un ciclo de monitoreo, así que los chequeos
+    siguientes no repiten el handshake TLS, y las peticiones son condicionales
+    (ETag/Last-Modified) para que un sitio sin cambios responda 304 sin cuerpo.
+    """
+
+    def __init__(self, timeout_por_intento: float = 10, reintentos: int = 3, backoff_base: float = 1.0,
+                 max_conexiones: int = 50, keepalive_timeout: float = 120):
+        self.timeout_por_intento = timeout_por_intento
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.max_conexiones = max_conexiones
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        # url -> {'etag': ..., 'last_modified': ...}; sólo se toca desde el loop propio
+        self._estado_sondeo = {}
+
+    def verificar_sitios(self, urls: list, deadline: float = 45) -> dict:
+        """
+        Verifica todas las `urls` de forma concurrente dentro de un único plazo.
+        Retorna {url: bool}; los sitios que no terminan antes del plazo cuentan como caídos.
+        """
+        if not urls:
+            return {}
+        loop = self._asegurar_loop()
+        future = asyncio.run_coroutine_threadsafe(self._verificar_todos(list(urls), deadline), loop)
+        try:
+            return future.result(timeout=deadline + 5)
+        except Exception as e:
+            future.cancel()
+            logging.error(f"El chequeo asíncrono de sitios web no terminó correctamente: {e}")
+            return {url: False for url in urls}
+
+    def _asegurar_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True, name='WebsiteCheckerLoop').start()
+            return self._loop
+
+    async def _obtener_sesion(self):
+        # Sólo se ejecuta dentro del loop propio, así que no necesita lock.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_conexiones,
+                ssl=_crear_contexto_tls(),
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=self.timeout_por_intento),
+            )
+        return self._session
+
+    async def _verificar_todos(self, urls, deadline):
+        session = await self._obtener_sesion()
+        tareas = {url: asyncio.ensure_future(self._verificar(session, url)) for url in set(urls) if url}
+        if tareas:
+            _, pendientes = await asyncio.wait(tareas.values(), timeout=deadline)
+            for tarea in pendientes:
+                tarea.cancel()
+                logging.warning("Chequeo de sitio web cancelado por exceder el plazo del ciclo.")
+
+        resultados = {}
+        for url in urls:
+            tarea = tareas.get(url)
+            ok = False
+            if tarea is not None and tarea.done() and not tarea.cancelled():
+                ok = tarea.exception() is None and tarea.result()
+            resultados[url] = bool(ok)
+        return resultados
+
+    async def _verificar(self, session, url):
+        for attempt in range(self.reintentos):
+            try:
+                # Una respuesta HTTP (aunque sea 4xx/5xx) es definitiva; sólo se reintentan fallos de red.
+                return await self._sondear(session, url)
+            except aiohttp.InvalidURL:
+                return False
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+
+            if attempt < self.reintentos - 1:
+                # Backoff exponencial con jitter, sin bloquear hilos
+                await asyncio.sleep(self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base))
+        return False
+
+    async def _sondear(self, session, url):
+        status = await self._solicitar(session, 'HEAD', url, condicional=True)
+        if status >= 400:
+            # Algunos servidores no implementan HEAD (405/501) o lo responden distinto a GET
+            status = await self._solicitar(session, 'GET', url, condicional=True)
+        # 304 Not Modified también cuenta como sitio activo
+        if 200 <= status < 400:
+            return True
+        if 400 <= status < 600:
+            status_index = await self._solicitar(session, 'GET', f"{url.rstrip('/')}/index.html")
+            return 200 <= status_index < 400
+        return False
+
+    async def _solicitar(self, session, metodo, url, condicional=False):
+        headers = self._headers_condicionales(url) if condicional else None
+        # Sólo se consulta el status; al salir del contexto la respuesta se libera sin descargar el cuerpo.
+        async with session.request(metodo, url, allow_redirects=True, headers=headers) as response:
+            if condicional and 200 <= response.status < 300:
+                self._guardar_validadores(url, response.headers)
+            return response.status
+
+    def _headers_condicionales(self, url):
+        estado = self._estado_sondeo.get(url)
+        if not estado:
+            return None
+        headers = {}
+        if estado.get('etag'):
+            headers['If-None-Match'] = estado['etag']
+        if estado.get('last_modified'):
+            headers['If-Modified-Since'] = estado['last_modified']
+        return headers or None
+
+    def _guardar_validadores(self, url, response_headers):
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if etag or last_modified:
+            self._estado_sondeo[url] = {'etag': etag, 'last_modified': last_modified}
+        else:
+            self._estado_sondeo.pop(url, None)
+
+
+def _crear_contexto_tls():
+    # Un único contexto compartido por todas las conexiones; sin verificar certificados, igual que antes (verify=False).
+    contexto = ssl.create_default_context()
+    contexto.check_hostname = False
+    contexto.verify_mode = ssl.CERT_NONE
+    return contexto
@@ -0,0 +1,129 @@
+# src/utils/winrm_sessions.py
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import winrm
+from winrm.exceptions import InvalidCredentialsError
+
+
+class WinRMSessionCache:
+    """
+    Cache thread-safe de sesiones WinRM ya autenticadas, indexadas por (hostname, usuario).
+    Una sesión reutilizada conserva su conexión HTTP autenticada, por lo que los chequeos
+    repetidos se saltan el handshake NTLM.
+    """
+
+    def __init__(self, idle_ttl: int = 300, max_por_host: int = 2, operation_timeout_sec: int = 15):
+        self.idle_ttl = idle_ttl
+        self.max_por_host = max_por_host
+        self.operation_timeout_sec = operation_timeout_sec
+        self._lock = threading.Lock()
+        # (hostname, usuario) -> [(sesion, contrasena, ultimo_uso)]
+        self._inactivas = {}
+        # hostname -> semáforo que limita las sesiones en uso simultáneo
+        self._semaforos = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidaciones = 0
+
+    @contextmanager
+    def sesion(self, hostname: str, usuario: str, contrasena: str):
+        """Presta una sesión para (hostname, usuario); al salir sin error vuelve al cache."""
+        semaforo = self._semaforo(hostname)
+        if not semaforo.acquire(timeout=self.operation_timeout_sec * 2):
+            raise TimeoutError(f"Límite de sesiones WinRM simultáneas alcanzado para {hostname}.")
+        key = (hostname, usuario)
+        try:
+            session = self._tomar(key, contrasena)
+            try:
+                yield session
+            except InvalidCredentialsError:
+                self.invalidar(hostname, usuario)
+                raise
+            else:
+                self._devolver(key, session, contrasena)
+            # Si ocurre otra excepción la sesión se descarta: su conexión puede haber quedado a medias.
+        finally:
+            semaforo.release()
+
+    def invalidar(self, hostname: str, usuario: str):
+        """Descarta todas las sesiones inactivas de (hostname, usuario), p. ej. tras un fallo de autenticación."""
+        with self._lock:
+            descartadas = self._inactivas.pop((hostname, usuario), [])
+            self.invalidaciones += 1
+        for session, _, _ in descartadas:
+            _cerrar_sesion(session)
+        logging.info(f"Sesiones WinRM invalidadas para {usuario}@{hostname}.")
+
+    def stats(self) -> dict:
+        """Contadores de hits/misses, invalidaciones y sesiones inactivas en cache."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidaciones': self.invalidaciones,
+                'sesiones_inactivas': sum(len(v) for v in self._inactivas.values()),
+            }
+
+    def _semaforo(self, hostname):
+        with self._lock:
+            semaforo = self._semaforos.get(hostname)
+            if semaforo is None:
+                semaforo = threading.BoundedSemaphore(self.max_por_host)
+                self._semaforos[hostname] = semaforo
+            return semaforo
+
+    def _tomar(self, key, contrasena):
+        with self._lock:
+            expiradas = self._purgar_expiradas(time.monotonic())
+            libres = self._inactivas.get(key, [])
+            session = None
+            while libres:
+                candidata, contrasena_cache, _ = libres.pop()
+                if contrasena_cache == contrasena:
+                    session = candidata
+                    break
+                # La contraseña cambió desde el panel de administración: la sesión vieja ya no sirve.
+                expiradas.append(candidata)
+            if session is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        for vieja in expiradas:
+            _cerrar_sesion(vieja)
+        if session is not None:
+            return session
+        hostname, usuario = key
+        return winrm.Session(hostname, auth=(usuario, contrasena), transport='ntlm', operation_timeout_sec=self.operation_timeout_sec)
+
+    def _devolver(self, key, session, contrasena):
+        with self._lock:
+            self._inactivas.setdefault(key, []).append((session, contrasena, time.monotonic()))
+
+    def _purgar_expiradas(self, ahora):
+        # Debe llamarse con self._lock tomado; devuelve las sesiones a cerrar fuera del lock.
+        expiradas = []
+        for key in list(self._inactivas):
+            vigentes = []
+            for entrada in self._inactivas[key]:
+                if ahora - entrada[2] > self.idle_ttl:
+                    expiradas.append(entrada[0])
+                else:
+                    vigentes.append(entrada)
+            if vigentes:
+                self._inactivas[key] = vigentes
+            else:
+                del self._inactivas[key]
+        return expiradas
+
+
+def _cerrar_sesion(session):
+    try:
+        transport = session.protocol.transport
+        if hasattr(transport, 'close_session'):
+            transport.close_session()
+    except Exception as e:
+        logging.debug(f"No se pudo cerrar la sesión WinRM: {e}")
@@ -0,0 +1,158 @@
+# tests/test_internet_rollups.py
+#
+# Job de rollups de HISTORIAL_INTERNET y elección de nivel contra una base local (sqlite3).
+#
+#   python -m pytest -q tests
+
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data import internet_rollups  # noqa: E402
+
+AHORA = datetime(2025, 6, 10, 12, 0, 0)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("""
+    CREATE TABLE HISTORIAL_INTERNET (
+        id_historialinternet INTEGER PRIMARY KEY, fecha_hora DATETIME, velocidad_descarga FLOAT,
+        velocidad_carga FLOAT, ping FLOAT, dispositivos_remotos INTEGER, dispositivos_empresariales INTEGER,
+        tipo_muestra VARCHAR(10)
+    )""")
+    for tabla, _, _ in internet_rollups.NIVELES:
+        conn.execute(internet_rollups.sql_crear_tabla(tabla))
+    conn.execute(internet_rollups.SQL_CREAR_PROGRESO)
+    yield conn
+    conn.close()
+
+
+def _insertar(conn, filas):
+    conn.executemany(
+        "INSERT INTO HISTORIAL_INTERNET (fecha_hora, velocidad_descarga, velocidad_carga, ping, "
+        "dispositivos_remotos, dispositivos_empresariales, tipo_muestra) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        filas
+    )
+    conn.commit()
+
+
+def _muestras_por_minuto(desde, minutos):
+    # Una muestra completa por minuto con descarga = minuto del día, y una de sólo latencia intercalada
+    filas = []
+    for i in range(minutos):
+        fecha = desde + timedelta(minutes=i)
+        filas.append((fecha, float(fecha.minute), 10.0, 20.0, 3, 100, 'completa'))
+        filas.append((fecha + timedelta(seconds=30), None, None, 25.0, 3, 100, 'latencia'))
+    return filas
+
+
+def test_rollup_5min_agrega_buckets_cerrados(conn):
+    _insertar(conn, _muestras_por_minuto(AHORA - timedelta(minutes=30), 30))
+    resumen = internet_rollups.ejecutar_rollups(conn, ahora=AHORA)
+
+    assert resumen['HISTORIAL_INTERNET_5MIN'] == 6
+    filas = conn.execute(
+        "SELECT bucket_inicio, muestras, descarga_min, descarga_avg, descarga_max, ping_max "
+        "FROM HISTORIAL_INTERNET_5MIN ORDER BY bucket_inicio").fetchall()
+    assert len(filas) == 6
+    primero = filas[0]
+    assert datetime.fromisoformat(primero[0]) == AHORA - timedelta(minutes=30)
+    # 5 completas + 5 de latencia; las de latencia no cuentan para el throughput
+    assert primero[1] == 10
+    assert (primero[2], primero[3], primero[4]) == (30.0, 32.0, 34.0)
+    assert primero[5] == 25.0
+
+
+def test_rollup_es_idempotente_e_incremental(conn):
+    _insertar(conn, _muestras_por_minuto(AHORA - timedelta(minutes=30), 30))
+    internet_rollups.ejecutar_rollups(conn, ahora=AHORA)
+    assert internet_rollups.ejecutar_rollups(conn, ahora=AHORA)['HISTORIAL_INTERNET_5MIN'] == 0
+
+    _insertar(conn, _muestras_por_minuto(AHORA, 10))
+    resumen = internet_rollups.ejecutar_rollups(conn, ahora=AHORA + timedelta(minutes=10))
+    assert resumen['HISTORIAL_INTERNET_5MIN'] == 2
+    total = conn.execute("SELECT COUNT(*) FROM HISTORIAL_INTERNET_5MIN").fetchone()[0]
+    assert total == 8
+
+
+def test_retencion_no_borra_crudas_sin_agregar(conn):
+    viejo = AHORA - timedelta(days=internet_rollups.RETENCION_CRUDA_DIAS + 2)
+    _insertar(conn, _muestras_por_minuto(viejo, 5) + _muestras_por_minuto(AHORA - timedelta(hours=2), 5))
+    resumen = internet_rollups.ejecutar_rollups(conn, ahora=AHORA)
+
+    assert resumen['crudas_eliminadas'] == 10
+    restantes = conn.execute("SELECT COUNT(*) FROM HISTORIAL_INTERNET").fetchone()[0]
+    assert restantes == 10
+    # Lo borrado quedó agregado en el nivel diario
+    assert conn.execute("SELECT COUNT(*) FROM HISTORIAL_INTERNET_DIA").fetchone()[0] >= 1
+
+
+def _marca(conn, tabla):
+    return datetime.fromisoformat(conn.execute(
+        "SELECT procesado_hasta FROM ROLLUP_PROGRESO WHERE tabla = ?", (tabla,)).fetchone()[0])
+
+
+def test_marca_avanza_aunque_no_haya_muestras(conn):
+    _insertar(conn, _muestras_por_minuto(AHORA - timedelta(minutes=30), 30))
+    internet_rollups.ejecutar_rollups(conn, ahora=AHORA)
+
+    # Corte de dos días sin muestras: la marca avanza igual y la corrida siguiente no vuelve a escanear
+    despues = AHORA + timedelta(days=2)
+    internet_rollups.ejecutar_rollups(conn, ahora=despues)
+    assert _marca(conn, 'HISTORIAL_INTERNET_5MIN') == despues
+
+    consultas = []
+    conn.set_trace_callback(consultas.append)
+    internet_rollups.ejecutar_rollups(conn, ahora=despues + timedelta(minutes=5))
+    conn.set_trace_callback(None)
+    lecturas_crudas = [q for q in consultas if q.startswith('SELECT fecha_hora') and 'HISTORIAL_INTERNET ' in q]
+    assert len(lecturas_crudas) == 1
+
+
+def test_primera_corrida_no_calcula_buckets_fuera_de_retencion(conn):
+    dias_5min = internet_rollups.NIVELES[0][2]
+    _insertar(conn, _muestras_por_minuto(AHORA - timedelta(days=dias_5min + 10), 10)
+              + _muestras_por_minuto(AHORA - timedelta(hours=1), 10))
+    resumen = internet_rollups.ejecutar_rollups(conn, ahora=AHORA)
+
+    # El nivel de 5 minutos sólo calcula lo reciente; el diario (sin retención) sí cubre la muestra vieja,
+    # y el día de hoy todavía no está cerrado
+    assert resumen['HISTORIAL_INTERNET_5MIN'] == 2
+    assert resumen['HISTORIAL_INTERNET_DIA'] == 1
+
+
+def test_confirma_por_tramo(conn):
+    _insertar(conn, _muestras_por_minuto(AHORA - timedelta(days=3), 10))
+
+    class ConexionContada:
+        commits = 0
+
+        def cursor(self):
+            return conn.cursor()
+
+        def commit(self):
+            ConexionContada.commits += 1
+            conn.commit()
+
+    internet_rollups.ejecutar_rollups(ConexionContada(), ahora=AHORA)
+    # Al menos un commit por día de crudas en el nivel de 5 minutos
+    assert ConexionContada.commits >= 3
+
+
+@pytest.mark.parametrize('ventana, resolucion, esperado', [
+    (timedelta(hours=1), 60, 'HISTORIAL_INTERNET'),
+    (timedelta(days=1), 360, 'HISTORIAL_INTERNET_5MIN'),
+    (timedelta(days=30), 10800, 'HISTORIAL_INTERNET_HORA'),
+    (timedelta(days=365), 131400, 'HISTORIAL_INTERNET_DIA'),
+    # La retención de 5 min no cubre la ventana: se salta al siguiente nivel que sí la cubre
+    (timedelta(days=200), 3600, 'HISTORIAL_INTERNET_HORA'),
+])
+def test_elegir_nivel(ventana, resolucion, esperado):
+    assert internet_rollups.elegir_nivel(ventana, resolucion)[0] == esperado
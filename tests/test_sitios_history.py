@@ -0,0 +1,60 @@
+# tests/test_sitios_history.py
+#
+# Log en memoria del historial de sitios web.
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.sitios_history import RegistroEventosSitios  # noqa: E402
+
+
+def _registro_sembrado():
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    registro = RegistroEventosSitios()
+    registro.sembrar([
+        # Sitio estable: su último cambio es de hace días
+        (ahora - timedelta(days=3), '1', 'https://intranet.local', 10),
+        (ahora - timedelta(minutes=20), '0', 'https://erp.local', 11),
+        (ahora - timedelta(minutes=10), '1', 'https://erp.local', 11),
+    ])
+    return registro
+
+
+def test_editar_sitio_estable_lo_conserva_en_el_historial():
+    registro = _registro_sembrado()
+
+    assert registro.renombrar(10, 'https://intranet.empresa.local')
+
+    filas = registro.eventos()
+    del_sitio = [f for f in filas if f[3] == 10]
+    assert len(del_sitio) == 1
+    assert del_sitio[0][1] == 1
+    assert del_sitio[0][2] == 'https://intranet.empresa.local'
+    assert registro.sembrado
+
+
+def test_renombrar_no_toca_otros_sitios_ni_ids_desconocidos():
+    registro = _registro_sembrado()
+
+    assert not registro.renombrar(99, 'https://otro.local')
+
+    filas = registro.eventos()
+    assert {f[3] for f in filas} == {10, 11}
+    assert [f[1] for f in filas if f[3] == 11] == [0, 1]
+    assert all(f[2] == 'https://erp.local' for f in filas if f[3] == 11)
+
+
+def test_cambio_posterior_usa_la_nueva_direccion():
+    registro = _registro_sembrado()
+    registro.renombrar(10, 'https://intranet.empresa.local')
+
+    assert registro.registrar(10, 0)
+
+    filas = [f for f in registro.eventos() if f[3] == 10]
+    assert [f[1] for f in filas] == [1, 0]
+    assert all(f[2] == 'https://intranet.empresa.local' for f in filas)